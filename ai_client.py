@@ -1,55 +1,39 @@
 import os
 import json
+import math
 import time
 import datetime
-from google import genai
+from concurrent.futures import ThreadPoolExecutor
 from google.genai import types
-from config import GEMINI_MODEL, STAGE1_MAX_ARTICLES
+from analysis_store import AnalysisStore
+from config import ANALYSIS_STORE_PATH, STAGE1_INPUT_TOKEN_BUDGET, STAGE1_MAX_ARTICLES, STAGE1_SHARDS
+from llm_client import generate, make_client, print_cache_stats
+from prompt_packer import estimate_tokens, pack_articles
+from ranking import importance_key, relevance_key, top_k
 
+# シャード1つあたりの最少記事数（これより細かく分けると記事どうしの比較が効かない）
+_MIN_SHARD_ARTICLES = 8
+# 各シャードに出力させる件数 = ceil(max_articles × 係数 / シャード数)（マージで選ぶ余裕を持たせる）
+_SHARD_OVERSAMPLE = 2.0
+# シャードごとのリトライ回数（指数バックオフ）
+_MAX_RETRIES = 2
 
-def process_with_gemini(articles: list[dict], max_articles: int = 10) -> list[dict]:
-    """
-    Gemini APIを使用して記事を翻訳・要約し、重要度スコアを付与する
-
-    Args:
-        articles: 記事リスト
-        max_articles: 処理する最大記事数
-
-    Returns:
-        処理済み記事リスト（日本語タイトル、日本語要約、スコア付き）
-    """
-    # APIキーを取得 (.envから読み込まれていることを前提)
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        print("❌ GOOGLE_API_KEY 環境変数が設定されていません")
-        return articles[:max_articles]
-
-    # Geminiを設定
-    client = genai.Client(api_key=api_key)
-
-    # 記事情報をまとめてプロンプトに含める
-    articles_text = ""
-    # Limit to top N newest items to avoid token limits (config 集約: ソース増対応)
-    articles_sorted = sorted(
-        articles,
-        key=lambda x: x.get('published', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-        or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc),
-        reverse=True,
-    )
 
-    for i, article in enumerate(articles_sorted[:STAGE1_MAX_ARTICLES]):
-        # 本文があればそれを、なければ RSS 要約を使う（本文は取得時に上限済み）
-        body = article.get("full_text") or article.get("summary", "")
-        articles_text += f"""
+def _render_article(i: int, article: dict, body: str) -> str:
+    """プロンプトに載せる記事1件分のテキスト"""
+    return f"""
 ---
 記事{i+1}:
 タイトル: {article['title']}
 ソース: {article['source']} ({article['region']})
-本文/概要: {body[:3000]}
+本文/概要: {body}
 URL: {article['url']}
 """
 
-    prompt = f"""# Role Definition
+
+def _build_prompt(articles_text: str, n_out: int) -> str:
+    """Stage 1 のプロンプト（n_out 件を選んで出力させる）"""
+    return f"""# Role Definition
 あなたは、日本市場のビジネスパーソンや一般消費者の動向に精通した「AIトレンドアナリスト」です。世界中の膨大なニュースの中から、日本のビジネスパーソンにとって真に価値のあるAI関連情報をキュレーションする専門家として振る舞ってください。
 
 # Task
@@ -79,9 +63,9 @@ URL: {article['url']}
 - **action_item**: 読者が今日すぐできる1つの行動（例:「まず社内の定型業務リストを作ってみてください」）
 
 ## Step 4: Output Format
-重要度スコアに基づき、**必ず10件** を以下のJSON配列で出力してください。
-候補が10件以上ある場合は厳選し、10件未満の場合は候補の全件を採用してください。
-**重要: 配列には必ず10件（候補が10件未満なら全件）を含めてください。5件や7件では不十分です。**
+重要度スコアに基づき、**必ず{n_out}件** を以下のJSON配列で出力してください。
+候補が{n_out}件以上ある場合は厳選し、{n_out}件未満の場合は候補の全件を採用してください。
+**重要: 配列には必ず{n_out}件（候補が{n_out}件未満なら全件）を含めてください。それより少ない件数では不十分です。**
 
 ## 出力ルール（厳守）
 - 出力テキスト（summary_ja, reason, why_important 等）に**特定の年齢層（「40代」「30代」等）を絶対に記載しないでください**。読者層を限定する表現は不要です。
@@ -95,7 +79,9 @@ URL: {article['url']}
 重要: JSON配列のみを出力してください。マークダウンのコードブロックなどは不要です。
 """
 
-    # Gemini 構造化出力用のスキーマ定義
+
+def _response_schema() -> types.Schema:
+    """Gemini 構造化出力用のスキーマ定義"""
     article_schema = types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -137,79 +123,93 @@ URL: {article['url']}
         ],
     )
 
-    response_schema = types.Schema(
+    return types.Schema(
         type=types.Type.ARRAY,
         items=article_schema,
     )
 
-    print("🧠 Gemini 3.7 Flash で処理中...")
-    start = time.time()
 
-    max_retries = 2
-    last_error = None
+def _shard(articles: list[dict], n: int) -> list[list[dict]]:
+    """優先順の記事を n 個のシャードへ順番に配る（どのシャードにも上位・下位が混ざる）"""
+    return [articles[i::n] for i in range(n)]
+
+
+def _apply_result(article: dict, result: dict) -> dict:
+    """Gemini の分析結果を記事のコピーに反映する"""
+    article = article.copy()
+    article.pop("full_text", None)  # 本文は保存しない（出力JSON肥大化防止）
+    article["title_ja"] = result.get("title_ja", article["title"])
+    article["summary_ja"] = result.get("summary_ja", "要約なし")
+    article["one_liner"] = result.get("one_liner", "")
+    article["why_important"] = result.get("why_important", "")
+    article["action_item"] = result.get("action_item", "")
+    article["category"] = result.get("category", "未分類")
+    article["importance_score"] = result.get("importance_score", 5)
+    article["reason"] = result.get("reason", "")
+
+    # Convert datetime to string for JSON serialization
+    if isinstance(article.get('published'), datetime.datetime):
+        article['published'] = article['published'].isoformat()
+    return article
 
-    for attempt in range(max_retries + 1):
+
+def _analyze_shard(
+    client, articles: list[dict], n_out: int, budget: int, label: str = ""
+) -> tuple[list[dict], list[dict]] | None:
+    """記事のまとまり1つを Gemini で分析する（失敗したらこのまとまりだけリトライ）。
+
+    Returns:
+        (分析済み記事リスト, プロンプトに載せた記事リスト) / 全リトライ失敗時は None
+    """
+    # 本文があればそれを、なければ RSS 要約を使い、トークン予算に収まるよう詰める
+    articles_text, included, pack = pack_articles(articles, _render_article, budget)
+    prompt = _build_prompt(articles_text, n_out)
+    print(
+        f"📦 {label}プロンプト: 記事 {pack['articles']} 件・推定 {estimate_tokens(prompt):,} トークン"
+        f"（記事部分 {pack['tokens']:,} / 予算 {pack['budget']:,}）"
+    )
+    if pack["dropped"] or pack["trimmed"]:
+        print(
+            f"   ✂️ {label}予算超過のため {pack['dropped']} 件を除外・{pack['trimmed']} 件の本文を"
+            f" {pack['body_ratio']:.0%} に圧縮"
+        )
+
+    last_error = None
+    for attempt in range(_MAX_RETRIES + 1):
         try:
             if attempt > 0:
                 wait_sec = 2 ** attempt
-                print(f"   🔄 リトライ {attempt}/{max_retries}（{wait_sec}秒待機）...")
+                print(f"   🔄 {label}リトライ {attempt}/{_MAX_RETRIES}（{wait_sec}秒待機）...")
                 time.sleep(wait_sec)
 
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=response_schema,
-                ),
-            )
-            response_text = response.text.strip()
-            results = json.loads(response_text)
+            results = json.loads(generate(client, prompt, _response_schema()))
 
             # 結果を元の記事情報とマージ
             processed = []
             for result in results:
                 idx = result.get("index", 1) - 1
-                if 0 <= idx < len(articles_sorted):
-                    article = articles_sorted[idx].copy()
-                    article.pop("full_text", None)  # 本文は保存しない（出力JSON肥大化防止）
-                    article["title_ja"] = result.get("title_ja", article["title"])
-                    article["summary_ja"] = result.get("summary_ja", "要約なし")
-                    article["one_liner"] = result.get("one_liner", "")
-                    article["why_important"] = result.get("why_important", "")
-                    article["action_item"] = result.get("action_item", "")
-                    article["category"] = result.get("category", "未分類")
-                    article["importance_score"] = result.get("importance_score", 5)
-                    article["reason"] = result.get("reason", "")
-
-                    # Convert datetime to string for JSON serialization
-                    if isinstance(article.get('published'), datetime.datetime):
-                        article['published'] = article['published'].isoformat()
-
-                    processed.append(article)
+                if 0 <= idx < len(included):
+                    processed.append(_apply_result(included[idx], result))
                 else:
-                    print(f"   ⚠️ index {idx + 1} が範囲外（記事数: {len(articles_sorted)}）— スキップ")
-
-            # スコアで降順ソート
-            processed.sort(key=lambda x: x.get("importance_score", 0), reverse=True)
-
-            elapsed = time.time() - start
-            print(f"✅ Gemini 処理完了: {len(processed)} 件（{elapsed:.1f}秒）")
-            return processed[:max_articles]
+                    print(f"   ⚠️ {label}index {idx + 1} が範囲外（記事数: {len(included)}）— スキップ")
+            return processed, included
 
         except Exception as e:
             last_error = e
-            print(f"   ⚠️ Attempt {attempt + 1} failed: {e}")
+            print(f"   ⚠️ {label}Attempt {attempt + 1} failed: {e}")
             # INVALID_ARGUMENT (API key issue) はリトライしても無駄
             if "INVALID_ARGUMENT" in str(e) or "API Key" in str(e):
                 print("   🛑 APIキーエラーのためリトライ中止")
                 break
 
-    # 全リトライ失敗時のフォールバック
-    elapsed = time.time() - start
-    print(f"❌ Gemini API エラー（全{max_retries + 1}回, {elapsed:.1f}秒）: {last_error}")
+    print(f"   ❌ {label}Gemini API エラー（全{_MAX_RETRIES + 1}回）: {last_error}")
+    return None
+
+
+def _fallback(articles: list[dict], max_articles: int) -> list[dict]:
+    """Gemini が使えないときの出力（優先順の上位をそのまま使う）"""
     fallback = []
-    for a in articles_sorted[:max_articles]:
+    for a in articles[:max_articles]:
         ac = a.copy()
         ac.pop("full_text", None)  # 本文は保存しない（出力JSON肥大化防止）
         if isinstance(ac.get('published'), datetime.datetime):
@@ -221,3 +221,107 @@ URL: {article['url']}
             ac['summary'] = ac['summary_ja']
         fallback.append(ac)
     return fallback
+
+
+def process_with_gemini(
+    articles: list[dict],
+    max_articles: int = 10,
+    shards: int | None = None,
+    store_path: str = ANALYSIS_STORE_PATH,
+) -> list[dict]:
+    """
+    Gemini APIを使用して記事を翻訳・要約し、重要度スコアを付与する
+
+    前回までの実行（03:00 の Stage 1 など）で分析済みの記事は analysis_store の結果を使い、
+    未分析の記事だけを送る。候補が多いときは shards 個のまとまりに分けて並列に分析し
+    （出力の長い1回の呼び出しを避ける）、分析済みの記事と合わせて importance_score の
+    降順（同点は元の優先順）に上位 max_articles 件を返す。失敗したまとまりはそれだけをリトライする。
+
+    Args:
+        articles: 記事リスト
+        max_articles: 処理する最大記事数
+        shards: 分割数の上限（None なら config.STAGE1_SHARDS。1 なら従来どおり1回で分析）
+        store_path: 分析結果ストア（analysis_store）の JSON パス
+
+    Returns:
+        処理済み記事リスト（日本語タイトル、日本語要約、スコア付き）
+    """
+    # APIキーを取得 (.envから読み込まれていることを前提)
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        print("❌ GOOGLE_API_KEY 環境変数が設定されていません")
+        return articles[:max_articles]
+
+    # Geminiを設定
+    client = make_client(api_key)
+
+    # Limit to top N items to avoid token limits (config 集約: ソース増対応)
+    # 関連度順（未採点なら新しい順）に並べ、予算超過時は pack_articles が関連度の低い末尾から落とす
+    articles_sorted = top_k(articles, STAGE1_MAX_ARTICLES, relevance_key)
+
+    # 前回までに分析済みの記事（同じ URL・同じ内容）は結果を再利用し、未分析の記事だけを送る
+    store = AnalysisStore(store_path)
+    reused, fresh = [], []
+    for a in articles_sorted:
+        analysis = store.get(a)
+        if analysis is None:
+            fresh.append(a)
+        elif analysis:
+            reused.append(_apply_result(a, analysis))
+    if len(fresh) < len(articles_sorted):
+        print(
+            f"♻️ 分析済み {len(articles_sorted) - len(fresh)} 件を再利用（うち選定 {len(reused)} 件）"
+            f"→ 未分析 {len(fresh)} 件を Gemini へ"
+        )
+
+    results, elapsed = [], 0.0
+    if fresh:
+        n = max(1, min(STAGE1_SHARDS if shards is None else shards, len(fresh) // _MIN_SHARD_ARTICLES))
+        batches = _shard(fresh, n)
+        if n == 1:
+            n_out = max_articles
+        else:
+            n_out = math.ceil(max_articles * _SHARD_OVERSAMPLE / n)
+
+        print(f"🧠 Gemini 3.7 Flash で処理中...{f'（{n} 分割・並列）' if n > 1 else ''}")
+        start = time.time()
+        budget = STAGE1_INPUT_TOKEN_BUDGET // n
+        if n == 1:
+            results = [_analyze_shard(client, batches[0], n_out, budget)]
+        else:
+            with ThreadPoolExecutor(max_workers=n) as executor:
+                results = list(executor.map(
+                    lambda i: _analyze_shard(client, batches[i], n_out, budget, f"[{i + 1}/{n}] "), range(n)
+                ))
+        elapsed = time.time() - start
+
+        failed = sum(1 for r in results if r is None)
+        if failed == n and not reused:
+            # 全リトライ失敗時のフォールバック
+            print(f"❌ Gemini API エラー（全シャード失敗, {elapsed:.1f}秒）")
+            return _fallback(articles_sorted, max_articles)
+        if failed:
+            print(f"   ⚠️ {failed}/{n} シャードが失敗 — 成功分{'と分析済みの記事' if reused else ''}だけで選定")
+
+        # 分析結果を記録（プロンプトに載せたが選ばれなかった記事は選外として記録）
+        for r in results:
+            if r is None:
+                continue
+            processed, included = r
+            selected = {a["url"] for a in processed}
+            for a in processed:
+                store.record(a, a)
+            for a in included:
+                if a["url"] not in selected:
+                    store.record(a, None)
+        store.save()
+
+    # 元の優先順に並べてから、スコアで降順に上位 max_articles 件（同点は優先順・結果は決定的）
+    order = {a["url"]: i for i, a in enumerate(articles_sorted)}
+    analysed = reused + [a for r in results if r for a in r[0]]
+    merged = sorted(analysed, key=lambda a: order.get(a["url"], len(order)))
+    processed = top_k(merged, max_articles, importance_key)
+
+    print(f"✅ Gemini 処理完了: {len(processed)} 件（{elapsed:.1f}秒）")
+    print_cache_stats()
+    return processed
@@ -0,0 +1,92 @@
+"""analysis_store.py — 記事ごとの Gemini 1次分析結果の記録（実行をまたいで再利用）。
+
+Stage 2（07:00）は collect_rss_gemini.main() で最新 RSS を取り直し、03:00 の Stage 1 で
+分析済みの記事も含めて process_with_gemini に送り直していた。本モジュールは
+正規化 URL をキーに
+
+- hash     — 記事内容（タイトル + RSS 要約）のハッシュ。変わっていれば分析し直す
+- analysis — 分析結果（title_ja / summary_ja / importance_score 等）。
+             Gemini に送ったが選ばれなかった記事は空の dict（選外）
+- at       — 記録した時刻（epoch 秒）
+
+を記録し、ai_client が未分析の記事だけを Gemini に送れるようにする。
+Stage 1 と Stage 2 は別のランナーで動くため、feed_state.json と同じく
+プロジェクトルートの analysis_store.json（Git 管理下。各ワークフローの自動コミットで
+引き継ぐ）に保存する。_TTL_HOURS より古い記録は使わず、保存時に捨てる。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from config import ANALYSIS_STORE_PATH
+from url_utils import canonical_url
+
+# 03:00 の分析を 07:00 に使えれば足りる（前日分は候補の顔ぶれが変わるので使わない）
+_TTL_HOURS = 20
+# 保存する分析結果のフィールド（ai_client のレスポンススキーマと同じ）
+_ANALYSIS_FIELDS = (
+    "title_ja", "summary_ja", "one_liner", "why_important", "action_item",
+    "category", "importance_score", "reason",
+)
+
+
+def content_hash(article: dict) -> str:
+    """分析の入力になる記事内容（タイトル + RSS 要約）のハッシュ"""
+    text = f"{article.get('title', '')}\n{article.get('summary', '')}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class AnalysisStore:
+    """正規化 URL → 分析結果の対応表（get / record は呼び出し元の1スレッドから使う）。"""
+
+    def __init__(self, path: str = ANALYSIS_STORE_PATH, now: float | None = None):
+        self.path = path
+        self.now = time.time() if now is None else now
+        self._records: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._records = data
+        except (OSError, ValueError):
+            self._records = {}  # 壊れたファイルは捨てて分析し直す
+
+    def _fresh(self, rec: dict) -> bool:
+        return self.now - rec.get("at", 0) <= _TTL_HOURS * 3600
+
+    def get(self, article: dict) -> dict | None:
+        """記録済みの分析結果。未分析・内容が変わった・期限切れは None、選外は空の dict。"""
+        rec = self._records.get(canonical_url(article.get("url", "")))
+        if not rec or rec.get("hash") != content_hash(article) or not self._fresh(rec):
+            return None
+        return rec.get("analysis") or {}
+
+    def record(self, article: dict, analysis: dict | None):
+        """分析結果を記録する（analysis が None / 空なら選外として記録）。"""
+        url = article.get("url")
+        if not url:
+            return
+        kept = {k: analysis[k] for k in _ANALYSIS_FIELDS if k in analysis} if analysis else {}
+        self._records[canonical_url(url)] = {
+            "hash": content_hash(article),
+            "analysis": kept,
+            "at": round(self.now),
+        }
+
+    def save(self):
+        """期限切れの記録を捨ててディスクへ書き出す（失敗しても処理は続行）。"""
+        self._records = {u: r for u, r in self._records.items() if self._fresh(r)}
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._records, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"  ⚠️ 分析結果の保存失敗: {e}")
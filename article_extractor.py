@@ -9,29 +9,177 @@ RSS の冒頭要約だけでは AI の判断材料が薄いため、上位候補
     ThreadPoolExecutor のワーカースレッド内で呼ぶと
     ``ValueError: signal only works in main thread`` で必ず失敗する。
     そのため EXTRACTION_TIMEOUT=0 でシグナルを無効化することが必須。
-    （並列取得そのもの = fetch_url はシグナルを使わないため影響を受けない）
+    （並列取得そのもの = _download_html はシグナルを使わないため影響を受けない）
+
+取得（_download_html）:
+    trafilatura.fetch_url はページ全体をメモリに読み込むが、使うのは先頭
+    _BODY_MAX_CHARS 文字程度の本文だけ。httpx でレスポンスをストリーミングし、
+    HTML 以外の Content-Type（arXiv の PDF など）はヘッダーの時点で断り、
+    config.ARTICLE_MAX_DOWNLOAD_BYTES に達したら読むのをやめて手元の分だけ抽出する。
+
+二段構成（FullTextPrefetcher / enrich_with_full_text）:
+    取得（I/O）はスレッドプール、抽出（CPU・GIL を握る HTML パース）は
+    プロセスプールで並列に行う（取得スレッドが抽出結果を待ってキャッシュへ保存する）。
+    trafilatura 2.x の extract() は EXTRACTION_TIMEOUT を読まない（読むのは CLI だけ）ため、
+    抽出の打ち切りは取得スレッド側で行う: _EXTRACTION_TIMEOUT_SEC 待っても結果が来なければ
+    プールのワーカーを終了させ、プールを作り直す（同じプールで抽出中だった文書はスレッド内で
+    抽出し直す）。件数が少ないとき・CPU が1つのとき・プロセスプールが使えない／壊れたときは、
+    従来どおりスレッド内（EXTRACTION_TIMEOUT=0、打ち切りなし）で抽出する。
+
+抽出済みの本文は正規化 URL をキーに disk_cache.DiskCache（config.CACHE_DIR/fulltext）へ
+保存し、Stage 2 の再実行や手動の再実行では取得・抽出を省略する。取得に失敗した URL も
+短い期間だけ「失敗」として覚え、同じサイトのタイムアウトを繰り返し待たない。
 """
 
+import multiprocessing
+import os
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 
+import httpx
 import trafilatura
 from trafilatura.settings import use_config
+from trafilatura.utils import decode_file
+
+from config import ARTICLE_MAX_DOWNLOAD_BYTES, CACHE_DIR, DOMAIN_STATS_PATH
+from disk_cache import DiskCache
+from domain_stats import DomainStats, domain_of
+from url_utils import canonical_url
 
 # 既存 rss_client.py の並列度に合わせる
 _MAX_WORKERS = 8
 _DOWNLOAD_TIMEOUT_SEC = 15
+_USER_AGENT = "Mozilla/5.0 (compatible; ai-news-bot/1.0)"
+# 本文として扱う Content-Type（ヘッダーがない場合は受け入れて抽出側に任せる）
+_HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+_CHUNK_BYTES = 64 * 1024
 _BODY_MAX_CHARS = 6000    # Gemini トークン節約のための本文上限
 _MIN_BODY_CHARS = 200     # これ未満の抽出は失敗扱い（呼び出し側で要約へフォールバック）
 
+# 抽出用プロセスプール: 使える CPU 数・ワーカー数・1文書の抽出タイムアウト・プールを使う最小件数
+# （起動コストがあるため、数件なら取得スレッド内で抽出したほうが速い）
+_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+_EXTRACT_WORKERS = max(1, min(4, _CPUS))
+_EXTRACTION_TIMEOUT_SEC = 10
+_MIN_POOL_DOCS = 4
+
+# 本文キャッシュ: 成功は3日、失敗（空文字で記録）は6時間で再取得。合計 50MB を超えたら LRU で退避
+_FULLTEXT_CACHE_DIR = os.path.join(CACHE_DIR, "fulltext")
+_CACHE_TTL_SEC = 3 * 86400
+_FAILURE_TTL_SEC = 6 * 3600
+_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# finish で締め切り後も実行中の取得を待つ上限（秒）。これまでに終わった本文はキャッシュに残り、
+# それより遅い取得の結果は保存後にキャッシュ・取得実績へ書き込まず捨てる
+_SAVE_GRACE_SEC = 5
+# ソース別の取得率ログに出す最大件数（取得率の低い順）
+_YIELD_REPORT = 8
+
 # モジュールレベルで config を1度だけ構築する。
 # EXTRACTION_TIMEOUT=0 でシグナル（SIGALRM）を無効化し、スレッド内 extract() を安全にする。
 _CONFIG = use_config()
 _CONFIG.set("DEFAULT", "EXTRACTION_TIMEOUT", "0")
-_CONFIG.set("DEFAULT", "DOWNLOAD_TIMEOUT", str(_DOWNLOAD_TIMEOUT_SEC))
 _CONFIG.set("DEFAULT", "MIN_EXTRACTED_SIZE", str(_MIN_BODY_CHARS))
 
 
+def _extract_text(html: str) -> str | None:
+    """ダウンロード済み HTML から本文を抽出する（短すぎる抽出は None）。"""
+    text = trafilatura.extract(
+        html,
+        config=_CONFIG,
+        favor_precision=True,     # ナビ・広告・関連リンクの混入を抑える
+        include_comments=False,
+        include_tables=False,
+    )
+    if not text or len(text) < _MIN_BODY_CHARS:
+        return None
+    return text[:_BODY_MAX_CHARS]
+
+
+def _extract_in_worker(html: str) -> str | None:
+    """プロセスプールのワーカーで実行する抽出（打ち切りは呼び出し側がワーカーを終了させて行う）。"""
+    try:
+        return _extract_text(html)
+    except Exception:  # noqa: BLE001 — 抽出ライブラリの失敗は種類を問わず「本文なし」
+        return None
+
+
+def _extract_in_thread(html: str) -> str | None:
+    """スレッド内での抽出（EXTRACTION_TIMEOUT=0）。失敗は None。"""
+    try:
+        return _extract_text(html)
+    except Exception:  # noqa: BLE001 — 同上
+        return None
+
+
+def _download_html(
+    url: str,
+    max_bytes: int = ARTICLE_MAX_DOWNLOAD_BYTES,
+    timeout: float = _DOWNLOAD_TIMEOUT_SEC,
+) -> str | None:
+    """HTML をストリーミングで最大 max_bytes まで取得して文字列にする。
+
+    HTTP エラー・HTML 以外の Content-Type・接続失敗・タイムアウトは None。
+    上限や全体の締め切り（timeout 秒。ドメイン別に短くできる）に達したら、そこまでの分を返す。
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        with httpx.stream(
+            "GET",
+            url,
+            headers={"User-Agent": _USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+            timeout=timeout,
+            follow_redirects=True,
+        ) as response:
+            if response.status_code >= 400:
+                return None
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in _HTML_CONTENT_TYPES:
+                return None  # PDF・画像・動画などは本文を読まずに断る
+            chunks, size = [], 0
+            for chunk in response.iter_bytes(_CHUNK_BYTES):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes or time.monotonic() >= deadline:
+                    break
+        data = b"".join(chunks)[:max_bytes]
+        return decode_file(data) if data else None
+    except (httpx.HTTPError, httpx.InvalidURL, OSError, ValueError):
+        return None
+
+
+def _start_extract_pool(n_docs: int) -> ProcessPoolExecutor | None:
+    """抽出用プロセスプールを起動する。件数が少ない・CPU が1つ・起動できない場合は None（スレッド内抽出）。
+
+    取得スレッドが走っている最中に fork すると子でロックが壊れうるため spawn を使う。
+    CPU が1つの環境では並列に抽出できず、spawn の起動と HTML の受け渡しの分だけ遅くなる
+    （1コアで 15 件: プロセスプール 1.12秒 / スレッド内 0.78秒）ためプールを使わない。
+    """
+    if n_docs < _MIN_POOL_DOCS or _CPUS <= 1:
+        return None
+    try:
+        pool = ProcessPoolExecutor(
+            max_workers=min(_EXTRACT_WORKERS, n_docs),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        pool.submit(_extract_in_worker, "")  # ダウンロード待ちの間にワーカーを起動しておく
+        return pool
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"  ⚠️ 抽出プロセスプールを起動できません（スレッド内で抽出）: {e}")
+        return None
+
+
+def _kill_pool(pool: ProcessPoolExecutor):
+    """プールのワーカープロセスを終了させて停止する（実行中の抽出も止める）。
+
+    ProcessPoolExecutor には実行中のタスクを止める公開 API がない（terminate_workers は 3.14 から）
+    ため、ワーカーの Process を直接 terminate する。結果を待っていた future は BrokenProcessPool になる。
+    """
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
 def fetch_article_text(url: str) -> str | None:
     """単一 URL から本文を抽出する。取得・抽出に失敗したら None を返す。
 
@@ -43,31 +191,242 @@ def fetch_article_text(url: str) -> str | None:
     if not url:
         return None
     try:
-        # fetch_url は 403・UAブロック・タイムアウト時に None を返す
-        downloaded = trafilatura.fetch_url(url, config=_CONFIG)
+        # 403・UAブロック・タイムアウト・HTML 以外は None
+        downloaded = _download_html(url)
         if not downloaded:
             return None
-        text = trafilatura.extract(
-            downloaded,
-            config=_CONFIG,           # EXTRACTION_TIMEOUT=0（スレッド安全）
-            favor_precision=True,     # ナビ・広告・関連リンクの混入を抑える
-            include_comments=False,
-            include_tables=False,
-        )
-        if not text or len(text) < _MIN_BODY_CHARS:
-            return None
-        return text[:_BODY_MAX_CHARS]
+        return _extract_text(downloaded)  # EXTRACTION_TIMEOUT=0（スレッド安全）
     except Exception:
         # 1 件の失敗が全体を止めないよう握りつぶす（呼び出し側で要約へフォールバック）
         return None
 
 
-def enrich_with_full_text(articles: list[dict], top_n: int = 15) -> list[dict]:
+class FullTextPrefetcher:
+    """記事本文の先行取得器（取得スレッド + 抽出プロセスプール + 本文キャッシュ）。
+
+    submit した記事から順に取得を始め、cancel で不要になった記事の取得を取り消し、
+    finish で締め切りまでに揃った本文だけを ``full_text`` として付与する。
+    collect_rss_gemini のストリーミングは、上位に入った記事を取得中のフィードと並行して
+    submit するため、Stage 1 の所要時間は「取得 + 本文」の和ではなく最大値に近づく。
+
+    ドメイン別の取得実績（domain_stats）で、失敗が続くドメインの記事は accepts が False を
+    返して取得枠を使わず、それ以外もドメイン別のタイムアウトで取得する。
+    取り消し・締め切り超過で使われなかった本文も、finish の後 _SAVE_GRACE_SEC 以内に
+    取得が終われば本文キャッシュに残る（それより遅い取得の結果は保存後に書き込まず捨てる）。
+    submit / cancel / retarget / finish は同じ1スレッドから呼ぶこと。
+    """
+
+    def __init__(self, expected: int = 15, domain_stats_path: str = DOMAIN_STATS_PATH):
+        self.expected = expected
+        self.cache = DiskCache(_FULLTEXT_CACHE_DIR, _CACHE_TTL_SEC, _CACHE_MAX_BYTES)
+        self.domains = DomainStats(domain_stats_path)  # ドメイン別の取得実績（見送り・タイムアウト調整）
+        self._peeked: dict[str, str | None] = {}           # 正規化 URL → キャッシュの値（accepts の下見）
+        self._cached: dict[str, str | None] = {}           # 正規化 URL → キャッシュの値（submit で1回だけ get）
+        self._skipped: set[str] = set()                    # 失敗が続くドメインとして見送った URL
+        self._executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_started = False
+        self._pool_lock = threading.Lock()                 # 抽出が止まったプールの作り直し
+        # プールへ同時に渡す文書をワーカー数までにする（キュー待ちを抽出タイムアウトに数えない）
+        self._extract_slots = threading.Semaphore(min(_EXTRACT_WORKERS, max(1, expected)))
+        self._jobs: dict[int, tuple[dict, object]] = {}    # id(article) → (article, future)
+        self._restored: dict[int, dict] = {}               # キャッシュから本文を復元した記事
+        self._futures: list = []                           # 投入した全取得（取り消し済みを含む）
+        self._write_lock = threading.Lock()                # 取得結果の書き込みと保存の順序付け
+        self._closed = False                               # 保存済み（以降の取得結果は書き込まない）
+        self._start = time.time()
+        self.stats = {"fetching": 0, "cancelled": 0, "late": 0}
+
+    def _peek(self, url: str) -> str | None:
+        """キャッシュの値を下見する（hit/miss に数えない。候補の選別用）"""
+        key = canonical_url(url)
+        if key not in self._cached and key not in self._peeked:
+            self._peeked[key] = self.cache.peek(key)
+        return self._cached.get(key, self._peeked.get(key))
+
+    def _lookup(self, url: str) -> str | None:
+        """本文を使う（キャッシュから復元する・取得する）記事のキャッシュ参照（URL ごとに1回数える）"""
+        key = canonical_url(url)
+        if key not in self._cached:
+            self._cached[key] = self.cache.get(key)
+        return self._cached[key]
+
+    def accepts(self, article: dict) -> bool:
+        """本文を得られる見込みがあるか（取得枠を使う価値があるか）。
+
+        本文付き・キャッシュ済みの本文ありは True。URL なし・失敗のキャッシュあり・
+        失敗が続くドメインは False。
+        """
+        url = article.get("url")
+        if not url:
+            return False
+        if article.get("full_text"):
+            return True
+        cached = self._peek(url)
+        if cached is not None:
+            return bool(cached)
+        if self.domains.should_skip(url):
+            self._skipped.add(url)
+            return False
+        return True
+
+    def _fetch_body(self, url: str) -> str | None:
+        """取得スレッドで実行: ダウンロード → 抽出（プロセスプール）→ 本文キャッシュへ保存。"""
+        started = time.monotonic()
+        html = _download_html(url, timeout=self.domains.timeout_for(url, _DOWNLOAD_TIMEOUT_SEC))
+        body = self._extract(html, url) if html else None
+        with self._write_lock:
+            if self._closed:
+                return body  # finish で保存済み（索引に載らない blob・実績を残さない）
+            self.domains.record(url, bool(body), time.monotonic() - started)
+            if body:
+                self.cache.put(canonical_url(url), body)
+            else:
+                self.cache.put(canonical_url(url), "", ttl_sec=_FAILURE_TTL_SEC)
+        return body
+
+    def _extract(self, html: str, url: str) -> str | None:
+        """取得スレッドで実行: 抽出をプロセスプールへ渡し、_EXTRACTION_TIMEOUT_SEC で打ち切る。"""
+        pool = self._pool
+        if pool is None:
+            return _extract_in_thread(html)
+        with self._extract_slots:
+            try:
+                return pool.submit(_extract_in_worker, html).result(timeout=_EXTRACTION_TIMEOUT_SEC)
+            except TimeoutError:
+                print(f"  ⚠️ 本文抽出タイムアウト（抽出プロセスを終了）: {url}")
+                self._recycle_pool(pool)
+                return None
+            except Exception:  # noqa: BLE001 — プールが壊れた・作り直されたらスレッド内で抽出
+                return None if self._closed else _extract_in_thread(html)
+
+    def _recycle_pool(self, stuck: ProcessPoolExecutor):
+        """抽出が止まったプールのワーカーを終了させ、新しいプールに差し替える。"""
+        with self._pool_lock:
+            if self._pool is not stuck:
+                return  # 別の取得スレッドが作り直し済み・finish で停止済み
+            _kill_pool(stuck)
+            self._pool = _start_extract_pool(self.expected)
+
+    def submit(self, article: dict):
+        """記事の本文取得を始める（本文付き・URL なし・投入済みは何もしない）。"""
+        key = id(article)
+        if article.get("full_text") or not article.get("url") or key in self._jobs or key in self._restored:
+            return
+        cached = self._lookup(article["url"])
+        if cached is not None:
+            if cached:
+                article["full_text"] = cached
+                self._restored[key] = article
+            return  # 失敗のキャッシュも取得し直さない
+        if not self._pool_started:
+            self._pool_started = True
+            self._pool = _start_extract_pool(self.expected)
+        future = self._executor.submit(self._fetch_body, article["url"])
+        self._jobs[key] = (article, future)
+        self._futures.append(future)
+        self.stats["fetching"] += 1
+
+    def cancel(self, article: dict):
+        """上位から外れた記事の取得を取り消す（実行中なら結果を付与しないだけ）。"""
+        key = id(article)
+        job = self._jobs.pop(key, None)
+        restored = self._restored.pop(key, None)
+        if restored is not None:
+            restored.pop("full_text", None)
+        if job is not None:
+            job[1].cancel()
+        if job is not None or restored is not None:
+            self.stats["cancelled"] += 1
+
+    def retarget(self, articles: list[dict], n: int):
+        """articles の先頭から accepts な n 件を取得対象に揃える（不足分を投入、対象外は取り消し）。"""
+        wanted = [a for a in articles if self.accepts(a)][:n]
+        wanted_ids = {id(a) for a in wanted}
+        for key in [k for k in (*self._jobs, *self._restored) if k not in wanted_ids]:
+            job = self._jobs.get(key)
+            self.cancel(job[0] if job else self._restored[key])
+        for a in wanted:
+            self.submit(a)
+
+    def finish(self, timeout: float | None = None) -> int:
+        """締め切り（秒。None なら全件）まで待ち、揃った本文を付与して本文付きの件数を返す。"""
+        futures = {future: article for article, future in self._jobs.values()}
+        done, not_done = wait(futures, timeout=timeout) if futures else (set(), set())
+        success = len(self._restored)
+        for future in done:
+            try:
+                body = future.result()
+            except Exception as e:
+                print(f"  ⚠️ 本文取得失敗 [{futures[future].get('source', '?')}]: {e}")
+                body = None
+            if body:
+                futures[future]["full_text"] = body
+                success += 1
+        for future in not_done:
+            future.cancel()
+        self.stats["late"] = len(not_done)
+
+        # 未開始の取得は取り消し、実行中の取得は _SAVE_GRACE_SEC まで待ってから保存する
+        # （間に合った結果はキャッシュに残り、間に合わない結果は保存後に書き込まない）
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        running = [f for f in self._futures if not f.done()]
+        if running:
+            wait(running, timeout=_SAVE_GRACE_SEC)
+        with self._write_lock:
+            self._closed = True
+        # 抽出中のワーカーが残るとインタープリタの終了時にその完了を待つため、終了させる
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            _kill_pool(pool)
+        self.cache.save()
+        self.domains.save()
+
+        # ソース別の取得率（今回取得を試みた記事のみ。低い順）
+        by_source: dict[str, list[int]] = {}
+        for future, article in futures.items():
+            counts = by_source.setdefault(article.get("source", "?"), [0, 0])
+            counts[0] += int(bool(article.get("full_text")))
+            counts[1] += 1
+        if by_source:
+            worst = sorted(by_source.items(), key=lambda kv: (kv[1][0] / kv[1][1], -kv[1][1]))[:_YIELD_REPORT]
+            print("📊 本文取得率（ソース別）: " + ", ".join(f"{src} {ok}/{n}" for src, (ok, n) in worst))
+        if self._skipped:
+            print(
+                f"⏭️ 失敗が続くドメインの取得を見送り: {len(self._skipped)} 件"
+                f"（{', '.join(sorted({domain_of(u) for u in self._skipped}))}）"
+            )
+
+        total = len(futures) + len(self._restored)
+        extra = ""
+        if self.stats["cancelled"] or self.stats["late"]:
+            extra = f" 取り消し {self.stats['cancelled']} / 締め切り超過 {self.stats['late']},"
+        print(
+            f"✅ 本文取得: {success}/{total} 件成功"
+            f"（キャッシュ hit {self.cache.stats['hit']} / miss {self.cache.stats['miss']},{extra}"
+            f" 残りは要約で代替, {time.time() - self._start:.1f}秒）"
+        )
+        return success
+
+
+def enrich_with_full_text(
+    articles: list[dict],
+    top_n: int = 15,
+    timeout: float | None = None,
+    domain_stats_path: str = DOMAIN_STATS_PATH,
+) -> list[dict]:
     """上位 top_n 件のうち本文未取得の記事だけ、本文を並列取得して付与する。
 
+    失敗が続くドメイン・失敗がキャッシュ済みの記事は数えず、その分を次の記事に回す
+    （top_n は「本文を取りに行く件数」の上限）。
+
     各記事 dict に ``full_text`` キーを **追加** する（既存キーは一切変更しない）。
     冪等: 既に full_text を持つ記事は再取得しない（同一プロセス内の二重取得を回避）。
+    プロセスをまたいでは本文キャッシュ（_FULLTEXT_CACHE_DIR）から復元する。
     本文取得に失敗した記事には full_text を付けない（呼び出し側で要約を使う）。
+    timeout（秒）を指定すると、それまでに揃った本文だけを付与して戻る。
+    domain_stats_path はドメイン別の取得実績（domain_stats）の JSON パス。
 
     Returns:
         articles（in-place で更新済みの同一リスト）
@@ -79,31 +438,9 @@ def enrich_with_full_text(articles: list[dict], top_n: int = 15) -> list[dict]:
     if not targets:
         return articles
 
-    start = time.time()
-    print(f"📄 上位 {len(targets)} 件の本文を並列取得中（最大{_MAX_WORKERS}スレッド）...")
-
-    success = 0
-    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
-        future_to_article = {
-            executor.submit(fetch_article_text, a["url"]): a for a in targets
-        }
-        for future in as_completed(future_to_article):
-            article = future_to_article[future]
-            try:
-                # 遅いサイトの足切りは fetch_url の DOWNLOAD_TIMEOUT が担う。
-                # as_completed が返す future は完了済みのため、ここの timeout は
-                # （実質的な足切りではなく）完了済み future への安全弁。
-                body = future.result(timeout=_DOWNLOAD_TIMEOUT_SEC + 5)
-            except Exception as e:
-                print(f"  ⚠️ 本文取得失敗 [{article.get('source', '?')}]: {e}")
-                body = None
-            if body:
-                article["full_text"] = body
-                success += 1
-
-    elapsed = time.time() - start
-    print(
-        f"✅ 本文取得: {success}/{len(targets)} 件成功"
-        f"（残りは要約で代替, {elapsed:.1f}秒）"
-    )
+    prefetcher = FullTextPrefetcher(expected=len(targets), domain_stats_path=domain_stats_path)
+    prefetcher.retarget(articles, top_n)
+    if prefetcher.stats["fetching"]:
+        print(f"📄 上位 {prefetcher.stats['fetching']} 件の本文を並列取得中（最大{_MAX_WORKERS}スレッド）...")
+    prefetcher.finish(timeout)
     return articles
@@ -0,0 +1,91 @@
+"""見出し重複排除のベンチマーク（総当たり vs 転置インデックス vs NumPy の行列積）。
+
+dedup._cluster_pairwise（各記事を既存クラスタの全メンバーと比較）、
+dedup._cluster_indexed（共通トークン数が足りうる相手だけ比較）と
+dedup._cluster_numpy（共通トークン数を行列積でまとめて求める。NumPy がなければ省略）を、
+件数を変えて計測し、クラスタ分けが完全に一致することも確認する。
+
+コーパスはアーカイブ済みの docs/*.json（配信済み記事の見出し）を日付順に並べたもの。
+先頭から --sizes の件数ずつ取り、1日分（≈ 50 件）から数か月分のアーカイブ
+（数千件）までの伸びを見る（コーパスより大きい件数は全件で打ち切る）。
+
+Usage:
+    python benchmarks/bench_dedup.py [--sizes 50,200,1000,2000,5000] [--rounds 3]
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup
+from config import PROJECT_ROOT
+
+
+def load_titles() -> list[str]:
+    titles = []
+    for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, "docs", "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):  # 読めない・壊れた JSON は飛ばす
+            continue
+        for a in data.get("articles", []) if isinstance(data, dict) else []:
+            titles.append(a.get("title_ja") or a.get("title") or "")
+    return titles
+
+
+def candidates_of(titles: list[str]) -> list[tuple]:
+    """dedup_articles と同じ前処理（正規化・トークン化・短すぎる見出しの除外）"""
+    items = []
+    for idx, title in enumerate(titles):
+        norm = dedup._normalize(title)
+        tokens = dedup._tokens(norm)
+        if len(tokens) >= dedup._MIN_TOKENS:
+            items.append((idx, {"title_ja": title}, norm, tokens, dedup._numbers(norm)))
+    return items
+
+
+def median_time(fn, items, rounds: int):
+    samples, result = [], None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = fn(items, dedup._JACCARD_MAIN)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples), [[m[0] for m in c] for c in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,200,1000,2000,5000")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    titles = load_titles()
+    if not titles:
+        print("docs/*.json に記事がありません")
+        return
+    print(f"コーパス: {len(titles)} 件")
+    has_numpy = importlib.util.find_spec("numpy") is not None
+    print(f"{'件数':>6}{'クラスタ':>8}{'総当たり':>12}{'転置インデックス':>16}{'NumPy':>10}")
+    for n in sorted({min(int(s), len(titles)) for s in args.sizes.split(",")}):
+        items = candidates_of(titles[:n])
+        t_pair, pairwise = median_time(dedup._cluster_pairwise, items, args.rounds)
+        t_index, indexed = median_time(dedup._cluster_indexed, items, args.rounds)
+        assert indexed == pairwise, "クラスタ分けが一致しない"
+        numpy_col = "-"
+        if has_numpy:
+            t_numpy, vectorized = median_time(dedup._cluster_numpy, items, args.rounds)
+            assert vectorized == pairwise, "クラスタ分けが一致しない（NumPy）"
+            numpy_col = f"{t_numpy * 1000:.1f}ms"
+        print(f"{n:>6}{len(indexed):>8}{t_pair * 1000:>10.1f}ms{t_index * 1000:>14.1f}ms{numpy_col:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""配信済み記事との近似重複チェックのベンチマーク（全件走査 vs MinHash-LSH）。
+
+アーカイブ済みの docs/*.json（日付ごとの配信記事）のうち、直近 --query-days 日分を
+「今日の候補」、それより前の N 日分を配信履歴として delivered_index.DeliveredIndex に
+登録し（本番と同じく期間外は prune 済み）、候補を照合する。全件走査（期間内の全記事と
+dedup._is_similar で比較）、DeliveredIndex（履歴が _LINEAR_MAX 件以下なら全件、超えたら LSH）、
+LSH のみ（同じバケットの記事だけ比較）の1件あたりの照会時間と、重複と判定した件数を比べる。
+LSH の取りこぼしは、照会と Jaccard が dedup の境界帯（_JACCARD_BORDER）以上の見出しを持つ
+記事のうち、LSH の候補に入った割合（候補化率）で示す。
+
+Usage:
+    python benchmarks/bench_delivered_index.py [--windows 3,14,60,365] [--query-days 5]
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup
+import delivered_index
+from config import PROJECT_ROOT
+from delivered_index import DeliveredIndex, _item, _views
+
+
+def load_days() -> list[tuple[str, list[dict]]]:
+    days = []
+    for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, "docs", "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):  # 読めない・壊れた JSON は飛ばす
+            continue
+        name = os.path.basename(path)[:-len(".json")]
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", name) and isinstance(data, dict) and data.get("articles"):
+            days.append((name, data["articles"]))
+    return days
+
+
+def linear_match(history: list[tuple[str, list[str]]], article: dict, since: str, until: str) -> bool:
+    for view in _views(article):
+        if len(dedup._tokens(view)) < dedup._MIN_TOKENS:
+            continue
+        query = _item(view)
+        for date, views in history:
+            if since <= date < until and any(dedup._is_similar(query, _item(v), dedup._JACCARD_MAIN) for v in views):
+                return True
+    return False
+
+
+def border_recall(index: DeliveredIndex, queries: list[dict]) -> tuple[int, int]:
+    """(境界帯以上の組の数, そのうち LSH の候補に入った数)"""
+    total = found = 0
+    for article in queries:
+        for view in _views(article):
+            tokens = _item(view)[3]
+            if len(tokens) < dedup._MIN_TOKENS:
+                continue
+            sids = set(index.candidates(tokens))
+            for sid, story in index._stories.items():
+                if any(len(tokens & _item(v)[3]) / len(tokens | _item(v)[3]) >= dedup._JACCARD_BORDER
+                       for v in story["views"]):
+                    total += 1
+                    found += sid in sids
+    return total, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", default="3,14,60,365")
+    parser.add_argument("--query-days", type=int, default=5)
+    args = parser.parse_args()
+
+    days = load_days()
+    if len(days) <= args.query_days:
+        print(f"docs/*.json に {args.query_days + 1} 日分以上の記事がありません")
+        return
+    past, recent = days[:-args.query_days], days[-args.query_days:]
+    today = recent[0][0]
+    queries = [a for _, articles in recent for a in articles]
+    history = [(date, a) for date, articles in past for a in articles]
+    print(f"配信履歴 {len(history)} 件（{len(past)} 日分）/ 照会 {len(queries)} 件（{today} 以降）")
+    print(f"{'期間':>6}{'対象':>7}{'全件走査':>12}{'Index':>10}{'LSHのみ':>10}{'一致(全件/Index/LSH)':>22}"
+          f"{'候補化率':>10}")
+    until = today
+    linear_max = delivered_index._LINEAR_MAX
+    for window in (int(w) for w in args.windows.split(",")):
+        since = (datetime.date.fromisoformat(today) - datetime.timedelta(days=window)).isoformat()
+        index = DeliveredIndex(os.path.join(tempfile.mkdtemp(), "delivered.json"))
+        views = []
+        for date, a in history:
+            if since <= date < until:
+                index.add(a, date)
+                views.append((date, _views(a)))
+        per = 1000 / len(queries)
+        t0 = time.perf_counter()
+        linear = sum(linear_match(views, a, since, until) for a in queries)
+        t1 = time.perf_counter()
+        auto = sum(index.match(a, since, until) is not None for a in queries)
+        t2 = time.perf_counter()
+        delivered_index._LINEAR_MAX = -1
+        lsh = sum(index.match(a, since, until) is not None for a in queries)
+        t3 = time.perf_counter()
+        total, found = border_recall(index, queries)
+        delivered_index._LINEAR_MAX = linear_max
+        path = "全件" if len(index) <= linear_max else "LSH"
+        print(f"{window:>5}日{len(index):>7}{(t1 - t0) * per:>10.2f}ms{(t2 - t1) * per:>6.2f}ms({path})"
+              f"{(t3 - t2) * per:>8.2f}ms{linear:>12}/{auto}/{lsh}{found:>9}/{total}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""本文抽出のベンチマーク（スレッド内抽出 vs スレッド取得 + プロセスプール抽出）。
+
+article_extractor.enrich_with_full_text を、ダウンロードを模擬した状態で2方式で計測する。
+ダウンロード（_download_html）は --latency-ms 待ってから保存済み HTML を返す
+スタブに差し替えるため、ネットワークは使わない。HTML は --html-dir の *.html
+（実サイトから保存したページ）を使い、指定がなければ記事らしい合成ページを生成する。
+
+抽出は GIL を握る CPU 処理なので、スレッド方式はダウンロード完了後に直列化する。
+プロセス方式の効果は CPU コア数に比例する（1 コア環境では起動コストの分だけ遅い）。
+本番（_start_extract_pool）は CPU が1つならプールを使わないが、ここでは比較のため両方式を計測する。
+
+Usage:
+    python benchmarks/bench_extraction.py [--docs 15] [--latency-ms 300] [--rounds 3] [--html-dir DIR]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# 実キャッシュ（.cache/）を汚さないよう、config 読み込み前に一時ディレクトリへ向ける
+os.environ["NEWS_BOT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_extract_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import article_extractor
+
+_WORDS = [
+    "model", "training", "inference", "dataset", "benchmark", "agent", "reasoning", "compute", "cluster",
+    "latency", "research", "release", "open", "weights", "safety", "evaluation", "enterprise", "deployment",
+    "startup", "funding",
+]
+
+
+def synthetic_page(seed: int, paragraphs: int = 40) -> str:
+    """ナビ・広告・本文段落・関連リンクを含む記事ページ（実サイト程度の DOM の大きさ）。"""
+    rng = random.Random(seed)
+
+    def sentence():
+        return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(12, 24))).capitalize() + "."
+
+    nav = "".join(f'<li><a href="/c/{i}">Section {i}</a></li>' for i in range(30))
+    body = "".join(
+        f"<p>{' '.join(sentence() for _ in range(rng.randint(3, 6)))}</p>" for _ in range(paragraphs)
+    )
+    related = "".join(f'<div class="card"><a href="/a/{i}">{sentence()}</a></div>' for i in range(40))
+    return (
+        f"<html><head><title>Article {seed}</title></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        f'<div class="ad">Sponsored content</div>'
+        f"<article><h1>Article {seed}: {sentence()}</h1>{body}</article>"
+        f'<aside class="related">{related}</aside><footer>{nav}</footer></body></html>'
+    )
+
+
+def load_pages(html_dir: str | None, n: int) -> list[str]:
+    pages = []
+    if html_dir:
+        for path in sorted(glob.glob(os.path.join(html_dir, "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    if not pages:
+        pages = [synthetic_page(i) for i in range(n)]
+    return [pages[i % len(pages)] for i in range(n)]
+
+
+def run_once(pages: list[str], latency: float, use_pool: bool) -> tuple[float, int]:
+    by_url = {f"https://bench.example.com/{i}": html for i, html in enumerate(pages)}
+
+    def fake_fetch(url, **kwargs):
+        time.sleep(latency)
+        return by_url[url]
+
+    articles = [{"url": url, "source": "bench"} for url in by_url]
+    start_pool = article_extractor._start_extract_pool if use_pool else (lambda n: None)
+    with patch.object(article_extractor, "_download_html", fake_fetch), \
+            patch.object(article_extractor, "_start_extract_pool", start_pool), \
+            patch.object(article_extractor, "_FULLTEXT_CACHE_DIR", tempfile.mkdtemp()), \
+            patch.object(article_extractor, "_CPUS", max(2, article_extractor._CPUS)), \
+            patch.object(article_extractor, "_EXTRACT_WORKERS", max(2, article_extractor._EXTRACT_WORKERS)), \
+            contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        article_extractor.enrich_with_full_text(
+            articles, top_n=len(articles), domain_stats_path=os.path.join(tempfile.mkdtemp(), "d.json")
+        )
+        elapsed = time.perf_counter() - t0
+    return elapsed, sum(1 for a in articles if a.get("full_text"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=15)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--html-dir", default=None)
+    args = parser.parse_args()
+
+    pages = load_pages(args.html_dir, args.docs)
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"文書 {len(pages)} 件（平均 {avg_kb:.0f}KB）/ 取得遅延 {args.latency_ms:.0f}ms / CPU {os.cpu_count()} コア")
+    for label, use_pool in (("thread", False), ("process", True)):
+        samples, extracted = [], 0
+        for _ in range(args.rounds):
+            elapsed, extracted = run_once(pages, args.latency_ms / 1000, use_pool)
+            samples.append(elapsed)
+        print(f"  {label:<8} 中央値 {statistics.median(samples):.2f}s（抽出成功 {extracted}/{len(pages)}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""見出し特徴量キャッシュのベンチマーク（毎回計算 vs features.text_features のキャッシュ）。
+
+Stage 2 で見出しを扱う処理（配信済みとの照合 → 重複束ね → 配信済みへの登録）を
+アーカイブ済みの docs/*.json で再現する。直近 --days 日を1日ずつ「その日の候補」とし、
+それより前の --window 日分を配信済みインデックスに入れて照合する。
+
+キャッシュなしは dedup / delivered_index の text_features を lru_cache を外した関数に
+差し替えて計測する。見出しのトークン化回数、tracemalloc で測った確保メモリのピーク
+（照合・束ね・登録の間に同時に確保されていた量）と処理後も残る量（配信済みインデックスの
+増分とキャッシュが保持する特徴量を含む）、所要時間を比べ、
+除外・束ねの結果が一致することも確認する。
+
+Usage:
+    python benchmarks/bench_features.py [--days 5] [--window 14]
+"""
+
+import argparse
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup
+import delivered_index
+import features
+from config import PROJECT_ROOT
+from delivered_index import DeliveredIndex
+
+
+def load_days() -> list[tuple[str, list[dict]]]:
+    days = []
+    for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, "docs", "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):  # 読めない・壊れた JSON は飛ばす
+            continue
+        name = os.path.basename(path)[:-len(".json")]
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", name) and isinstance(data, dict) and data.get("articles"):
+            days.append((name, data["articles"]))
+    return days
+
+
+def stage2(index: DeliveredIndex, day: str, articles: list[dict], window: int) -> tuple[int, int]:
+    """配信済みとの照合 → 重複束ね → 登録（curate_morning_brief と同じ順）。(除外数, 束ねた後の件数)"""
+    since = (datetime.date.fromisoformat(day) - datetime.timedelta(days=window)).isoformat()
+    kept = [a for a in articles if index.match(a, since, day) is None]
+    merged = dedup.dedup_articles(kept)
+    for a in merged[:10]:
+        index.add(a, day)
+    return len(articles) - len(kept), len(merged)
+
+
+def run(days, history, args, cached: bool) -> dict:
+    fn = features.text_features if cached else features.text_features.__wrapped__
+    dedup.text_features = delivered_index.text_features = fn
+    features.text_features.cache_clear()
+    calls = [0]
+    tokens = features._tokens
+
+    def counting(norm):
+        calls[0] += 1
+        return tokens(norm)
+
+    index = DeliveredIndex(os.path.join(tempfile.mkdtemp(), "delivered.json"))
+    for date, articles in history:
+        for a in articles:
+            index.add(a, date)
+    features._tokens = counting
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [stage2(index, day, articles, args.window) for day, articles in days]
+    elapsed = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    features._tokens = tokens
+    return {
+        "calls": calls[0], "peak": peak, "retained": retained,
+        "time": elapsed, "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--window", type=int, default=14)
+    args = parser.parse_args()
+
+    all_days = load_days()
+    if len(all_days) <= args.days:
+        print(f"docs/*.json に {args.days + 1} 日分以上の記事がありません")
+        return
+    days = all_days[-args.days:]
+    first = datetime.date.fromisoformat(days[0][0])
+    oldest = (first - datetime.timedelta(days=args.window)).isoformat()
+    history = [(d, a) for d, a in all_days[:-args.days] if d >= oldest]
+    print(f"候補 {sum(len(a) for _, a in days)} 件（{len(days)} 日分）/ 配信済み {sum(len(a) for _, a in history)} 件")
+    # sys.intern の表が育つ分を計測に含めないよう、同じ見出しを一度通しておく
+    run(days, history, args, cached=False)
+    print(f"{'':>10}{'トークン化':>10}{'ピーク':>12}{'残存':>12}{'時間':>10}")
+    plain = run(days, history, args, cached=False)
+    cached = run(days, history, args, cached=True)
+    assert plain["results"] == cached["results"], "除外・束ねの結果が一致しない"
+    for label, r in (("キャッシュなし", plain), ("キャッシュあり", cached)):
+        print(f"{label:>10}{r['calls']:>12}{r['peak'] / 1024:>10.0f}KiB{r['retained'] / 1024:>10.0f}KiB"
+              f"{r['time'] * 1000:>8.1f}ms")
+    print(f"キャッシュ: {features.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""キーワードスコアリングのベンチマーク（旧: 選言正規表現 vs keyword_matcher の Aho-Corasick）。
+
+アーカイブ済みの docs/*.json（配信済み記事のタイトル・要約）をコーパスにして、
+Stage 1 と同じ「タイトル + 概要」を両方式で採点し、所要時間とスコアの違いを出す。
+旧方式はマッチ数、新方式は重み × タイトル/概要倍率の合計なので値そのものは比べず、
+「0 点になった記事」と「旧方式だけが拾った部分一致」（"AI" in "maintain" 等）の件数を示す。
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [--rounds 5] [--repeat 1]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    AI_KEYWORDS,
+    KEYWORD_BODY_WEIGHT,
+    KEYWORD_TITLE_WEIGHT,
+    KEYWORD_WEIGHTS,
+    PROJECT_ROOT,
+)
+from keyword_matcher import KeywordMatcher
+
+
+def load_corpus(repeat: int) -> list[tuple[str, str]]:
+    docs = []
+    for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, "docs", "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):  # 読めない・壊れた JSON は飛ばす
+            continue
+        for a in data.get("articles", []) if isinstance(data, dict) else []:
+            docs.append((a.get("title") or "", a.get("summary") or ""))
+    return docs * repeat
+
+
+def time_it(fn, docs, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for title, summary in docs:
+            fn(title, summary)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=1, help="コーパスを何倍に水増しするか")
+    args = parser.parse_args()
+
+    docs = load_corpus(args.repeat)
+    if not docs:
+        print("docs/*.json に記事がありません")
+        return
+    chars = sum(len(t) + len(s) + 1 for t, s in docs)
+
+    t0 = time.perf_counter()
+    pattern = re.compile("|".join(re.escape(kw) for kw in AI_KEYWORDS), re.IGNORECASE)
+    regex_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    matcher = KeywordMatcher(AI_KEYWORDS, KEYWORD_WEIGHTS, KEYWORD_TITLE_WEIGHT, KEYWORD_BODY_WEIGHT)
+    ac_build = time.perf_counter() - t0
+
+    def regex_score(title, summary):
+        return len(pattern.findall(title + " " + summary))
+
+    regex_t = time_it(regex_score, docs, args.rounds)
+    ac_t = time_it(matcher.score, docs, args.rounds)
+
+    old = [regex_score(t, s) for t, s in docs]
+    new = [matcher.score(t, s) for t, s in docs]
+    old_matches = sum(old)
+    new_matches = sum(len(matcher.find(t)) + len(matcher.find(s)) for t, s in docs)
+
+    print(f"コーパス: {len(docs)} 記事 / {chars:,} 文字（docs/*.json × {args.repeat}）")
+    print(f"{'方式':<18}{'構築':>10}{'採点(中央値)':>14}{'記事あたり':>12}")
+    print(f"{'regex (旧)':<18}{regex_build * 1000:>8.2f}ms{regex_t * 1000:>12.1f}ms"
+          f"{regex_t / len(docs) * 1e6:>10.1f}µs")
+    print(f"{'aho-corasick':<18}{ac_build * 1000:>8.2f}ms{ac_t * 1000:>12.1f}ms"
+          f"{ac_t / len(docs) * 1e6:>10.1f}µs")
+    print(f"マッチ総数: 旧 {old_matches} → 新 {new_matches}（部分一致・重複マッチの除外分 {old_matches - new_matches}）")
+    print(f"0 点の記事: 旧 {sum(1 for v in old if v == 0)} → 新 {sum(1 for v in new if v == 0)}")
+
+
+if __name__ == "__main__":
+    main()
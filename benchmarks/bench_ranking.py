@@ -0,0 +1,72 @@
+"""候補選択のベンチマーク（全件 sorted()[:k] vs ranking.top_k / ranking.TopK）。
+
+フィード追加で候補が数千件規模に増えたときの伸びを見るため、Stage 1 と同じ
+relevance_key（関連度スコア → 公開日時）を持つ合成記事を件数を変えて生成し、
+上位 30 件（Stage 1 → Gemini 入力）を選ぶ時間を比べる。結果が同一であることも確認する。
+
+Usage:
+    python benchmarks/bench_ranking.py [--sizes 1000,5000,20000,100000] [--k 30] [--rounds 5]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import TopK, relevance_key, top_k
+
+
+def make_articles(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.UTC)
+    articles = []
+    for i in range(n):
+        published = None if rng.random() < 0.02 else now - datetime.timedelta(minutes=rng.randint(0, 1440))
+        articles.append({"id": i, "_relevance": rng.choice([0, 0, 0.5, 1, 2, 3.5]), "published": published})
+    return articles
+
+
+def median_time(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000,100000")
+    parser.add_argument("--k", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    def full_sort(items):
+        return sorted(items, key=relevance_key, reverse=True)[:args.k]
+
+    def stream(items):
+        top = TopK(args.k, relevance_key)
+        for a in items:
+            top.push(a)
+        return top.items()
+
+    print(f"{'候補数':>8}{'sorted()[:k]':>15}{'top_k':>12}{'TopK(逐次)':>14}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        items = make_articles(n)
+        expected = [a["id"] for a in full_sort(items)]
+        assert [a["id"] for a in top_k(items, args.k, relevance_key)] == expected
+        assert [a["id"] for a in stream(items)] == expected
+        t_sort = median_time(lambda items=items: full_sort(items), args.rounds)
+        t_heap = median_time(lambda items=items: top_k(items, args.k, relevance_key), args.rounds)
+        t_stream = median_time(lambda items=items: stream(items), args.rounds)
+        print(f"{n:>8}{t_sort * 1000:>13.2f}ms{t_heap * 1000:>10.2f}ms{t_stream * 1000:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
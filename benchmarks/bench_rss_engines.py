@@ -0,0 +1,124 @@
+"""RSS 取得エンジンのベンチマーク（スレッドプール vs asyncio 接続プール）。
+
+ローカルのスタブ HTTP サーバーに config.RSS_FEEDS と同じホスト構成
+（同一ホストのフィードは同じループバックアドレス 127.0.0.k に割り当て）で
+フィードを配置し、rss_client.collect_from_rss_feeds を両エンジンで計測する。
+スタブは接続ごとに --handshake-ms、リクエストごとに --latency-ms の遅延を入れて
+TLS ハンドシェイクとサーバー応答時間を模擬する（keep-alive の効果が見える）。
+
+Usage:
+    python benchmarks/bench_rss_engines.py [--rounds 3] [--latency-ms 40] [--handshake-ms 60]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# 実キャッシュ（.cache/）・リポジトリの状態ファイルを汚さないよう、config 読み込み前に一時ディレクトリへ向ける
+os.environ["NEWS_BOT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_rss_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import rss_client
+
+# 学習したフィード状態（Git 管理下の feed_state.json）も一時ディレクトリに書く
+_STATE_PATH = os.path.join(config.CACHE_DIR, "feed_state.json")
+
+_ITEMS_PER_FEED = 30
+
+
+def _rss_body(n_items: int) -> bytes:
+    items = "".join(
+        f"<item><title>AI model update number {i}</title>"
+        f"<link>https://example.com/{i}</link>"
+        f"<pubDate>Mon, 23 Mar 2026 {i % 24:02d}:00:00 GMT</pubDate>"
+        f"<description>Large language model news item {i}</description></item>"
+        for i in range(n_items)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Stub</title>{items}</channel></rss>"
+    ).encode()
+
+
+def _make_handler(latency: float, handshake: float, body: bytes):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive を有効にする
+
+        def setup(self):
+            time.sleep(handshake)  # 新規接続ごとのハンドシェイク相当
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _stub_feeds(port: int) -> list[dict]:
+    """実フィードのホスト構成を保ったまま、URL をローカルスタブへ書き換える。"""
+    hosts: dict[str, str] = {}
+    feeds = []
+    for i, feed in enumerate(config.RSS_FEEDS):
+        host = urlsplit(feed["url"]).hostname or ""
+        addr = hosts.setdefault(host, f"127.0.0.{len(hosts) % 250 + 1}")
+        feeds.append({**feed, "url": f"http://{addr}:{port}/{i}.xml"})
+    return feeds
+
+
+def _run(engine: str) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 見送りスケジューラを切り、毎回全フィードを取得して計測する
+        articles = rss_client.collect_from_rss_feeds(engine=engine, schedule=False, state_path=_STATE_PATH)
+    elapsed = time.perf_counter() - start
+    assert len(articles) == len(rss_client.RSS_FEEDS) * _ITEMS_PER_FEED, len(articles)
+    return elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--latency-ms", type=float, default=40)
+    ap.add_argument("--handshake-ms", type=float, default=60)
+    args = ap.parse_args()
+
+    handler = _make_handler(args.latency_ms / 1000, args.handshake_ms / 1000, _rss_body(_ITEMS_PER_FEED))
+    server = ThreadingHTTPServer(("0.0.0.0", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rss_client.RSS_FEEDS = _stub_feeds(server.server_address[1])
+
+    print(f"feeds={len(rss_client.RSS_FEEDS)} items/feed={_ITEMS_PER_FEED} "
+          f"latency={args.latency_ms}ms handshake={args.handshake_ms}ms")
+    for engine in ("thread", "async"):
+        # 条件付き GET・前回の取得結果（フィード状態・既読インデックス）が効かないよう、毎回空にして計測する
+        times = []
+        for _ in range(args.rounds):
+            for name in ("feed_validators.json", "seen_entries.json", "feed_state.json"):
+                path = os.path.join(config.CACHE_DIR, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            times.append(_run(engine))
+        print(f"{engine:>6}: median {statistics.median(times):.3f}s  (runs: "
+              + ", ".join(f"{t:.3f}" for t in times) + ")")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
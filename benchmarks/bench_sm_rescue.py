@@ -0,0 +1,79 @@
+"""境界帯の SequenceMatcher 救済のベンチマーク（毎回 ratio() vs 安い上限から順に確かめる段階判定）。
+
+アーカイブ済みの docs/*.json の見出しから、dedup._is_similar が救済判定に進む組
+（数値が食い違わず、トークン Jaccard が _JACCARD_BORDER 以上 _JACCARD_MAIN 未満）を集め、
+
+- 従来: SequenceMatcher(None, a, b).ratio() >= _SM_RESCUE
+- 段階判定: dedup._sm_rescue（長さの比 → quick_ratio → ratio）
+
+の所要時間を比べる。判定が全組で一致することと、各段で決まった件数も表示する。
+
+Usage:
+    python benchmarks/bench_sm_rescue.py [--rounds 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_dedup import candidates_of, load_titles
+
+import dedup
+
+
+def border_pairs(items: list[tuple]) -> list[tuple[str, str]]:
+    """_is_similar が救済判定に進む見出しの組（正規化済み）"""
+    pairs = []
+    for pos, near in enumerate(dedup._near_indexed(items, dedup._JACCARD_BORDER)):
+        a = items[pos]
+        for other, shared in near.items():
+            b = items[other]
+            if a[4] and b[4] and a[4] != b[4]:
+                continue
+            j = shared / (len(a[3]) + len(b[3]) - shared)
+            if dedup._JACCARD_BORDER <= j < dedup._JACCARD_MAIN:
+                pairs.append((a[2], b[2]))
+    return pairs
+
+
+def median_time(fn, pairs, rounds: int):
+    samples, result = [], None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = [fn(a, b) for a, b in pairs]
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    items = candidates_of(load_titles())
+    pairs = border_pairs(items)
+    if not pairs:
+        print("docs/*.json に境界帯の見出しの組がありません")
+        return
+    print(f"見出し {len(items)} 件 / 境界帯の組 {len(pairs)} 件")
+    t_full, full = median_time(
+        lambda a, b: SequenceMatcher(None, a, b).ratio() >= dedup._SM_RESCUE, pairs, args.rounds
+    )
+    before = dict(dedup.RESCUE_STATS)
+    t_tiered, tiered = median_time(dedup._sm_rescue, pairs, args.rounds)
+    assert tiered == full, "救済の判定が一致しない"
+    counts = {k: (dedup.RESCUE_STATS[k] - before[k]) // args.rounds for k in before}
+    print(f"  ratio() のみ  {t_full * 1000:8.1f}ms")
+    print(f"  段階判定      {t_tiered * 1000:8.1f}ms  （救済 {sum(full)} 組）")
+    print(f"  段ごとの件数: 長さで除外 {counts['length']} / quick_ratio で除外 {counts['quick']}"
+          f" / ratio まで計算 {counts['full']}")
+
+
+if __name__ == "__main__":
+    main()
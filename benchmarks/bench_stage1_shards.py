@@ -0,0 +1,122 @@
+"""Stage 1 Gemini 分析のベンチマーク（1回の呼び出し vs 分割・並列）。
+
+ローカルに Gemini API（generateContent）を模した偽サーバーを立て、GEMINI_BASE_URL で
+ai_client をそこへ向けて process_with_gemini の所要時間を計測する。ネットワーク・API キーは不要。
+
+偽サーバーの応答時間 = --base-ms + 入力 1000 トークンあたり --prefill-ms
++ 出力1件あたり --per-item-ms（出力の長さが支配的な実 API の傾向を模す）。
+応答は要求された件数（プロンプトの「必ずN件」）の分析結果で、importance_score は
+タイトルから決まる値なので、分割の有無で選ばれる記事の重なりも確認できる。
+--shards は実際の分割数（候補が _MIN_SHARD_ARTICLES 件 × 分割数に満たなければ減る）に
+直してから重複を除いて計測する。LLM 応答キャッシュは使わない（毎回偽サーバーを呼ぶ）。
+
+Usage:
+    python benchmarks/bench_stage1_shards.py [--articles 30] [--shards 1,2,3,4] [--per-item-ms 400]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 応答キャッシュ（.cache/llm）に当たらないよう、config 読み込み前に一時ディレクトリへ向けて
+# キャッシュの読み出しも止める（前の計測と同じプロンプトになるシャードを偽サーバーに投げ直す）
+os.environ["NEWS_BOT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_shards_")
+os.environ["LLM_CACHE"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _score(title: str) -> int:
+    return int(hashlib.md5(title.encode()).hexdigest(), 16) % 10 + 1
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    base = prefill = per_item = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["contents"][0]["parts"][0]["text"]
+        titles = re.findall(r"^タイトル: (.*)$", prompt, re.MULTILINE)
+        n_out = min(len(titles), int(re.search(r"必ず(\d+)件", prompt).group(1)))
+        from prompt_packer import estimate_tokens
+        time.sleep(self.base + self.prefill * estimate_tokens(prompt) / 1000 + self.per_item * n_out)
+        ranked = sorted(range(len(titles)), key=lambda i: -_score(titles[i]))[:n_out]
+        results = [
+            {
+                "index": i + 1, "title_ja": titles[i], "summary_ja": "要約" * 100, "one_liner": "核心",
+                "why_important": "影響", "action_item": "行動", "category": "研究・技術",
+                "importance_score": _score(titles[i]), "reason": "理由",
+            }
+            for i in ranked
+        ]
+        payload = json.dumps({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": json.dumps(results, ensure_ascii=False)}]}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_articles(n: int) -> list[dict]:
+    return [
+        {
+            "title": f"AI news {i}", "source": f"Source{i % 7}", "region": "米国",
+            "url": f"https://bench.example.com/{i}", "summary": "model release " * 60,
+            "published": f"2026-01-01T{i % 24:02d}:00:00+00:00",
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=30)
+    parser.add_argument("--shards", default="1,2,3,4")
+    parser.add_argument("--base-ms", type=float, default=300)
+    parser.add_argument("--prefill-ms", type=float, default=50)
+    parser.add_argument("--per-item-ms", type=float, default=400)
+    args = parser.parse_args()
+
+    FakeGemini.base = args.base_ms / 1000
+    FakeGemini.prefill = args.prefill_ms / 1000
+    FakeGemini.per_item = args.per_item_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGemini)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    import ai_client
+
+    articles = make_articles(args.articles)
+    baseline = None
+    print(f"候補 {args.articles} 件 / 出力1件 {args.per_item_ms:.0f}ms / 固定 {args.base_ms:.0f}ms")
+    # process_with_gemini が実際に使う分割数に直し、同じ分割数は1回だけ計測する
+    effective = {max(1, min(int(s), args.articles // ai_client._MIN_SHARD_ARTICLES)) for s in args.shards.split(",")}
+    for shards in sorted(effective):
+        # 計測ごとに空の分析結果ストア（前の計測の分析を再利用させない）
+        store_path = os.path.join(os.environ["NEWS_BOT_CACHE_DIR"], f"analysis_{shards}.json")
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = ai_client.process_with_gemini(articles, shards=shards, store_path=store_path)
+        elapsed = time.perf_counter() - t0
+        urls = {a["url"] for a in result}
+        baseline = baseline or urls
+        print(f"  shards={shards}  {elapsed:6.2f}s  選定 {len(result)} 件（1回呼び出しとの一致 {len(urls & baseline)}）")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,26 @@
 import os
-import re
 import json
 import time
 import datetime
-from rss_client import collect_from_rss_feeds
+from rss_client import collect_from_rss_feeds, iter_rss_articles
 from ai_client import process_with_gemini
-from article_extractor import enrich_with_full_text
-from config import NEWS_BOT_OUTPUT_DIR, AI_KEYWORDS, JST
+from article_extractor import FullTextPrefetcher, enrich_with_full_text
+from config import (
+    NEWS_BOT_OUTPUT_DIR, AI_KEYWORDS, JST, STAGE1_STREAMING, FULLTEXT_DEADLINE_SEC,
+    KEYWORD_WEIGHTS, KEYWORD_TITLE_WEIGHT, KEYWORD_BODY_WEIGHT,
+)
+from keyword_matcher import KeywordMatcher
+from ranking import TopK, rank, relevance_key, top_k
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# キーワードを正規表現パターンに事前コンパイル（大文字小文字無視）
-_KEYWORD_PATTERN = re.compile(
-    "|".join(re.escape(kw) for kw in AI_KEYWORDS),
-    re.IGNORECASE,
+# キーワードをオートマトンに事前コンパイル（大文字小文字無視・英単語境界・最左最長）
+_KEYWORD_MATCHER = KeywordMatcher(
+    AI_KEYWORDS,
+    weights=KEYWORD_WEIGHTS,
+    title_weight=KEYWORD_TITLE_WEIGHT,
+    body_weight=KEYWORD_BODY_WEIGHT,
 )
 
 
@@ -25,53 +31,93 @@ def filter_by_time(articles, hours=24):
     return filtered
 
 
+def _score_article(a):
+    """1記事の関連度（キーワード重み × タイトル/概要の倍率の合計）を _relevance に付与する"""
+    a['_relevance'] = round(_KEYWORD_MATCHER.score(a.get('title', ''), a.get('summary', '')), 2)
+    return a
+
+
 def score_articles(articles):
-    """キーワードマッチングで関連度スコアを算出する（正規表現で高速化）"""
-    scored = []
-    for a in articles:
-        text = (a.get('title', '') + " " + a.get('summary', ''))
-        matches = _KEYWORD_PATTERN.findall(text)
-        a['_relevance'] = len(matches)
-        scored.append(a)
-
-    # AI関連度 > 0 を優先、次に公開日時の降順
-    scored.sort(
-        key=lambda x: (
-            x['_relevance'] > 0,
-            x.get('published', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-            or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc),
-        ),
-        reverse=True,
-    )
-    return scored
+    """キーワードマッチングで関連度スコアを算出し、関連度スコア（重み付き）→ 公開日時の降順に並べる"""
+    return rank([_score_article(a) for a in articles], relevance_key)
 
 
-def main():
-    start = time.time()
-    print("=== Hybrid News Collection Start ===")
+def stream_top_articles(articles, hours=24, k=30, prefetcher=None, prefetch_n=15):
+    """記事ストリームに時間フィルタ・スコアリングを逐次適用し、上位 k 件だけ保持する
 
-    print("1. Fetching RSS Feeds...")
-    articles = collect_from_rss_feeds()
+    filter_by_time → score_articles → [:k] と同じ結果（同点は到着順）を、
+    全記事をリストに溜めずに求める。保持するのは常に k 件のヒープ（ranking.TopK）だけなので
+    ピークメモリはフィード総量に依存せず、スコアリングは取得と並行して進む。
 
-    # Simple Time Filter (24h)
-    print("2. Filtering by Time (24h)...")
-    articles = filter_by_time(articles)
-    print(f"-> {len(articles)} articles remaining.")
+    prefetcher（article_extractor.FullTextPrefetcher）を渡すと、本文を得られる見込みのある
+    記事（prefetcher.accepts）のうち暫定の上位 prefetch_n 件に入ったものの本文取得を
+    その場で始め、押し出された記事の取得は取り消す。上位 k 件から外れた記事の枠の
+    取り直しなどの最終調整は、呼び出し側が prefetcher.retarget で行う。
 
-    if not articles:
-        print("No recent articles found.")
-        return
+    Returns:
+        (上位 k 件のリスト, 時間フィルタを通過した件数)
+    """
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=hours)
+    top = TopK(k, relevance_key)
+    front = TopK(prefetch_n, relevance_key) if prefetcher is not None else None
+    recent = 0
+    for a in articles:
+        if not (a.get('published') and a['published'] >= cutoff):
+            continue
+        recent += 1
+        kept, _ = top.push(_score_article(a))
+        if front is not None and kept and prefetcher.accepts(a):
+            entered, evicted = front.push(a)
+            if entered:
+                prefetcher.submit(a)
+            if evicted is not None:
+                prefetcher.cancel(evicted)
+    return top.items(), recent
 
-    print("3. Prioritizing AI-related articles...")
-    scored_articles = score_articles(articles)
 
-    # Take top 30 relevant/newest for Gemini
-    input_articles = scored_articles[:30]
-    print(f"-> Selected {len(input_articles)} articles for Gemini analysis (Priority: AI Relevance).")
+def main():
+    start = time.time()
+    print("=== Hybrid News Collection Start ===")
 
-    # 3.5. 上位記事の本文を取得して判断材料を厚くする（失敗時は RSS 要約で代替）
-    print("3.5. Fetching full article text for top items...")
-    enrich_with_full_text(input_articles, top_n=15)
+    # 収集窓（24h）を渡し、既読インデックス上の古い既知エントリを正規化前に読み飛ばす
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=24)
+
+    if STAGE1_STREAMING:
+        # 取得・時間フィルタ・スコアリングをフィード到着順に逐次処理し、上位30件だけ保持。
+        # 上位15件に入った記事の本文はその時点から並行して取得する（3.5 を前倒し）
+        print("1-3. Streaming RSS feeds → time filter (24h) → AI-relevance top 30 (+ body prefetch)...")
+        prefetcher = FullTextPrefetcher(expected=15)
+        input_articles, recent_count = stream_top_articles(
+            iter_rss_articles(since=since), k=30, prefetcher=prefetcher, prefetch_n=15,
+        )
+        print(f"-> {recent_count} articles within 24h.")
+        print(f"3.5. Waiting for prefetched article bodies (deadline {FULLTEXT_DEADLINE_SEC}s)...")
+        prefetcher.retarget(input_articles, 15)
+        prefetcher.finish(timeout=FULLTEXT_DEADLINE_SEC)
+        if not input_articles:
+            print("No recent articles found.")
+            return
+    else:
+        print("1. Fetching RSS Feeds...")
+        articles = collect_from_rss_feeds(since=since)
+
+        # Simple Time Filter (24h)
+        print("2. Filtering by Time (24h)...")
+        articles = filter_by_time(articles)
+        print(f"-> {len(articles)} articles remaining.")
+
+        if not articles:
+            print("No recent articles found.")
+            return
+
+        print("3. Prioritizing AI-related articles...")
+        # Take top 30 relevant/newest for Gemini（全件ソートせずヒープで上位のみ選ぶ）
+        input_articles = top_k([_score_article(a) for a in articles], 30, relevance_key)
+
+        # 3.5. 上位記事の本文を取得して判断材料を厚くする（失敗時は RSS 要約で代替）
+        print("3.5. Fetching full article text for top items...")
+        enrich_with_full_text(input_articles, top_n=15, timeout=FULLTEXT_DEADLINE_SEC)
+    print(f"-> Selected {len(input_articles)} articles for Gemini analysis (Priority: AI Relevance).")
 
     print("4. Processing with Gemini (AI Trend Analyst Mode)...")
     processed = process_with_gemini(input_articles)
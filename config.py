@@ -11,6 +11,35 @@ GEMINI_MODEL = "gemini-3.7-flash"
 # 1次分析・2次キュレーションに渡す上位記事数（ソース増加に対応・config 集約）
 STAGE1_MAX_ARTICLES = 50
 
+# Stage 1 プロンプトの記事部分に使う入力トークン予算（概算。超える分は本文を比例して削る）
+STAGE1_INPUT_TOKEN_BUDGET = int(os.environ.get("STAGE1_INPUT_TOKEN_BUDGET", "40000"))
+
+# Stage 1 の Gemini 分析を何分割して並列に投げるか（上限。既定の 1 は従来どおり1回の呼び出し）。
+# 分割すると各シャードが上位候補を多めに返すので出力（課金）が約2倍になり、シャードごとに
+# 付けたスコアをそのまま比べることになる。1回の呼び出しが長すぎるときだけ明示的に指定する
+STAGE1_SHARDS = int(os.environ.get("STAGE1_SHARDS", "1"))
+
+# Gemini API の接続先（未設定なら既定。ベンチマークではローカルの偽サーバーを指す）
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL") or None
+
+# Gemini 応答のディスクキャッシュ（llm_client）。0 でキャッシュを読まずに呼び出す（結果は保存し直す）
+LLM_CACHE = os.environ.get("LLM_CACHE", "1") != "0"
+
+# RSS 取得エンジン: "thread"（feedparser + スレッドプール）/ "async"（httpx + ホスト別接続プール）
+RSS_FETCH_ENGINE = os.environ.get("RSS_FETCH_ENGINE", "thread")
+
+# Stage 1 をストリーミング処理にする（取得・時間フィルタ・スコアリングを逐次適用し上位のみ保持）
+STAGE1_STREAMING = os.environ.get("STAGE1_STREAMING", "1") != "0"
+
+# 記事本文の取得で読み込む最大バイト数（超えたら打ち切ってそこまでの HTML から抽出）
+ARTICLE_MAX_DOWNLOAD_BYTES = int(os.environ.get("ARTICLE_MAX_DOWNLOAD_BYTES", str(1_500_000)))
+
+# 本文取得の締め切り（秒）。これまでに揃った本文だけを Gemini に渡し、残りは RSS 要約で代替
+FULLTEXT_DEADLINE_SEC = float(os.environ.get("FULLTEXT_DEADLINE_SEC", "20"))
+
+# 低頻度フィードの取得を見送るスケジューラ（feed_scheduler）。0 で毎回全フィードを取得
+FEED_SCHEDULER = os.environ.get("FEED_SCHEDULER", "1") != "0"
+
 # ===========================
 # 設定
 # ===========================
@@ -276,12 +305,48 @@ AI_KEYWORDS = [
     "大语言模型", "生成式AI", "人工智能", "AI大模型",
 ]
 
+# キーワードごとの重み（keyword_matcher。ここにないキーワードは 1.0）
+# AI 以外の記事にも頻出する一般語・大企業名は弱め、AI 固有の語は強めにする
+KEYWORD_WEIGHTS = {
+    "breakthrough": 0.5, "inference": 0.5, "funding": 0.5, "deployment": 0.5,
+    "adoption": 0.5, "retrieval": 0.5, "embedding": 0.5, "reasoning": 0.5, "open source": 0.5,
+    "Microsoft": 0.5, "Google": 0.5, "Meta": 0.5, "NVIDIA": 0.5, "ByteDance": 0.5,
+    "字节跳动": 0.5, "百度": 0.5, "阿里": 0.5, "腾讯": 0.5,
+    "API": 0.5, "規制": 0.5, "ガイドライン": 0.5, "著作権": 0.5, "雇用": 0.5,
+    "資金調達": 0.5, "推論": 0.5, "自動生成": 0.5,
+    "生成AI": 1.5, "LLM": 1.5, "大規模言語モデル": 1.5, "AGI": 1.5, "AI agent": 1.5,
+}
+# タイトル／概要でのマッチに掛ける倍率（タイトルに出る語ほど記事の主題に近い）
+KEYWORD_TITLE_WEIGHT = 2.0
+KEYWORD_BODY_WEIGHT = 1.0
+
 # ルートディレクトリ
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
 # 出力ファイルパス
 NEWS_BOT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
 
+# フィードごとに学習した状態（feeds.json の隣に置き、Git 管理下で実行間に引き継ぐ）
+FEED_STATE_PATH = os.path.join(PROJECT_ROOT, "feed_state.json")
+
+# 本文取得のドメイン別成功率・所要時間（同じく Git 管理下）
+DOMAIN_STATS_PATH = os.path.join(PROJECT_ROOT, "domain_stats.json")
+
+# 記事ごとの Gemini 1次分析結果（Stage 1 → Stage 2 で再分析しないよう、同じく Git 管理下）
+ANALYSIS_STORE_PATH = os.path.join(PROJECT_ROOT, "analysis_store.json")
+
+# 配信済み記事の MinHash-LSH インデックス（delivered_index）と、近似重複を除外する期間（日）
+DELIVERED_INDEX_PATH = os.path.join(NEWS_BOT_OUTPUT_DIR, "delivered_index.json")
+DELIVERED_DEDUP_DAYS = int(os.environ.get("DELIVERED_DEDUP_DAYS", "14"))
+
+# 重複束ねで共通トークン数を求める方式: "python"（転置インデックス）/ "numpy"（行列積。NumPy が必要）
+DEDUP_BACKEND = os.environ.get("DEDUP_BACKEND", "python")
+
+# 実行間で再利用するキャッシュ（Git 管理外。環境変数で置き場所を変更可能）。
+# GitHub Actions では各ワークフローの actions/cache/restore・save ステップが実行をまたいで引き継ぐ
+# （失敗した実行の分も保存する）
+CACHE_DIR = os.environ.get("NEWS_BOT_CACHE_DIR") or os.path.join(PROJECT_ROOT, ".cache")
+
 
 # ===========================
 # RSS フィード外部ファイル読み込み（L8: 動的管理）
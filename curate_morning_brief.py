@@ -13,11 +13,13 @@ import glob
 import sys
 import time
 import datetime
-from google import genai
 from google.genai import types
 from dotenv import load_dotenv
-from config import NEWS_BOT_OUTPUT_DIR, JST, GEMINI_MODEL, STAGE1_MAX_ARTICLES
+from config import NEWS_BOT_OUTPUT_DIR, JST, STAGE1_MAX_ARTICLES, DELIVERED_DEDUP_DAYS, DELIVERED_INDEX_PATH
 from dedup import dedup_articles
+from delivered_index import DeliveredIndex
+from llm_client import generate, make_client, print_cache_stats
+from ranking import importance_key, rank, top_k
 
 load_dotenv()
 
@@ -88,6 +90,43 @@ def get_delivered_urls(days=3):
     return delivered
 
 
+def load_delivered_index(days=DELIVERED_DEDUP_DAYS, today=None, path=DELIVERED_INDEX_PATH):
+    """配信済み記事の LSH インデックスを読み込む（初回は過去の morning_brief_*.json から作る）"""
+    index = DeliveredIndex(path)
+    if not len(index):
+        index.seed_from_briefs(days, today)
+        print(f"  📚 配信済みインデックスを過去の Morning Brief から作成: {len(index)} 件")
+    return index
+
+
+def filter_delivered_stories(candidates, index, days=DELIVERED_DEDUP_DAYS, today=None):
+    """過去N日間に配信した記事と同じ出来事（URL・メディアが違っても）の候補を除外する"""
+    today = today or datetime.datetime.now(JST).date()
+    since = (today - datetime.timedelta(days=days)).isoformat()
+    until = today.isoformat()  # 当日分（同日の再実行で登録した記事）とは照合しない
+    kept = []
+    for a in candidates:
+        story = index.match(a, since, until)
+        if story:
+            title = a.get("title_ja") or a.get("title", "")
+            print(f"   ✂️ 配信済み（{story['date']}）と同じ出来事: {title[:40]}")
+        else:
+            kept.append(a)
+    removed = len(candidates) - len(kept)
+    print(f"  🧭 過去{days}日間の配信済み {len(index)} 件と照合: {removed} 件を除外"
+          f"（照合 {index.stats['candidates']} 組）")
+    return kept
+
+
+def record_delivered(index, articles, days=DELIVERED_DEDUP_DAYS, today=None):
+    """今日配信した記事をインデックスに登録し、期間外の記事を捨てて保存する"""
+    today = today or datetime.datetime.now(JST).date()
+    for a in articles:
+        index.add(a, today.isoformat())
+    index.prune((today - datetime.timedelta(days=days)).isoformat())
+    index.save()
+
+
 def rebalance_by_source(selected, pool, max_per_source=3, target=10):
     """同一ソース偏重を是正する。
 
@@ -107,10 +146,8 @@ def rebalance_by_source(selected, pool, max_per_source=3, target=10):
 
     removed = len(overflow)
     kept_urls = {a.get("url", "") for a in kept}
-    replacements = sorted(
-        [a for a in pool if a.get("url", "") not in kept_urls],
-        key=lambda x: x.get("importance_score", 0),
-        reverse=True,
+    replacements = rank(
+        (a for a in pool if a.get("url", "") not in kept_urls), importance_key
     )
     for a in replacements:
         if len(kept) >= target:
@@ -137,7 +174,7 @@ def curate_with_gemini(candidates):
         print("❌ GOOGLE_API_KEY が設定されていません")
         return None
 
-    client = genai.Client(api_key=api_key)
+    client = make_client(api_key)
 
     # 候補記事をテキスト化
     articles_text = ""
@@ -264,20 +301,12 @@ URL: {url}
                 print(f"   🔄 リトライ {attempt}/{max_retries}（{wait_sec}秒待機）...")
                 time.sleep(wait_sec)
 
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=response_schema,
-                ),
-            )
-            response_text = response.text.strip()
-            result = json.loads(response_text)
+            result = json.loads(generate(client, prompt, response_schema))
 
             curated_articles = result.get("articles", [])
             elapsed = time.time() - start
             print(f"✅ 2次キュレーション完了（{elapsed:.1f}秒）")
+            print_cache_stats()
             print(f"   テーマ: {result.get('theme', '—')}")
             print(f"   一言: {result.get('morning_comment', '—')}")
             print(f"   Gemini 選定: {len(curated_articles)} 件")
@@ -288,11 +317,8 @@ URL: {url}
                 remaining = [
                     a for a in candidates if a.get("url", "") not in curated_urls
                 ]
-                remaining.sort(
-                    key=lambda x: x.get("importance_score", 0), reverse=True
-                )
                 needed = 10 - len(curated_articles)
-                supplement = remaining[:needed]
+                supplement = top_k(remaining, needed, importance_key)
                 if supplement:
                     print(f"   📌 Gemini選定が{len(curated_articles)}件 → "
                           f"候補から{len(supplement)}件を補完して10件に調整")
@@ -323,9 +349,7 @@ URL: {url}
     elapsed = time.time() - start
     print(f"❌ Gemini 2次キュレーション失敗（全{max_retries + 1}回, {elapsed:.1f}秒）: {last_error}")
     # フォールバック: 1次スコア上位10件を使用（翻訳済みフィールドを優先）
-    fallback_articles = sorted(
-        candidates, key=lambda x: x.get("importance_score", 0), reverse=True
-    )[:10]
+    fallback_articles = top_k(candidates, 10, importance_key)
     for a in fallback_articles:
         if a.get("title_ja"):
             a["title"] = a["title_ja"]
@@ -442,6 +466,11 @@ def main():
         else:
             print(f"   ✅ 重複なし（全 {len(candidates)} 件が新規）")
 
+    # 3.6. 過去に配信した記事と同じ出来事を除外（別メディア・別 URL で翌日以降に再配信しない）
+    print(f"\n🧭 過去{DELIVERED_DEDUP_DAYS}日間の配信済みニュースと照合中...")
+    delivered_index = load_delivered_index()
+    candidates = filter_delivered_stories(candidates, delivered_index)
+
     # 3.7. 意味的ダブり排除（同じ出来事を別メディアが報じた記事を束ねる）
     print("\n🔗 意味的ダブり排除中...")
     candidates = dedup_articles(candidates)
@@ -464,6 +493,7 @@ def main():
     # 5. 保存
     print("\n💾 Morning Brief を保存中...")
     save_morning_brief(brief)
+    record_delivered(delivered_index, brief.get("articles", []))
 
     # 6. 配信（失敗してもサイト更新は継続）
     print("\n📤 配信開始...")
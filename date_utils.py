@@ -0,0 +1,104 @@
+"""date_utils.py — RSS / 記事の日時文字列を aware datetime に正規化する（段階的な高速パス）。
+
+rss_client は全エントリの published / updated 文字列を dateutil.parser.parse で
+パースしていたが、dateutil は汎用な分だけ遅い。実際のフィードの日時はほぼ
+RFC 822（RSS 2.0）か ISO 8601（Atom）なので、次の順で試す:
+
+1. feedparser が解析済みの ``published_parsed`` / ``updated_parsed``（UTC の struct_time）
+2. 文字列キャッシュ（同じ日時文字列は1回だけパース）
+3. 標準ライブラリの高速パス（email.utils の RFC 822 / datetime.fromisoformat）
+4. dateutil.parser.parse（上記で読めない表記のみ）
+
+どの段で解決したかを DATE_PARSE_STATS に数える。dedup._published_key も同じ関数を使う。
+"""
+
+import calendar
+import datetime
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from dateutil import parser as date_parser
+
+# 文字列 → パース結果のキャッシュ上限（超えたら丸ごと捨てる）
+_CACHE_MAX = 8192
+_MISSING = object()
+
+_cache: dict[str, datetime.datetime | None] = {}
+_lock = threading.Lock()
+
+# 段ごとの解決件数（struct / cached / rfc822 / iso / dateutil / failed）
+DATE_PARSE_STATS = dict.fromkeys(("struct", "cached", "rfc822", "iso", "dateutil", "failed"), 0)
+
+
+def _count(tier: str):
+    with _lock:
+        DATE_PARSE_STATS[tier] += 1
+
+
+def reset_stats():
+    """実行ごとの集計を始めるためにカウンタを 0 に戻す。"""
+    with _lock:
+        for tier in DATE_PARSE_STATS:
+            DATE_PARSE_STATS[tier] = 0
+
+
+def _aware(dt: datetime.datetime) -> datetime.datetime:
+    # タイムゾーンがない場合はUTCとして扱う（従来の rss_client / dedup と同じ規約）
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.UTC)
+
+
+def _parse_uncached(value: str) -> tuple[datetime.datetime | None, str]:
+    text = value.strip()
+    # ISO 8601 は数字で始まる / RFC 822 は曜日か日付の数字で始まるため両方試す
+    fast = ("iso", "rfc822") if text[:4].isdigit() else ("rfc822", "iso")
+    for tier in fast:
+        try:
+            if tier == "iso":
+                return _aware(datetime.datetime.fromisoformat(text)), tier
+            return _aware(parsedate_to_datetime(text)), tier
+        except (ValueError, TypeError, IndexError):
+            continue
+    try:
+        return _aware(date_parser.parse(text)), "dateutil"
+    except (ValueError, OverflowError, TypeError):
+        return None, "failed"
+
+
+def parse_datetime(value: str | None) -> datetime.datetime | None:
+    """日時文字列を aware datetime にする（パースできなければ None）。"""
+    if not value or not isinstance(value, str):
+        return None
+    cached = _cache.get(value, _MISSING)
+    if cached is not _MISSING:
+        _count("cached")
+        return cached
+    result, tier = _parse_uncached(value)
+    _count(tier)
+    with _lock:
+        if len(_cache) >= _CACHE_MAX:
+            _cache.clear()
+        _cache[value] = result
+    return result
+
+
+def _from_struct(st) -> datetime.datetime | None:
+    """feedparser の *_parsed（UTC の struct_time）を aware datetime にする。"""
+    if not isinstance(st, (time.struct_time, tuple)) or len(st) < 6:
+        return None
+    try:
+        return datetime.datetime.fromtimestamp(calendar.timegm(st), datetime.UTC)
+    except (OverflowError, ValueError, TypeError):
+        return None
+
+
+def entry_datetime(entry) -> datetime.datetime | None:
+    """feedparser エントリの公開日時（published → updated の順）を返す。"""
+    for field in ("published", "updated"):
+        if hasattr(entry, field):
+            dt = _from_struct(getattr(entry, f"{field}_parsed", None))
+            if dt is not None:
+                _count("struct")
+                return dt
+            return parse_datetime(getattr(entry, field))
+    return None
@@ -8,18 +8,27 @@ curate_morning_brief.py の URL 重複排除は完全一致のみで、同じ出
 取りこぼしやすい。そこで「単語の重なり（Jaccard 係数）」を主指標、difflib の
 SequenceMatcher を境界帯の救済に使う二段構えにしている。
 
-依存は標準ライブラリ＋既存の python-dateutil のみ（追加依存なし）。
+比較は見出しトークンの転置インデックスで「類似になりうる相手」に絞ってから行う
+（_cluster_indexed。総当たりの _cluster_pairwise と同じクラスタになる）。候補数が
+1週間分のアーカイブ規模に増えても比較回数が候補数の2乗で増えない。共通トークン数を
+NumPy の行列積でまとめて求めるバックエンド（dedup_numpy。DEDUP_BACKEND=numpy）も選べる。
+benchmarks/bench_dedup.py で各方式を比較できる。
+
+見出しの正規化・トークン化は features.text_features（見出しごとに1回だけ計算して
+キャッシュ。delivered_index と共有）を使う。
+
+依存は標準ライブラリ＋既存の python-dateutil のみ（NumPy は任意。日時文字列は
+rss_client と同じ date_utils の高速パスで解釈する）。
 """
 
-import re
+import math
 import datetime
-import unicodedata
 from difflib import SequenceMatcher
 
-from dateutil import parser as date_parser
-
-# 見出し正規化で除去する記号・約物（日本語の括弧・引用符・ダッシュ・中黒等を含む）
-_PUNCT = re.compile(r"[\s　、。，．・「」『』（）()\[\]【】“”\"'’‘:：;；!！?？\-—–~〜/|]+")
+from config import DEDUP_BACKEND
+from date_utils import parse_datetime
+# _normalize / _tokens / _numbers は従来どおり dedup からも参照できるよう再エクスポートする
+from features import _normalize, _numbers, _tokens, text_features  # noqa: F401
 
 _MIN_TOKENS = 2        # 正規化後トークンがこれ未満の見出しは束ねず素通り（短すぎ）
 # 閾値は実測で確定（現実的なAIニュース見出しで計測）:
@@ -30,41 +39,17 @@ _JACCARD_MAIN = 0.25   # 主判定: トークン Jaccard がこの値以上な
 _JACCARD_BORDER = 0.18  # 境界帯の下限（ここ〜MAIN の間のみ SM 救済を許す）
 _SM_RESCUE = 0.78      # 境界帯で SequenceMatcher 比率がこの値以上なら救済
 
+# 境界帯の救済判定をどの段で決めたかの件数（_sm_rescue。dedup_articles が1回分の差分を表示する）
+#   length — 長さの比から求まる上限（= real_quick_ratio）が _SM_RESCUE 未満で不成立
+#   quick  — quick_ratio（文字の多重集合の重なり）が _SM_RESCUE 未満で不成立
+#   full   — ratio（最長一致ブロック）まで計算した件数 / rescued — うち救済した件数
+RESCUE_STATS = dict.fromkeys(("length", "quick", "full", "rescued"), 0)
+
 
 def _title_of(article: dict) -> str:
     return (article.get("title_ja") or article.get("title") or "").strip()
 
 
-def _normalize(text: str) -> str:
-    """NFKC 正規化 → 小文字化 → 記号除去 → 空白正規化。"""
-    text = unicodedata.normalize("NFKC", text)
-    text = text.lower()
-    text = _PUNCT.sub(" ", text)
-    return text.strip()
-
-
-def _tokens(norm: str) -> set[str]:
-    """英数字は単語単位、日本語は文字 bigram でトークン集合を作る。
-
-    日本語は分かち書きがないため、形態素解析器（追加依存）を避け、
-    文字 2-gram で語順に依存しない近似トークン化を行う。
-    """
-    if not norm:
-        return set()
-    tokens: set[str] = set()
-    # 英数字の連続を1語として扱う（固有名詞・モデル名の一致を捉える）
-    for word in re.findall(r"[a-z0-9]+", norm):
-        tokens.add(word)
-    # 英数字・空白以外（主に日本語）の連続を bigram 化
-    for chunk in re.findall(r"[^a-z0-9\s]+", norm):
-        if len(chunk) == 1:
-            tokens.add(chunk)
-        else:
-            for i in range(len(chunk) - 1):
-                tokens.add(chunk[i:i + 2])
-    return tokens
-
-
 def _jaccard(a: set[str], b: set[str]) -> float:
     if not a or not b:
         return 0.0
@@ -72,29 +57,47 @@ def _jaccard(a: set[str], b: set[str]) -> float:
     return len(a & b) / union if union else 0.0
 
 
-def _numbers(norm: str) -> set[str]:
-    """見出し中の数値（モデル番号・バージョン・年・金額など）を抽出する。
+def _sm_rescue(norm_a: str, norm_b: str) -> bool:
+    """SequenceMatcher(None, a, b).ratio() >= _SM_RESCUE を、安い上限から順に確かめて判定する。
 
-    AI ニュースは「GPT-5 と GPT-4」「Gemini 1.5 と 2.0」のようにモデル番号だけが
-    異なる別発表が共存しやすい。数値は強い識別子として扱い、両見出しが数値を持ち
-    かつ食い違う場合は別の出来事とみなす（誤マージ防止）。
+    ratio() は文字数の2乗に比例しうるので、必ず ratio() 以上になる上限
+    （長さの比 2·min/(|a|+|b|) → quick_ratio）が _SM_RESCUE に届かない組はそこで打ち切る。
+    どの段も ratio() と同じ式 2·一致数/(|a|+|b|) なので、判定は ratio() だけの場合と一致する。
     """
-    return set(re.findall(r"\d+", norm))
+    total = len(norm_a) + len(norm_b)
+    if total and 2.0 * min(len(norm_a), len(norm_b)) / total < _SM_RESCUE:
+        RESCUE_STATS["length"] += 1
+        return False
+    matcher = SequenceMatcher(None, norm_a, norm_b)
+    if matcher.quick_ratio() < _SM_RESCUE:
+        RESCUE_STATS["quick"] += 1
+        return False
+    RESCUE_STATS["full"] += 1
+    if matcher.ratio() >= _SM_RESCUE:
+        RESCUE_STATS["rescued"] += 1
+        return True
+    return False
 
 
-def _is_similar(item_a: tuple, item_b: tuple, jaccard_main: float) -> bool:
-    """2件の見出しが「同じ出来事」かを判定する。item = (idx, article, norm, tokens, numbers)。"""
+def _is_similar(item_a: tuple, item_b: tuple, jaccard_main: float, shared: int | None = None) -> bool:
+    """2件の見出しが「同じ出来事」かを判定する。item = (idx, article, norm, tokens, numbers)。
+
+    shared（共通トークン数）が分かっていれば、集合演算をせずにそこから Jaccard を求める。
+    """
     _, _, norm_a, tok_a, num_a = item_a
     _, _, norm_b, tok_b, num_b = item_b
     # モデル番号・バージョン・年・金額などの数値が両方にあり食い違うなら別ニュース
     if num_a and num_b and num_a != num_b:
         return False
-    j = _jaccard(tok_a, tok_b)
+    if shared is None:
+        j = _jaccard(tok_a, tok_b)
+    else:
+        j = shared / (len(tok_a) + len(tok_b) - shared) if shared else 0.0
     if j >= jaccard_main:
         return True
     # 境界帯のみ、語順入れ替え・言い回し差を SequenceMatcher で救済
     if j >= _JACCARD_BORDER:
-        return SequenceMatcher(None, norm_a, norm_b).ratio() >= _SM_RESCUE
+        return _sm_rescue(norm_a, norm_b)
     return False
 
 
@@ -104,11 +107,9 @@ def _published_key(article: dict) -> datetime.datetime:
     if isinstance(pub, datetime.datetime):
         return pub if pub.tzinfo else pub.replace(tzinfo=datetime.timezone.utc)
     if isinstance(pub, str) and pub:
-        try:
-            dt = date_parser.parse(pub)
-            return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
-        except Exception:
-            pass
+        dt = parse_datetime(pub)
+        if dt is not None:
+            return dt
     return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
 
 
@@ -128,12 +129,129 @@ def _representative(members: list[tuple[int, dict]]) -> tuple[int, dict]:
     )
 
 
-def dedup_articles(articles: list[dict], threshold: float = _JACCARD_MAIN) -> list[dict]:
+def _cluster_pairwise(candidates: list[tuple], threshold: float) -> list[list[tuple]]:
+    """complete-linkage クラスタリング（総当たり）。
+
+    クラスタの「全メンバー」と類似する場合のみ合流する。単連結（代表とだけ比較）だと
+    A≈B・B≈C だが A≠C のとき A と C が同居して別ニュースを誤って束ねる（入力順依存の
+    非決定的な取りこぼし）。全メンバー一致を条件にすることで、非類似ペアが決して同居しない。
+    各記事は作られた順に最初に条件を満たすクラスタへ入る。
+    """
+    clusters: list[list[tuple]] = []
+    for item in candidates:
+        placed = False
+        for cluster in clusters:
+            if all(_is_similar(item, member, threshold) for member in cluster):
+                cluster.append(item)
+                placed = True
+                break
+        if not placed:
+            clusters.append([item])
+    return clusters
+
+
+def _near_indexed(candidates: list[tuple], t: float) -> list[dict[int, int]]:
+    """各候補について、それより前の候補のうち共通トークン数が t·max(|A|, |B|) 以上のもの。
+
+    Jaccard ≥ t なら |A∩B| ≥ t·|A∪B| ≥ t·max(|A|, |B|)。共通トークンがこれだけあるなら、
+    各見出しのトークンを「出現の少ない順」に並べた先頭 |A| − ⌈t·|A|⌉ + 1 個（prefix）どうしが
+    必ず1つは重なる。そこで prefix だけを転置インデックスに載せて比較相手の候補を拾い、
+    共通トークン数を数える（よくある語で全件がつながるのを避ける）。
+
+    Returns:
+        位置 i → {前の候補の位置 j: 共通トークン数}
+    """
+    df: dict[str, int] = {}
+    for item in candidates:
+        for tok in item[3]:
+            df[tok] = df.get(tok, 0) + 1
+
+    index: dict[str, list[int]] = {}
+    result: list[dict[int, int]] = []
+    for pos, item in enumerate(candidates):
+        tokens = item[3]
+        size = len(tokens)
+        # 浮動小数の丸めで境界ちょうどの相手を落とさないよう、必要数はわずかに緩めて数える
+        need = max(1, math.ceil(t * size - 1e-9))
+        prefix = sorted(tokens, key=lambda tok: (df[tok], tok))[:size - need + 1]
+        seen: set[int] = set()
+        near: dict[int, int] = {}
+        for tok in prefix:
+            for other in index.get(tok, ()):
+                if other in seen:
+                    continue
+                seen.add(other)
+                other_tokens = candidates[other][3]
+                shared = len(tokens & other_tokens)
+                if shared >= t * max(size, len(other_tokens)) - 1e-9:
+                    near[other] = shared
+        result.append(near)
+        for tok in prefix:
+            index.setdefault(tok, []).append(pos)
+    return result
+
+
+def _assign_clusters(candidates: list[tuple], near: list[dict[int, int]], threshold: float) -> list[list[tuple]]:
+    """near（類似になりうる前の候補と共通トークン数）から complete-linkage のクラスタを作る。
+
+    クラスタは全メンバーが near に入っているものだけを、作られた順に調べるので、
+    結果は総当たりの _cluster_pairwise と一致する。
+    """
+    cluster_of: list[int] = []
+    clusters: list[list[int]] = []
+    for pos, item in enumerate(candidates):
+        near_pos = near[pos]
+        chosen = None
+        for cid in sorted({cluster_of[other] for other in near_pos}):
+            members = clusters[cid]
+            if all(m in near_pos and _is_similar(item, candidates[m], threshold, near_pos[m]) for m in members):
+                chosen = cid
+                break
+        if chosen is None:
+            chosen = len(clusters)
+            clusters.append([])
+        clusters[chosen].append(pos)
+        cluster_of.append(chosen)
+    return [[candidates[pos] for pos in members] for members in clusters]
+
+
+def _cluster_indexed(candidates: list[tuple], threshold: float) -> list[list[tuple]]:
+    """_cluster_pairwise と同じクラスタを、トークンの転置インデックスで候補を絞って求める。
+
+    類似と判定されるには Jaccard ≥ t（t = min(threshold, _JACCARD_BORDER)）が必要なので、
+    共通トークン数がそれに足りる相手（_near_indexed）とだけ類似判定を行う（t > 0 のときのみ使う）。
+    """
+    t = min(threshold, _JACCARD_BORDER)
+    return _assign_clusters(candidates, _near_indexed(candidates, t), threshold)
+
+
+def _cluster_numpy(candidates: list[tuple], threshold: float) -> list[list[tuple]]:
+    """_cluster_indexed と同じクラスタを、共通トークン数を NumPy の行列積でまとめて求めて作る。"""
+    from dedup_numpy import near_pairs
+
+    t = min(threshold, _JACCARD_BORDER)
+    return _assign_clusters(candidates, near_pairs(candidates, t), threshold)
+
+
+def _cluster_fn(backend: str):
+    """backend（"python" / "numpy"）に対応するクラスタリング関数。NumPy がなければ Python に戻す。"""
+    if backend == "numpy":
+        try:
+            import dedup_numpy  # noqa: F401
+            return _cluster_numpy
+        except ImportError:
+            print("  ⚠️ NumPy がないため重複束ねは Python 実装で行います")
+    return _cluster_indexed
+
+
+def dedup_articles(articles: list[dict], threshold: float = _JACCARD_MAIN, backend: str | None = None) -> list[dict]:
     """意味的に同じ出来事の記事を束ね、各グループ代表のみ残す（greedy）。
 
     Args:
         articles: 記事 dict のリスト（title_ja / importance_score / published 等を含む）
         threshold: トークン Jaccard の主判定閾値（大きいほど束ねにくい）
+        backend: 共通トークン数の求め方。"python"（転置インデックス）または
+            "numpy"（dedup_numpy: 行列積）。省略時は config.DEDUP_BACKEND
 
     Returns:
         重複を束ねた記事リスト（元の出現順を維持）
@@ -141,31 +259,21 @@ def dedup_articles(articles: list[dict], threshold: float = _JACCARD_MAIN) -> li
     if len(articles) <= 1:
         return articles
 
+    rescue_before = dict(RESCUE_STATS)
     # 短すぎ・空の見出しは束ねず素通りさせ、誤クラスタ化を防ぐ
     passthrough: list[tuple[int, dict]] = []
     candidates: list[tuple] = []  # (idx, article, norm, tokens, numbers)
     for idx, article in enumerate(articles):
-        norm = _normalize(_title_of(article))
-        tokens = _tokens(norm)
+        norm, tokens, numbers = text_features(_title_of(article))
         if len(tokens) < _MIN_TOKENS:
             passthrough.append((idx, article))
         else:
-            candidates.append((idx, article, norm, tokens, _numbers(norm)))
+            candidates.append((idx, article, norm, tokens, numbers))
 
-    # complete-linkage クラスタリング: クラスタの「全メンバー」と類似する場合のみ合流する。
-    # 単連結（代表とだけ比較）だと A≈B・B≈C だが A≠C のとき A と C が同居して
-    # 別ニュースを誤って束ねる（入力順依存の非決定的な取りこぼし）。全メンバー一致を
-    # 条件にすることで、非類似ペアが決して同居しないようにする。
-    clusters: list[list[tuple]] = []
-    for item in candidates:
-        placed = False
-        for cluster in clusters:
-            if all(_is_similar(item, member, threshold) for member in cluster):
-                cluster.append(item)
-                placed = True
-                break
-        if not placed:
-            clusters.append([item])
+    if min(threshold, _JACCARD_BORDER) > 0:
+        clusters = _cluster_fn(backend or DEDUP_BACKEND)(candidates, threshold)
+    else:
+        clusters = _cluster_pairwise(candidates, threshold)  # 共通トークンなしでも類似になりうる
 
     # 代表＋素通り分を集め、元の出現順に並べ直す
     kept: list[tuple[int, dict]] = list(passthrough)
@@ -178,4 +286,8 @@ def dedup_articles(articles: list[dict], threshold: float = _JACCARD_MAIN) -> li
     removed = len(articles) - len(result)
     if removed > 0:
         print(f"  🔗 重複束ね: {len(articles)} 件 → {len(result)} 件（{removed} 件を集約）")
+    rescue = {k: RESCUE_STATS[k] - rescue_before[k] for k in RESCUE_STATS}
+    if rescue["length"] + rescue["quick"] + rescue["full"]:
+        print(f"  🔍 境界帯の救済判定: 長さで除外 {rescue['length']} / quick_ratio で除外 {rescue['quick']}"
+              f" / 全比較 {rescue['full']}（救済 {rescue['rescued']}）")
     return result
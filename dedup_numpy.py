@@ -0,0 +1,59 @@
+"""dedup_numpy.py — 見出しの共通トークン数を NumPy の行列積でまとめて求める重複束ねバックエンド。
+
+dedup._cluster_indexed は比較相手の候補を転置インデックスで絞り、1組ずつ集合演算
+（tokens & other_tokens）で共通トークン数を数える。本モジュールは
+
+- 2件以上の見出しに出るトークンに番号を振り（1件にしか出ないトークンは共通数に効かない）、
+- 見出し × トークンの 0/1 行列 X を作って、X · Xᵀ で全ペアの共通トークン数を一度に求め、
+- 共通数が t·max(|A|, |B|) 以上（_cluster_indexed と同じ条件）のペアだけを返す
+
+ことで、集合演算の Python ループを BLAS の行列積に置き換える。行列積は _CHUNK_ROWS 行ずつ
+（自分より前の見出しとの下三角だけ）計算し、共通数の行列全体は持たない。
+
+判定（数値の食い違い・Jaccard の主閾値・境界帯の SequenceMatcher 救済）は
+dedup._is_similar に共通数を渡して行うので、結果は純 Python の経路と一致する。
+dedup.dedup_articles(backend="numpy")（または環境変数 DEDUP_BACKEND=numpy）で選択する。
+NumPy は任意の依存で、入っていなければ dedup が純 Python の経路に戻す。
+"""
+
+import numpy as np
+
+# 一度に行列積を取る行数（共通数の一時行列は _CHUNK_ROWS × 件数）
+_CHUNK_ROWS = 256
+
+
+def near_pairs(candidates: list[tuple], t: float) -> list[dict[int, int]]:
+    """各候補について、それより前の候補のうち共通トークン数が t·max(|A|, |B|) 以上のもの。
+
+    Returns:
+        位置 i → {前の候補の位置 j: 共通トークン数}（dedup._near_indexed と同じ形）
+    """
+    n = len(candidates)
+    df: dict[str, int] = {}
+    for item in candidates:
+        for tok in item[3]:
+            df[tok] = df.get(tok, 0) + 1
+    vocab = {tok: col for col, tok in enumerate(tok for tok, count in df.items() if count >= 2)}
+
+    # 0/1 行列（float32 の積は共通数 < 2^24 の範囲で整数として正確に求まる）
+    x = np.zeros((n, max(len(vocab), 1)), dtype=np.float32)
+    for row, item in enumerate(candidates):
+        cols = [vocab[tok] for tok in item[3] if tok in vocab]
+        x[row, cols] = 1.0
+    sizes = np.array([len(item[3]) for item in candidates], dtype=np.float64)
+    # _cluster_indexed と同じ式・同じ浮動小数の比較（境界ちょうどを落とさないよう 1e-9 緩める）。
+    # shared ≥ t·max(|A|, |B|) は「shared ≥ t·|A| かつ shared ≥ t·|B|」と同じ
+    need = t * sizes - 1e-9
+
+    near: list[dict[int, int]] = [{} for _ in range(n)]
+    for lo in range(0, n, _CHUNK_ROWS):
+        hi = min(lo + _CHUNK_ROWS, n)
+        shared = x[lo:hi] @ x[:hi].T
+        rows, cols = np.nonzero((shared >= need[lo:hi, None]) & (shared >= need[None, :hi]))
+        counts = shared[rows, cols].astype(np.int64)
+        # 自分より前の見出し（列 < 行）で、共通トークンがあるものだけを対象にする
+        keep = (cols < rows + lo) & (counts > 0)
+        rows, cols, counts = rows[keep], cols[keep], counts[keep]
+        for row, col, count in zip(rows.tolist(), cols.tolist(), counts.tolist()):
+            near[lo + row][col] = count
+    return near
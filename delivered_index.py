@@ -0,0 +1,204 @@
+"""delivered_index.py — 配信済み記事の MinHash-LSH インデックス（日をまたいだ重複配信の防止）。
+
+curate_morning_brief の既配信チェックは過去3日の URL 完全一致だけで、同じ出来事を
+翌日に別メディアの URL で配信し直すことがあった。dedup.py は1回分の候補の中でしか
+束ねない。本モジュールは配信した記事の見出しを
+
+- dedup と同じトークン（英数字の単語 + 日本語の文字 bigram）の MinHash 署名
+  （_NUM_PERM 個のハッシュ関数）にし、
+- _BANDS 個の帯（各 _ROWS 行）に分けたキーでバケットに登録する
+
+LSH インデックスとして output/delivered_index.json に保存する。照会は候補と同じ
+バケットに入った記事だけを dedup._is_similar で確かめるので、配信履歴が数か月分に
+増えても照会時間の伸びは緩やか。見出しは翻訳後（title_ja）と原文（title）の両方を
+登録・照会するので、同じ出来事を別メディアが報じた英語見出しどうしも拾える。
+
+Jaccard J のペアが候補に入る確率は 1 - (1 - J^行数)^帯数。dedup の判定は境界帯
+（J ≥ 0.18）から始まるので、帯 64 × 行 1 として J = 0.18 でも 1 - 0.82^64 ≈ 1 - 3·10⁻⁶
+（J = 0.12 でも 0.9997）にしている（帯 64 × 行 2 では J = 0.18 で 0.88 しかなく、
+境界帯の組を約 1/8 取りこぼしていた）。行 1 は共通トークンが少ない無関係な見出しも
+候補に入れるため、既定の保存期間（14日・百数十件）のように配信履歴が _LINEAR_MAX 件
+以下のときは署名を作らず全件を確かめる（こちらの方が速く、取りこぼしもない）。
+"""
+
+import datetime
+import glob
+import hashlib
+import json
+import os
+
+from config import DELIVERED_INDEX_PATH, JST, NEWS_BOT_OUTPUT_DIR
+from dedup import _JACCARD_MAIN, _MIN_TOKENS, _is_similar
+from features import text_features
+
+_NUM_PERM = 64
+_BANDS = 64
+_ROWS = _NUM_PERM // _BANDS
+# 配信履歴がこの件数以下なら LSH を使わず全件を確かめる（benchmarks/bench_delivered_index.py）
+_LINEAR_MAX = 300
+_PRIME = (1 << 61) - 1
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# ハッシュ関数 h_i(x) = (a_i·x + b_i) mod p の係数（保存済みの署名と一致するよう固定値から導く）
+_PERMS = [(_hash64(f"a{i}") % (_PRIME - 1) + 1, _hash64(f"b{i}") % _PRIME) for i in range(_NUM_PERM)]
+
+
+def signature(tokens: set[str]) -> list[int]:
+    """トークン集合の MinHash 署名（_NUM_PERM 個の最小ハッシュ値）"""
+    hashes = [_hash64(tok) for tok in tokens]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+
+def band_digests(sig: list[int]) -> str:
+    """署名を帯ごとに区切り、各帯の値を 8 桁の16進ハッシュにして連結した文字列（保存用）"""
+    return "".join(
+        hashlib.blake2b(repr(sig[band * _ROWS:(band + 1) * _ROWS]).encode(), digest_size=4).hexdigest()
+        for band in range(_BANDS)
+    )
+
+
+def _bucket_keys(digests: str) -> list[str]:
+    """band_digests の文字列 → バケットキー（"帯番号:帯のハッシュ"）"""
+    return [f"{band}:{digests[band * 8:(band + 1) * 8]}" for band in range(_BANDS)]
+
+
+def _views(article: dict) -> list[str]:
+    """照会・登録に使う見出し（翻訳後と原文。正規化済み・重複なし）"""
+    norms = []
+    for title in (article.get("title_ja"), article.get("title")):
+        norm = text_features(title or "")[0]
+        if norm and norm not in norms:
+            norms.append(norm)
+    return norms
+
+
+def _item(norm: str) -> tuple:
+    """dedup._is_similar に渡す形 (idx, article, norm, tokens, numbers)（特徴量はキャッシュから）"""
+    return (0, None, *text_features(norm))
+
+
+class DeliveredIndex:
+    """配信済み記事の LSH インデックス（Stage 2 の1スレッドから使う）。
+
+    stories: 記事 ID → {url, date(YYYY-MM-DD), views(正規化見出し), bands(見出しごとの band_digests)}
+    バケット（キー → 記事 ID）は読み込み時に stories から組み立てる。署名は計算し直さないが、
+    保存時と帯・行の設定が違うファイルは views から band_digests を作り直す。
+    """
+
+    def __init__(self, path: str = DELIVERED_INDEX_PATH):
+        self.path = path
+        self._stories: dict[str, dict] = {}
+        self._buckets: dict[str, set[str]] = {}
+        self.stats = {"queries": 0, "candidates": 0, "matched": 0}
+        self._load()
+
+    def __len__(self):
+        return len(self._stories)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            stale = data.get("lsh") != [_NUM_PERM, _BANDS]
+            for sid, story in (data.get("stories") or {}).items():
+                if stale:
+                    story["bands"] = [band_digests(signature(text_features(v)[1])) for v in story["views"]]
+                self._register(sid, story)
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            self._stories, self._buckets = {}, {}  # 壊れたファイルは捨てて作り直す
+
+    def _register(self, sid: str, story: dict):
+        self._stories[sid] = story
+        for digests in story["bands"]:
+            for key in _bucket_keys(digests):
+                self._buckets.setdefault(key, set()).add(sid)
+
+    def add(self, article: dict, date: str):
+        """配信した記事を登録する（date は配信日 YYYY-MM-DD。同じ URL は上書き）。"""
+        url = article.get("url", "")
+        views = [v for v in _views(article) if len(text_features(v)[1]) >= _MIN_TOKENS]
+        if not url or not views:
+            return
+        sid = hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+        if sid in self._stories:
+            self._remove(sid)
+        bands = [band_digests(signature(text_features(v)[1])) for v in views]
+        self._register(sid, {"url": url, "date": date, "views": views, "bands": bands})
+
+    def _remove(self, sid: str):
+        story = self._stories.pop(sid)
+        for digests in story["bands"]:
+            for key in _bucket_keys(digests):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(sid)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def match(self, article: dict, since: str, until: str) -> dict | None:
+        """since ≤ 配信日 < until の配信済み記事のうち、同じ出来事と判定したもの（なければ None）。"""
+        self.stats["queries"] += 1
+        for view in _views(article):
+            query = _item(view)
+            tokens = query[3]
+            if len(tokens) < _MIN_TOKENS:
+                continue
+            for sid in self.candidates(tokens):
+                story = self._stories[sid]
+                if not (since <= story["date"] < until):
+                    continue
+                self.stats["candidates"] += 1
+                if any(_is_similar(query, _item(v), _JACCARD_MAIN) for v in story["views"]):
+                    self.stats["matched"] += 1
+                    return story
+        return None
+
+    def candidates(self, tokens: frozenset[str]) -> list[str]:
+        """照会する見出しと比べる記事 ID（小さい履歴は全件、それ以外は同じバケットの記事）"""
+        if len(self._stories) <= _LINEAR_MAX:
+            return sorted(self._stories)
+        sids: set[str] = set()
+        for key in _bucket_keys(band_digests(signature(tokens))):
+            sids |= self._buckets.get(key, set())
+        return sorted(sids)
+
+    def prune(self, keep_since: str):
+        """keep_since より前に配信した記事を取り除く"""
+        for sid in [s for s, story in self._stories.items() if story["date"] < keep_since]:
+            self._remove(sid)
+
+    def seed_from_briefs(self, days: int, today: datetime.date | None = None):
+        """過去 days 日分の morning_brief_*.json から配信済み記事を登録する（初回の移行用）。"""
+        today = today or datetime.datetime.now(JST).date()
+        oldest = (today - datetime.timedelta(days=days)).strftime("%Y%m%d")
+        for path in sorted(glob.glob(os.path.join(NEWS_BOT_OUTPUT_DIR, "morning_brief_*.json"))):
+            stamp = os.path.basename(path)[len("morning_brief_"):-len(".json")]
+            if not (oldest <= stamp < today.strftime("%Y%m%d")):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # 読めない・壊れた Morning Brief は飛ばす
+            if not isinstance(data, dict):
+                continue
+            date = f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:]}"
+            for article in data.get("articles", []):
+                self.add(article, date)
+
+    def save(self):
+        """ディスクへ書き出す（失敗しても処理は続行）。"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"lsh": [_NUM_PERM, _BANDS], "stories": self._stories}, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"  ⚠️ 配信済みインデックスの保存失敗: {e}")
@@ -0,0 +1,184 @@
+"""disk_cache.py — 汎用のディスクキャッシュ（内容アドレス方式・TTL・容量上限・LRU 退避）。
+
+実行をまたいで再利用したい重いテキスト（記事本文など）を、キー → 値 の形で
+config.CACHE_DIR 配下のディレクトリに保存する。
+
+- 値は内容のハッシュをファイル名にして blobs/ に置く（同じ内容は1ファイルに集約）
+- index.json にキーごとの blob・サイズ・作成時刻・最終参照時刻・TTL を持つ
+- get は TTL 切れを未ヒット扱いにし、ヒット時は最終参照時刻を更新する
+- peek は get と同じ値を返すが、hit/miss・最終参照時刻を変えない（使うかどうかの下見用）
+- save で TTL 切れを削除し、合計サイズが上限を超えていれば最終参照の古い順に退避、
+  どのキーからも参照されなくなった blob を消してから index を書き出す
+
+読み書きの失敗は握りつぶし、キャッシュなし（毎回取得）で続行する。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+_INDEX_NAME = "index.json"
+_BLOB_DIR = "blobs"
+
+
+class DiskCache:
+    """キー → 文字列値のディスクキャッシュ（スレッドセーフ）。
+
+    Args:
+        directory: 保存先ディレクトリ（なければ作る）
+        ttl_sec: 既定の有効期間（秒）。put で個別に指定もできる
+        max_bytes: blob の合計サイズ上限（save 時に LRU で退避）
+
+    stats:
+        hit / miss — get の結果（TTL 切れは expired にも数える。peek は数えない）
+        stored     — put した件数
+        evicted    — save 時に容量超過で退避した件数
+    """
+
+    def __init__(self, directory: str, ttl_sec: float, max_bytes: int):
+        self.directory = directory
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] = {}
+        self._dirty = False
+        self.stats = {"hit": 0, "miss": 0, "expired": 0, "stored": 0, "evicted": 0}
+        self._load()
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, _INDEX_NAME)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, _BLOB_DIR, digest[:2], digest)
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._index = data
+        except (OSError, ValueError):
+            self._index = {}  # 壊れた index は捨てる（孤立した blob は次の save で消える）
+
+    def get(self, key: str) -> str | None:
+        """有効なキャッシュがあれば値を返す。なければ（期限切れ・読み込み失敗を含む）None。"""
+        return self._read(key, count=True)
+
+    def peek(self, key: str) -> str | None:
+        """get と同じ値を返す。hit/miss・最終参照時刻は変えない（値を使うのは get で読んだときだけ）。"""
+        return self._read(key, count=False)
+
+    def _read(self, key: str, count: bool) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                if count:
+                    self.stats["miss"] += 1
+                return None
+            if now - entry["created"] > entry.get("ttl", self.ttl_sec):
+                if count:
+                    self._index.pop(key, None)
+                    self._dirty = True
+                    self.stats["miss"] += 1
+                    self.stats["expired"] += 1
+                return None
+        try:
+            with open(self._blob_path(entry["blob"]), "r", encoding="utf-8") as f:
+                value = f.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self._index.pop(key, None)
+                self._dirty = True
+                if count:
+                    self.stats["miss"] += 1
+            return None
+        if count:
+            with self._lock:
+                entry["accessed"] = now
+                self._dirty = True
+                self.stats["hit"] += 1
+        return value
+
+    def put(self, key: str, value: str, ttl_sec: float | None = None):
+        """値を保存する（同じ内容の blob が既にあれば書き込まない）。"""
+        data = value.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        path = self._blob_path(digest)
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"  ⚠️ キャッシュ書き込み失敗: {e}")
+            return
+        now = time.time()
+        entry = {"blob": digest, "size": len(data), "created": now, "accessed": now}
+        if ttl_sec is not None:
+            entry["ttl"] = ttl_sec
+        with self._lock:
+            self._index[key] = entry
+            self._dirty = True
+            self.stats["stored"] += 1
+
+    def save(self):
+        """期限切れ・容量超過分を退避し、index を書き出して不要な blob を削除する。"""
+        now = time.time()
+        with self._lock:
+            if not self._dirty and os.path.exists(self._index_path):
+                return
+            index = {
+                k: e for k, e in self._index.items()
+                if now - e["created"] <= e.get("ttl", self.ttl_sec)
+            }
+            # blob 単位の合計サイズ（同じ内容を共有するキーは1回だけ数える）
+            sizes = {e["blob"]: e["size"] for e in index.values()}
+            total = sum(sizes.values())
+            if total > self.max_bytes:
+                refs: dict[str, int] = {}
+                for e in index.values():
+                    refs[e["blob"]] = refs.get(e["blob"], 0) + 1
+                for key in sorted(index, key=lambda k: index[k]["accessed"]):
+                    if total <= self.max_bytes:
+                        break
+                    blob = index.pop(key)["blob"]
+                    self.stats["evicted"] += 1
+                    refs[blob] -= 1
+                    if refs[blob] == 0:
+                        total -= sizes[blob]
+            self._index = index
+            self._dirty = False
+            live = {e["blob"] for e in index.values()}
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = self._index_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp, self._index_path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"  ⚠️ キャッシュ index 保存失敗: {e}")
+                return
+        self._remove_orphans(live)
+
+    def _remove_orphans(self, live: set[str]):
+        blob_root = os.path.join(self.directory, _BLOB_DIR)
+        if not os.path.isdir(blob_root):
+            return
+        for sub in os.listdir(blob_root):
+            sub_dir = os.path.join(blob_root, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if name not in live and not name.endswith(".tmp"):
+                    try:
+                        os.remove(os.path.join(sub_dir, name))
+                    except OSError:
+                        pass
@@ -0,0 +1,128 @@
+"""domain_stats.py — 本文取得のドメイン別成功率・所要時間の記録（実行をまたいで永続化）。
+
+ペイウォール（The Information / Forbes / Nikkei Asia 等）や JS 必須のサイトは
+毎回本文取得に失敗し、そのたびに最大 _DOWNLOAD_TIMEOUT_SEC を使っていた。
+本モジュールはドメインごとに
+
+- attempts / successes — 取得の試行回数と成功回数（累計）
+- rate                 — 成功率の指数移動平均
+- fail_streak          — 連続失敗回数
+- latency              — 成功時の所要秒の指数移動平均
+- last_attempt         — 最後に試した時刻（epoch 秒）
+
+を記録し、article_extractor.FullTextPrefetcher が
+
+- 失敗が続くドメインは取得を見送る（_RETRY_DAYS ごとに1記事だけ試し直す）
+- 成功時の所要時間からドメイン別のタイムアウトを決める
+
+ために使う。feed_state.json と同じく小さな学習結果なので、プロジェクトルートの
+domain_stats.json（Git 管理下。ワークフローの自動コミットで次回へ引き継ぐ）に保存する。
+"""
+
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from config import DOMAIN_STATS_PATH
+
+# 連続失敗がこの回数以上、かつ成功率がこれ未満のドメインは取得を見送る
+_SKIP_STREAK = 3
+_SKIP_RATE = 0.2
+# 見送り中のドメインもこの日数ごとに1回は試す（ペイウォールが外れた等の変化を拾う）
+_RETRY_DAYS = 7
+# 指数移動平均の重み（直近の観測値）
+_ALPHA = 0.3
+# ドメイン別タイムアウト = 成功時の平均所要秒 × 係数 + 余裕（下限〜既定値の範囲）
+_TIMEOUT_FACTOR = 3.0
+_TIMEOUT_MARGIN_SEC = 2.0
+_MIN_TIMEOUT_SEC = 5.0
+
+
+def domain_of(url: str) -> str:
+    """URL のドメイン（小文字・先頭の www. を除く）。"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host.removeprefix("www.")
+
+
+class DomainStats:
+    """ドメイン → 取得実績の対応表（スレッドセーフ）。"""
+
+    def __init__(self, path: str = DOMAIN_STATS_PATH, now: float | None = None):
+        self.path = path
+        self.now = time.time() if now is None else now
+        self._lock = threading.Lock()
+        self._records: dict[str, dict] = {}
+        # 見送り中のドメイン → 今回の試し直しに選んだ URL（1ドメイン1記事）
+        self._probes: dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._records = data
+        except (OSError, ValueError):
+            self._records = {}  # 壊れたファイルは捨てて学習し直す
+
+    def should_skip(self, url: str) -> bool:
+        """失敗が続くドメインなら True。
+
+        再試行の期限が来ていれば、今回の実行で最初に照会した1記事だけ False を返す
+        （結果が出る前に同じドメインの記事をまとめて取りに行かない）。
+        """
+        domain = domain_of(url)
+        with self._lock:
+            rec = self._records.get(domain)
+            if not rec:
+                return False
+            failing = rec.get("fail_streak", 0) >= _SKIP_STREAK and rec.get("rate", 1.0) < _SKIP_RATE
+            if not failing:
+                return False
+            if self.now - rec.get("last_attempt", 0) < _RETRY_DAYS * 86400:
+                return True
+            return self._probes.setdefault(domain, url) != url
+
+    def timeout_for(self, url: str, default: float) -> float:
+        """ドメイン別のダウンロードタイムアウト（実績がなければ default）。"""
+        with self._lock:
+            latency = (self._records.get(domain_of(url)) or {}).get("latency")
+        if latency is None:
+            return default
+        return max(_MIN_TIMEOUT_SEC, min(default, latency * _TIMEOUT_FACTOR + _TIMEOUT_MARGIN_SEC))
+
+    def record(self, url: str, ok: bool, elapsed: float):
+        """1回の本文取得の結果を記録する。"""
+        domain = domain_of(url)
+        if not domain:
+            return
+        with self._lock:
+            rec = self._records.setdefault(domain, {})
+            rec["attempts"] = rec.get("attempts", 0) + 1
+            rec["last_attempt"] = round(self.now)
+            prev_rate = rec.get("rate")
+            rec["rate"] = round(
+                float(ok) if prev_rate is None else _ALPHA * float(ok) + (1 - _ALPHA) * prev_rate, 3
+            )
+            if ok:
+                rec["successes"] = rec.get("successes", 0) + 1
+                rec["fail_streak"] = 0
+                prev = rec.get("latency")
+                rec["latency"] = round(elapsed if prev is None else _ALPHA * elapsed + (1 - _ALPHA) * prev, 2)
+            else:
+                rec["fail_streak"] = rec.get("fail_streak", 0) + 1
+
+    def save(self):
+        """ディスクへ書き出す（失敗しても処理は続行）。"""
+        with self._lock:
+            try:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._records, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"  ⚠️ ドメイン統計の保存失敗: {e}")
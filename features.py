@@ -0,0 +1,83 @@
+"""features.py — 見出しの特徴量（正規化テキスト・トークン集合・数値集合）を1回だけ計算して使い回す。
+
+dedup.dedup_articles と delivered_index は同じ見出しを何度も正規化・トークン化していた
+（Stage 2 では配信済みとの照合 → 重複束ね → 配信済みへの登録で同じ候補を3回、
+配信済みインデックスの照合では候補が同じバケットに入るたびに登録済みの見出しを毎回）。
+本モジュールは見出し文字列をキーに
+
+- norm    — 正規化テキスト（NFKC → 小文字化 → 記号除去）
+- tokens  — トークン集合（英数字の単語 + 日本語の文字 bigram。frozenset）
+- numbers — 数値の集合（frozenset）
+
+を lru_cache で保持し、1プロセス内で同じ見出しを計算し直さない。集合は共有されるので
+不変（frozenset）にし、トークン文字列は sys.intern で見出し間で同じオブジェクトを使う。
+benchmarks/bench_features.py でキャッシュなしとの計算回数・確保メモリを比較できる。
+"""
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+# 見出し正規化で除去する記号・約物（日本語の括弧・引用符・ダッシュ・中黒等を含む）
+_PUNCT = re.compile(r"[\s　、。，．・「」『』（）()\[\]【】“”\"'’‘:：;；!！?？\-—–~〜/|]+")
+_WORD = re.compile(r"[a-z0-9]+")
+_CHUNK = re.compile(r"[^a-z0-9\s]+")
+_DIGITS = re.compile(r"\d+")
+
+# 保持する見出しの数（Stage 2 の候補 + 配信済みインデックス数週間分の見出しが収まる大きさ）
+_CACHE_SIZE = 8192
+
+
+def _normalize(text: str) -> str:
+    """NFKC 正規化 → 小文字化 → 記号除去 → 空白正規化。"""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.lower()
+    text = _PUNCT.sub(" ", text)
+    return text.strip()
+
+
+def _tokens(norm: str) -> frozenset[str]:
+    """英数字は単語単位、日本語は文字 bigram でトークン集合を作る。
+
+    日本語は分かち書きがないため、形態素解析器（追加依存）を避け、
+    文字 2-gram で語順に依存しない近似トークン化を行う。
+    """
+    if not norm:
+        return frozenset()
+    intern = sys.intern
+    # 英数字の連続を1語として扱う（固有名詞・モデル名の一致を捉える）
+    tokens = {intern(word) for word in _WORD.findall(norm)}
+    # 英数字・空白以外（主に日本語）の連続を bigram 化
+    for chunk in _CHUNK.findall(norm):
+        if len(chunk) == 1:
+            tokens.add(intern(chunk))
+        else:
+            tokens.update(intern(chunk[i:i + 2]) for i in range(len(chunk) - 1))
+    return frozenset(tokens)
+
+
+def _numbers(norm: str) -> frozenset[str]:
+    """見出し中の数値（モデル番号・バージョン・年・金額など）を抽出する。
+
+    AI ニュースは「GPT-5 と GPT-4」「Gemini 1.5 と 2.0」のようにモデル番号だけが
+    異なる別発表が共存しやすい。数値は強い識別子として扱い、両見出しが数値を持ち
+    かつ食い違う場合は別の出来事とみなす（誤マージ防止）。
+    """
+    return frozenset(_DIGITS.findall(norm))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def text_features(text: str) -> tuple[str, frozenset[str], frozenset[str]]:
+    """見出しの (norm, tokens, numbers)。同じ文字列は2回目以降キャッシュから返す。
+
+    正規化は冪等なので、正規化済みテキストを渡しても同じ結果になる。
+    """
+    norm = _normalize(text.strip())
+    return norm, _tokens(norm), _numbers(norm)
+
+
+def cache_stats() -> dict:
+    """text_features のキャッシュ利用状況（hits / misses / size）"""
+    info = text_features.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
@@ -0,0 +1,123 @@
+"""feed_cache.py — RSS フィードの条件付き GET（ETag / Last-Modified）キャッシュ。
+
+Stage 2 は Stage 1 の数時間後に collect_rss_gemini.main() を再実行するため、
+更新のないフィードまで毎回ダウンロード・パースしていた。本モジュールは各フィードの
+検証子（ETag / Last-Modified）と、前回パース済みの記事リストをディスクに保存する。
+
+次回は ``If-None-Match`` / ``If-Modified-Since`` を付けて取得し、サーバーが
+304 Not Modified を返したら、パースを省略して保存済みの記事をそのまま再利用する
+（304 を「0件」と扱うと、前回取得分が候補から消えてしまうため）。
+
+キャッシュは config.CACHE_DIR 配下の JSON 1ファイル。読み込み・書き込みの失敗は
+握りつぶし、キャッシュなし（通常の全件取得）で続行する。
+"""
+
+import datetime
+import json
+import os
+import threading
+
+from config import CACHE_DIR
+
+_CACHE_PATH = os.path.join(CACHE_DIR, "feed_validators.json")
+
+
+def _to_json_article(article: dict) -> dict:
+    """published（datetime）を ISO 文字列に変換した JSON 保存用コピーを返す。"""
+    ac = dict(article)
+    if isinstance(ac.get("published"), datetime.datetime):
+        ac["published"] = ac["published"].isoformat()
+    return ac
+
+
+def _from_json_article(article: dict) -> dict:
+    """_to_json_article の逆変換（published を aware datetime に戻す）。"""
+    ac = dict(article)
+    pub = ac.get("published")
+    if isinstance(pub, str) and pub:
+        try:
+            ac["published"] = datetime.datetime.fromisoformat(pub)
+        except ValueError:
+            ac["published"] = None
+    return ac
+
+
+class FeedCache:
+    """フィード URL ごとの検証子と記事リストを保持する（スレッドセーフ）。
+
+    stats:
+        hit          — 検証子付きで条件付きリクエストを送った回数
+        miss         — 検証子がなく通常のリクエストを送った回数
+        not_modified — 304 を受けてパースを省略した回数
+    """
+
+    def __init__(self, path: str = _CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._dirty = False
+        self.stats = {"hit": 0, "miss": 0, "not_modified": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = data
+        except (OSError, ValueError):
+            self._entries = {}  # 壊れたキャッシュは捨てて全件取得に戻す
+
+    def validators(self, url: str) -> tuple[str | None, str | None]:
+        """条件付き GET 用の (etag, modified) を返し、hit/miss を数える。"""
+        with self._lock:
+            entry = self._entries.get(url) or {}
+            etag, modified = entry.get("etag"), entry.get("modified")
+            self.stats["hit" if (etag or modified) else "miss"] += 1
+        return etag, modified
+
+    def cached_articles(self, url: str) -> list[dict] | None:
+        """304 応答時に再利用する前回の記事リスト（なければ None）。"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self.stats["not_modified"] += 1
+            return [_from_json_article(a) for a in entry.get("articles", [])]
+
+    def store(self, url: str, etag, modified, articles: list[dict]):
+        """200 応答の検証子と記事を保存する。検証子がなければ保存しない。"""
+        etag = etag if isinstance(etag, str) else None
+        modified = modified if isinstance(modified, str) else None
+        with self._lock:
+            if not (etag or modified):
+                self._dirty |= self._entries.pop(url, None) is not None
+                return
+            self._entries[url] = {
+                "etag": etag,
+                "modified": modified,
+                "articles": [_to_json_article(a) for a in articles],
+            }
+            self._dirty = True
+
+    def save(self, keep_urls=None):
+        """変更があればディスクへ書き出す。keep_urls 指定時はそれ以外の URL を捨てる。"""
+        with self._lock:
+            if keep_urls is not None:
+                stale = [u for u in self._entries if u not in keep_urls]
+                for u in stale:
+                    del self._entries[u]
+                self._dirty |= bool(stale)
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except (OSError, TypeError, ValueError) as e:
+                print(f"  ⚠️ フィードキャッシュ保存失敗: {e}")
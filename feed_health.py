@@ -0,0 +1,108 @@
+"""feed_health.py — フィードごとのヘルス記録とサーキットブレーカー。
+
+iter_rss_articles は0件フィードを警告するだけで、URL の切れたフィードも毎回取得し、
+タイムアウトまでスレッド枠と実行時間を使い続けていた。本モジュールは
+feed_state.json（feed_state.FeedState）の各レコードの "health" に
+
+- failures      — 連続失敗回数（例外・HTTP エラー・パース不能・フィードごとの締め切り超過）
+- last_success  — 最後に成功した時刻（epoch 秒）
+- latency       — 取得所要秒の指数移動平均
+- bytes / items — 直近成功時の受信バイト数（分かる場合）と記事数
+- open_until    — 遮断（open）を解く時刻
+
+を記録する。_FAILURE_THRESHOLD 回続けて失敗したフィードは遮断して取得対象から外し、
+期限が来たら1回だけ試験的に取得する（half-open）。成功すれば復帰、失敗すれば
+遮断期間を倍にして再び外す（上限 _MAX_OPEN_HOURS）。
+
+記録は1回の取得の最後に record_run でまとめて行う。取得したフィードが全て失敗した
+実行はランナー側のネットワーク障害などとみなして記録しない（全フィードを一斉に
+遮断しない）。全体の締め切り（rss_client._COLLECT_DEADLINE_SEC）で打ち切った
+フィードはフィード自身の失敗ではないので、呼び出し側で record_run に渡さない。
+"""
+
+import time
+
+from feed_state import FeedState
+
+# 連続失敗がこの回数に達したら遮断する
+_FAILURE_THRESHOLD = 3
+# 遮断期間（時間）: 最初は基準値、試験取得に失敗するたびに倍
+_BASE_OPEN_HOURS = 48
+_MAX_OPEN_HOURS = 14 * 24
+# 所要秒の指数移動平均の重み（直近の観測値）
+_LATENCY_ALPHA = 0.3
+
+
+class FeedHealth:
+    """FeedState の "health" レコードでフィードの遮断・試験取得・復帰を管理する。"""
+
+    def __init__(self, state: FeedState, now: float | None = None):
+        self.state = state
+        self.now = time.time() if now is None else now
+        self.stats = {"open": 0, "probes": 0, "failed": 0, "recovered": 0, "skipped": 0}
+
+    def _health(self, feed_info: dict) -> dict:
+        return self.state.get(feed_info["url"]).setdefault("health", {})
+
+    def select(self, feeds: list[dict]) -> tuple[list[dict], list[dict]]:
+        """フィード一覧を (今回取得する, 遮断中で外す) に分ける。期限切れの遮断は試験取得に回す。"""
+        admitted, blocked = [], []
+        for feed_info in feeds:
+            open_until = self._health(feed_info).get("open_until")
+            if open_until is None:
+                admitted.append(feed_info)
+            elif self.now < open_until:
+                blocked.append(feed_info)
+            else:
+                self.stats["probes"] += 1
+                admitted.append(feed_info)
+        self.stats["open"] = len(blocked)
+        return admitted, blocked
+
+    def succeeded(self, feed_info: dict, articles: list[dict] | None) -> bool:
+        """取得結果が成功か（articles=None は締め切り超過。取得エラーは FeedState の記録で判定）"""
+        fetch = self.state.last_fetch(feed_info["url"]) or {}
+        return articles is not None and fetch.get("ok", True)
+
+    def record_run(self, results: list[tuple[dict, list[dict] | None, float]]) -> bool:
+        """1回の取得結果 (feed_info, 記事リスト, 所要秒) をまとめて記録する。
+
+        全て失敗した実行は記録せずに False を返す（stats["skipped"] に件数）。
+        """
+        if results and not any(self.succeeded(f, articles) for f, articles, _ in results):
+            self.stats["skipped"] = len(results)
+            return False
+        for feed_info, articles, elapsed in results:
+            self.record(feed_info, articles, elapsed)
+        return True
+
+    def record(self, feed_info: dict, articles: list[dict] | None, elapsed: float) -> bool:
+        """1フィードの取得結果を記録する。articles=None は締め切り超過。成功なら True を返す。"""
+        health = self._health(feed_info)
+        fetch = self.state.last_fetch(feed_info["url"]) or {}
+
+        if self.succeeded(feed_info, articles):
+            if health.get("open_until") is not None:
+                self.stats["recovered"] += 1
+            prev = health.get("latency")
+            latency = elapsed if prev is None else _LATENCY_ALPHA * elapsed + (1 - _LATENCY_ALPHA) * prev
+            health.update(
+                failures=0,
+                last_success=round(self.now),
+                latency=round(latency, 2),
+                items=len(articles),
+            )
+            if fetch.get("bytes") is not None:
+                health["bytes"] = fetch["bytes"]
+            health.pop("open_until", None)
+            health.pop("last_error", None)
+            return True
+
+        self.stats["failed"] += 1
+        failures = health.get("failures", 0) + 1
+        health["failures"] = failures
+        health["last_error"] = "timeout" if articles is None else (fetch.get("error") or "error")
+        if failures >= _FAILURE_THRESHOLD:
+            hours = min(_MAX_OPEN_HOURS, _BASE_OPEN_HOURS * 2 ** (failures - _FAILURE_THRESHOLD))
+            health["open_until"] = round(self.now + hours * 3600)
+        return False
@@ -0,0 +1,85 @@
+"""feed_scheduler.py — フィードごとのポーリング間隔を学習して、低頻度フィードの取得を見送る。
+
+arXiv のように1日数十件出るフィードも、月1回しか更新されないブログも毎回同じように
+取得していた。本モジュールはフィードごとに
+
+- 新着件数の実績（前回取得以降に公開された記事数 / 日）の指数移動平均
+- 新着ゼロ（304 を含む）が続いた回数
+
+を feed_state.json（feed_state.FeedState）のレコードに覚え、新着の多いフィードは
+毎回、新着ゼロが続くフィードは間隔を倍々に空けて（上限 _MAX_INTERVAL_HOURS）取得する。
+新着が見つかれば連続ゼロ回数は 0 に戻り、すぐに毎回の取得へ復帰する。
+見送った間に公開された記事は収集窓（24時間）から外れうるが、数日に1件も出ない
+フィードに限るため、取得量の削減と引き換えに許容する。
+
+config.FEED_SCHEDULER=0（環境変数）で無効化すると全フィードを毎回取得する。
+"""
+
+import time
+
+from feed_state import FeedState
+
+# 新着率（件/日）がこれ以上のフィードは常に毎回取得する
+_HIGH_RATE_PER_DAY = 0.5
+# 新着率の指数移動平均の重み（直近の観測値）
+_RATE_ALPHA = 0.3
+# 新着ゼロがこの回数続いたら間隔を空け始める（48時間 → 96時間 …）
+_IDLE_GRACE = 3
+# 見送り間隔の基準と上限（時間）
+_BASE_INTERVAL_HOURS = 24
+_MAX_INTERVAL_HOURS = 96
+# 定期実行の開始時刻のずれを吸収する余裕（期限のこの時間前なら取得する）
+_DUE_SLACK_HOURS = 3
+
+
+class FeedScheduler:
+    """FeedState のレコード（last_polled / next_poll / rate / idle_runs）でフィードの取得可否を決める。"""
+
+    def __init__(self, state: FeedState, now: float | None = None):
+        self.state = state
+        self.now = time.time() if now is None else now
+        self.stats = {"due": 0, "deferred": 0}
+
+    def is_due(self, feed_info: dict) -> bool:
+        """今回の実行で取得すべきか（未知のフィードは常に取得）。"""
+        record = self.state.get(feed_info["url"])
+        next_poll = record.get("next_poll")
+        return next_poll is None or self.now >= next_poll - _DUE_SLACK_HOURS * 3600
+
+    def select(self, feeds: list[dict]) -> tuple[list[dict], list[dict]]:
+        """フィード一覧を (今回取得する, 見送る) に分ける。"""
+        due, deferred = [], []
+        for feed_info in feeds:
+            (due if self.is_due(feed_info) else deferred).append(feed_info)
+        self.stats["due"] = len(due)
+        self.stats["deferred"] = len(deferred)
+        return due, deferred
+
+    def record_poll(self, feed_info: dict, articles: list[dict]):
+        """取得結果から新着率と連続ゼロ回数を更新し、次回の取得予定を決める。
+
+        新着 = 前回取得（初回は基準間隔前）より後に公開された記事。304 で前回の記事を
+        再利用した場合もここに該当しないため、新着ゼロとして数える。
+        """
+        record = self.state.get(feed_info["url"])
+        last = record.get("last_polled") or self.now - _BASE_INTERVAL_HOURS * 3600
+        fresh = sum(
+            1 for a in articles
+            if a.get("published") is not None and a["published"].timestamp() > last
+        )
+        days = max((self.now - last) / 86400, 1 / 24)
+        observed = fresh / days
+        prev = record.get("rate")
+        rate = observed if prev is None else _RATE_ALPHA * observed + (1 - _RATE_ALPHA) * prev
+        idle = 0 if fresh else record.get("idle_runs", 0) + 1
+
+        record["rate"] = round(rate, 3)
+        record["idle_runs"] = idle
+        record["last_polled"] = round(self.now)
+        record["next_poll"] = round(self.now + self._interval_hours(rate, idle) * 3600)
+
+    @staticmethod
+    def _interval_hours(rate: float, idle: int) -> float:
+        if rate >= _HIGH_RATE_PER_DAY or idle < _IDLE_GRACE:
+            return 0
+        return min(_MAX_INTERVAL_HOURS, _BASE_INTERVAL_HOURS * 2 ** (idle - _IDLE_GRACE + 1))
@@ -0,0 +1,77 @@
+"""feed_state.py — フィードごとに学習したメタデータの永続化（feed_state.json）。
+
+フィードの性質（新しい順に並んでいるか等）は実行をまたいで覚えておく価値がある。
+config._load_external_feeds が読む feeds.json と同じプロジェクトルートに
+feed_state.json として保存し、フィード URL をキーにしたレコードを持つ。
+サイズが小さく、実行履歴として追跡できるよう .cache/ ではなく Git 管理下に置く
+（Stage 2 ワークフローの自動コミットで次回実行へ引き継がれる）。
+
+各レコードは dict で、機能ごとにキーを追加していく:
+    ordered / order_checks / runs_since_order_check — rss_client の早期打ち切り
+    rate / idle_runs / last_polled / next_poll — feed_scheduler のポーリング間隔
+    health — feed_health のヘルス記録とサーキットブレーカー
+"""
+
+import json
+import os
+import threading
+
+from config import FEED_STATE_PATH
+
+
+class FeedState:
+    """フィード URL → メタデータ dict の対応表（スレッドセーフな取得・保存）。
+
+    get() が返すレコードは共有の dict なので、呼び出し側はそのまま更新してよい
+    （1フィードは1ワーカーだけが触るため、レコード単位の競合は起きない）。
+    """
+
+    def __init__(self, path: str = FEED_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: dict[str, dict] = {}
+        self.stats = {"early_stops": 0, "entries_skipped": 0}
+        self._fetches: dict[str, dict] = {}  # 今回の実行での取得結果（保存しない）
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._records = data
+        except (OSError, ValueError):
+            self._records = {}  # 壊れたファイルは捨てて学習し直す
+
+    def get(self, url: str) -> dict:
+        """フィードのレコードを返す（なければ空のレコードを作る）。"""
+        with self._lock:
+            return self._records.setdefault(url, {})
+
+    def note_fetch(self, url: str, ok: bool, nbytes: int | None = None, error: str | None = None):
+        """取得ワーカーが今回の取得結果（成否・受信バイト数）を残す。feed_health が読む。"""
+        with self._lock:
+            self._fetches[url] = {"ok": ok, "bytes": nbytes, "error": error}
+
+    def last_fetch(self, url: str) -> dict | None:
+        with self._lock:
+            return self._fetches.get(url)
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + n
+
+    def save(self, keep_urls=None):
+        """ディスクへ書き出す。keep_urls 指定時はそれ以外のフィードのレコードを捨てる。"""
+        with self._lock:
+            if keep_urls is not None:
+                self._records = {u: r for u, r in self._records.items() if u in keep_urls}
+            try:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._records, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"  ⚠️ フィード状態の保存失敗: {e}")
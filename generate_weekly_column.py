@@ -11,10 +11,11 @@ import os
 import json
 import glob
 from datetime import datetime, timedelta
-from google import genai
 from dotenv import load_dotenv
 from line_notifier import send_to_line
 from config import JST
+from llm_client import generate, make_client
+from ranking import importance_key, rank
 
 load_dotenv()
 
@@ -75,7 +76,7 @@ def generate_column(items):
         print("❌ GOOGLE_API_KEY not found.")
         return None
 
-    client = genai.Client(api_key=api_key)
+    client = make_client(api_key)
     
     # URLで重複を排除
     unique_items = {}
@@ -85,11 +86,7 @@ def generate_column(items):
             unique_items[url] = item
     
     # 重要度スコアでソート（存在する場合）
-    sorted_items = sorted(
-        unique_items.values(), 
-        key=lambda x: x.get('importance_score', 0), 
-        reverse=True
-    )
+    sorted_items = rank(unique_items.values(), importance_key)
     
     # 1週間分のニュースすべてをコンテキストとして使用
     all_items = list(sorted_items)
@@ -155,11 +152,7 @@ def generate_column(items):
 """
     
     try:
-        response = client.models.generate_content(
-            model="gemini-3.7-flash",
-            contents=prompt
-        )
-        return response.text
+        return generate(client, prompt, model="gemini-3.7-flash")
     except Exception as e:
         print(f"Gemini 3.7 Flash エラー: {e}")
         return None
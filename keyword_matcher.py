@@ -0,0 +1,163 @@
+"""keyword_matcher.py — AI キーワードの多パターン照合（Aho-Corasick オートマトン）と重み付きスコア。
+
+collect_rss_gemini は config.AI_KEYWORDS の巨大な選言正規表現（re.IGNORECASE）で
+マッチ数を数えていたが、
+
+- "AI" が "maintain" の中でもマッチする（英単語の部分一致）
+- "GPT" / "GPT-4" のように重なるキーワードの扱いが正規表現の選言順に依存する
+- どのキーワードも、タイトルでも概要でも同じ 1 点
+
+という問題があった。本モジュールはキーワードを小文字化してオートマトンに
+コンパイルし、テキストを1パスで走査して次の規則でマッチを確定する:
+
+- 英数字で始まる／終わるキーワードは、その端の外側が英数字なら不成立（単語境界）。
+  CJK 側の端は境界を問わない（"生成AI" は "最新の生成AIを" にマッチ、"AI" は "maintain" に不成立）
+- ラテン文字で終わるキーワードは、語尾の複数形・三単現の "s" / "es" までを同じ語として認める
+  （"LLM" は "LLMs"、"AI agent" は "AI agents" にマッチ。"LLMset" のように続く語には不成立）
+- 重なるマッチは最左最長の1つだけを数える（"GPT-4o" は "GPT-4" が境界不成立のため "GPT"）
+- スコア = Σ キーワードの重み × (タイトルなら title_weight / 概要なら body_weight)
+
+重みとタイトル/概要の倍率は config.KEYWORD_WEIGHTS / KEYWORD_TITLE_WEIGHT /
+KEYWORD_BODY_WEIGHT。benchmarks/bench_keyword_matcher.py で旧正規表現と比較できる。
+"""
+
+from collections import deque
+
+
+def _is_word_char(ch: str) -> bool:
+    # 単語境界を判定するのはラテン文字の英数字のみ（CJK は区切りなしで連続するため対象外）
+    return ch.isascii() and ch.isalnum()
+
+
+def _suffix_end(text: str, end: int) -> int | None:
+    """text[end:] が語尾の "s" / "es" で終わる語なら、その語の終了位置（それ以外は None）"""
+    for tail in ("s", "es"):
+        stop = end + len(tail)
+        if text.startswith(tail, end) and (stop == len(text) or not _is_word_char(text[stop])):
+            return stop
+    return None
+
+
+class KeywordMatcher:
+    """キーワード集合をコンパイルしたマッチャー（スレッドセーフ・読み取り専用）。
+
+    Args:
+        keywords: キーワードのリスト（大文字小文字は区別しない。重複は1つにまとめる）
+        weights: キーワード → 重み（省略したキーワードは 1.0。キーは大文字小文字を区別しない）
+        title_weight / body_weight: タイトル・概要でのマッチに掛ける倍率
+    """
+
+    def __init__(
+        self,
+        keywords: list[str],
+        weights: dict[str, float] | None = None,
+        title_weight: float = 1.0,
+        body_weight: float = 1.0,
+    ):
+        lowered_weights = {k.lower(): w for k, w in (weights or {}).items()}
+        self.title_weight = title_weight
+        self.body_weight = body_weight
+        self.keywords: list[str] = []
+        self._weights: list[float] = []
+        # 左右の端で単語境界が必要か
+        self._bound_left: list[bool] = []
+        self._bound_right: list[bool] = []
+        # 語尾に "s" / "es" が続いてもよいか（ラテン文字で終わるキーワード）
+        self._suffix: list[bool] = []
+
+        # ノード i の遷移 / 失敗リンク / そのノードで終わるキーワード番号（長い順）
+        self._goto: list[dict[str, int]] = [{}]
+        fail = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        outputs: list[list[int]] = [[]]
+
+        seen = set()
+        for kw in keywords:
+            text = kw.lower()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            idx = len(self.keywords)
+            self.keywords.append(text)
+            self._weights.append(lowered_weights.get(text, 1.0))
+            self._bound_left.append(_is_word_char(text[0]))
+            self._bound_right.append(_is_word_char(text[-1]))
+            self._suffix.append(text[-1].isascii() and text[-1].isalpha())
+            node = 0
+            for ch in text:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    fail.append(0)
+                    outputs.append([])
+                node = nxt
+            outputs[node].append(idx)
+
+        # 幅優先で失敗リンクを張り、遷移を DFA 化する（未定義の遷移は失敗先の遷移を引き継ぐ）
+        queue = deque()
+        for ch, child in self._goto[0].items():
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            outputs[node].extend(outputs[fail[node]])
+            for ch, child in list(self._goto[node].items()):
+                f = fail[node]
+                while f and ch not in self._goto[f]:
+                    f = fail[f]
+                target = self._goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                queue.append(child)
+            # 自ノードにない遷移を失敗先から補完（走査時に失敗リンクを辿らなくて済む）
+            for ch, target in self._goto[fail[node]].items():
+                self._goto[node].setdefault(ch, target)
+        self._out = [tuple(sorted(o, key=lambda i: -len(self.keywords[i]))) for o in outputs]
+
+    def _match(self, text: str) -> list[tuple[int, int, int]]:
+        """(開始, 終了, キーワード番号) のリスト（最左最長・重なりなし、小文字化テキスト上の位置。終了は語尾の s / es を含む）。"""
+        if not text:
+            return []
+        lowered = text.lower()
+        goto, out, keywords = self._goto, self._out, self.keywords
+        bound_left, bound_right, suffix = self._bound_left, self._bound_right, self._suffix
+        size = len(lowered)
+        candidates = []  # (開始, -長さ, キーワード番号)
+        state = 0
+        for end, ch in enumerate(lowered, 1):
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for idx in out[state]:
+                    start = end - len(keywords[idx])
+                    if bound_left[idx] and start > 0 and _is_word_char(lowered[start - 1]):
+                        continue
+                    stop = end
+                    if bound_right[idx] and end < size and _is_word_char(lowered[end]):
+                        stop = _suffix_end(lowered, end) if suffix[idx] else None
+                        if stop is None:
+                            continue
+                    candidates.append((start, start - stop, idx))
+        if not candidates:
+            return []
+
+        candidates.sort()
+        matches = []
+        last_end = 0
+        for start, neg_len, idx in candidates:
+            if start >= last_end:
+                last_end = start - neg_len
+                matches.append((start, last_end, idx))
+        return matches
+
+    def find(self, text: str) -> list[tuple[int, int, str]]:
+        """text 中のマッチを (開始位置, 終了位置, キーワード（小文字）) で返す。"""
+        return [(s, e, self.keywords[i]) for s, e, i in self._match(text)]
+
+    def weight(self, text: str) -> float:
+        """text 中のマッチのキーワード重みの合計。"""
+        weights = self._weights
+        return sum(weights[i] for _, _, i in self._match(text))
+
+    def score(self, title: str, body: str = "") -> float:
+        """タイトル・概要それぞれのマッチ重みに倍率を掛けた関連度スコア。"""
+        return self.title_weight * self.weight(title) + self.body_weight * self.weight(body)
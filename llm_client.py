@@ -0,0 +1,105 @@
+"""llm_client.py — Gemini 呼び出しの共通層（応答のディスクキャッシュ付き）。
+
+Stage 1（ai_client）・Stage 2（curate_morning_brief）・週次コラム（generate_weekly_column）は
+それぞれ client.models.generate_content を直接呼んでおり、配信ステップの失敗などで
+ワークフローを再実行すると、同じプロンプトの有料呼び出しをもう一度行っていた。
+本モジュールの generate は
+
+- キー: モデル名 + プロンプトのハッシュ + 応答スキーマのハッシュ
+- 値:   応答テキスト（スキーマ指定時は JSON として読めることを確認してから保存）
+
+で disk_cache.DiskCache（config.CACHE_DIR/llm、TTL・容量上限あり）に応答を残し、
+同じ呼び出しはキャッシュから返す。LLM_CACHE=0 でキャッシュを読まずに呼び出す
+（結果は保存し直す）。ヒット率は cache_stats / print_cache_stats で確認できる。
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from google import genai
+from google.genai import types
+
+from config import CACHE_DIR, GEMINI_BASE_URL, GEMINI_MODEL, LLM_CACHE
+from disk_cache import DiskCache
+
+_LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+# 同じ日のうちの再実行（配信失敗後のやり直し等）を拾えれば十分
+_CACHE_TTL_SEC = 2 * 86400
+_CACHE_MAX_BYTES = 20 * 1024 * 1024
+
+_caches: dict[str, DiskCache] = {}
+_caches_lock = threading.Lock()
+# put → save を直列化（並列シャードの save が書き込み途中の blob を孤立扱いで消さないように）
+_store_lock = threading.Lock()
+
+
+def make_client(api_key: str) -> genai.Client:
+    """Gemini クライアント（GEMINI_BASE_URL があればそのエンドポイントへ接続）"""
+    if GEMINI_BASE_URL:
+        return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=GEMINI_BASE_URL))
+    return genai.Client(api_key=api_key)
+
+
+def _cache() -> DiskCache:
+    with _caches_lock:
+        if _LLM_CACHE_DIR not in _caches:
+            _caches[_LLM_CACHE_DIR] = DiskCache(_LLM_CACHE_DIR, _CACHE_TTL_SEC, _CACHE_MAX_BYTES)
+        return _caches[_LLM_CACHE_DIR]
+
+
+def cache_key(model: str, prompt: str, schema: types.Schema | None = None) -> str:
+    """モデル名・プロンプト・応答スキーマから決まるキャッシュキー"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+    schema_json = schema.model_dump_json(exclude_none=True) if schema is not None else ""
+    schema_hash = hashlib.sha256(schema_json.encode("utf-8")).hexdigest()[:16]
+    return f"{model}:{prompt_hash}:{schema_hash}"
+
+
+def generate(
+    client,
+    prompt: str,
+    schema: types.Schema | None = None,
+    model: str = GEMINI_MODEL,
+) -> str:
+    """プロンプトを Gemini に送り、応答テキストを返す（同じ呼び出しはキャッシュから）。
+
+    schema を渡すと JSON 出力（response_schema 付き）で呼び出し、JSON として
+    読めない応答は保存せずに json.JSONDecodeError を送出する（呼び出し側でリトライ）。
+    API エラーもそのまま送出する。
+    """
+    cache = _cache()
+    key = cache_key(model, prompt, schema)
+    if LLM_CACHE:
+        cached = cache.get(key)
+        if cached is not None:
+            print("   💾 LLM キャッシュ hit（API 呼び出しを省略）")
+            return cached
+
+    config = None
+    if schema is not None:
+        config = types.GenerateContentConfig(response_mime_type="application/json", response_schema=schema)
+    response = client.models.generate_content(model=model, contents=prompt, config=config)
+    text = response.text
+    if schema is not None:
+        text = text.strip()
+        json.loads(text)  # 壊れた JSON はキャッシュしない
+    if text:
+        with _store_lock:
+            cache.put(key, text)
+            cache.save()
+    return text
+
+
+def cache_stats() -> dict:
+    """このプロセスでの LLM キャッシュの hit / miss などの件数"""
+    return dict(_cache().stats)
+
+
+def print_cache_stats():
+    """LLM キャッシュのヒット率を1行で表示する"""
+    stats = cache_stats()
+    lookups = stats["hit"] + stats["miss"]
+    if lookups:
+        print(f"💾 LLM キャッシュ: {stats['hit']}/{lookups} hit（保存 {stats['stored']} 件）")
@@ -0,0 +1,106 @@
+"""prompt_packer.py — 入力トークン予算に収まるよう記事をプロンプトへ詰める。
+
+Stage 1（ai_client.process_with_gemini）は最大 STAGE1_MAX_ARTICLES 件の記事を
+本文 3000 文字ずつ連結しており、フィードが増えるほどプロンプトの大きさ（＝ Gemini の
+待ち時間と費用）が読めなくなっていた。本モジュールは
+
+- estimate_tokens: 文字種からトークン数を概算（ASCII は約4文字で1トークン、
+  日本語・中国語などの非 ASCII は1文字1トークン）
+- pack_articles: 優先順（渡された順）に記事を入れられるだけ入れ、予算を超える分は
+  各本文を長さに比例して削る（1件あたり min_body_chars までは残す）
+
+を提供する。トークン数はあくまで概算で、tokenizer の呼び出し（API 往復）はしない。
+"""
+
+import math
+
+# 本文の上限（従来の body[:3000] と同じ）と、予算が厳しいときにも残す下限
+_MAX_BODY_CHARS = 3000
+_MIN_BODY_CHARS = 300
+# ASCII 何文字で1トークンと見なすか
+_ASCII_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（ASCII 4文字 ≒ 1トークン、非 ASCII 1文字 ≒ 1トークン）。"""
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / _ASCII_CHARS_PER_TOKEN)
+
+
+def _allocate(wants: list[int], floors: list[int], budget: int) -> list[int]:
+    """本文ごとのトークン割り当て（希望量に比例して配分し、下限を下回る分は下限に固定）。"""
+    alloc = list(wants)
+    if sum(wants) <= budget:
+        return alloc
+    fixed: set[int] = set()
+    while True:
+        free = [i for i in range(len(wants)) if i not in fixed]
+        remaining = budget - sum(floors[i] for i in fixed)
+        total = sum(wants[i] for i in free)
+        if not free or total <= 0:
+            return alloc
+        ratio = max(0.0, remaining / total)
+        under = [i for i in free if wants[i] * ratio < floors[i]]
+        if not under:
+            for i in free:
+                alloc[i] = int(wants[i] * ratio)
+            return alloc
+        for i in under:
+            alloc[i] = floors[i]
+            fixed.add(i)
+
+
+def pack_articles(
+    articles: list[dict],
+    render,
+    budget_tokens: int,
+    max_body_chars: int = _MAX_BODY_CHARS,
+    min_body_chars: int = _MIN_BODY_CHARS,
+) -> tuple[str, list[dict], dict]:
+    """記事を優先順に予算内へ詰め、プロンプトの記事部分を組み立てる。
+
+    Args:
+        articles: 優先順に並んだ記事リスト（予算が足りなければ末尾から落とす）
+        render: render(i, article, body) -> str。i は 0 始まりの掲載順
+        budget_tokens: 記事部分の入力トークン予算
+        max_body_chars / min_body_chars: 本文（full_text、なければ summary）の上限 / 下限
+
+    Returns:
+        (記事部分のテキスト, 掲載した記事リスト, stats)
+        stats: articles / dropped / tokens / budget / trimmed（本文を削った件数）/ body_ratio
+    """
+    bodies, headers, wants, floors = [], [], [], []
+    used = 0
+    for a in articles:
+        body = (a.get("full_text") or a.get("summary") or "")[:max_body_chars]
+        header = estimate_tokens(render(len(bodies), a, ""))
+        want = estimate_tokens(body)
+        floor = min(want, estimate_tokens(body[:min_body_chars]))
+        if used + header + floor > budget_tokens and bodies:
+            break
+        used += header + floor
+        bodies.append(body)
+        headers.append(header)
+        wants.append(want)
+        floors.append(floor)
+
+    alloc = _allocate(wants, floors, budget_tokens - sum(headers))
+    included = articles[:len(bodies)]
+    parts, trimmed = [], 0
+    for i, (a, body, want, tokens) in enumerate(zip(included, bodies, wants, alloc)):
+        if tokens < want:
+            body = body[:max(1, len(body) * tokens // want)]
+            trimmed += 1
+        parts.append(render(i, a, body))
+    text = "".join(parts)
+    stats = {
+        "articles": len(included),
+        "dropped": len(articles) - len(included),
+        "tokens": estimate_tokens(text),
+        "budget": budget_tokens,
+        "trimmed": trimmed,
+        "body_ratio": round(sum(alloc) / sum(wants), 2) if sum(wants) else 1.0,
+    }
+    return text, included, stats
@@ -0,0 +1,87 @@
+"""ranking.py — 候補記事の順位付け（共通の順位キーとヒープによる上位 K 件選択）。
+
+Stage 1 / Stage 2 / 週次コラムの各所で「全件を sorted して先頭だけ使う」処理と、
+published 欠損時の datetime.min フォールバックが重複していた。本モジュールに
+
+- 順位キー: relevance_key（キーワード関連度の重み付きスコア → 公開日時）/ published_key / importance_key
+- top_k: heapq.nlargest による上位 K 件選択（O(n log k)。sorted(..., reverse=True)[:k] と同順・同点は入力順）
+- rank: 全件が必要な場合の降順ソート（キーは1件1回だけ計算）
+- TopK: ストリーム用の上位 K 件コレクター（collect_rss_gemini.stream_top_articles）
+
+をまとめる。benchmarks/bench_ranking.py で候補数を増やしたときの伸びを比較できる。
+"""
+
+import datetime
+import heapq
+from itertools import count
+
+from date_utils import parse_datetime
+
+# published 欠損（パース不能を含む）の記事は最も古い扱い
+_MIN_DT = datetime.datetime.min.replace(tzinfo=datetime.UTC)
+
+
+def published_key(a: dict) -> datetime.datetime:
+    """公開日時（datetime / ISO 文字列）。欠損は最古。"""
+    value = a.get("published")
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return value or _MIN_DT
+
+
+def relevance_key(a: dict) -> tuple:
+    """AI関連度（キーワード重み付きスコア）の降順、同点は公開日時の降順（_relevance は score 済みであること）"""
+    return (a.get("_relevance", 0), published_key(a))
+
+
+def importance_key(a: dict):
+    """Gemini が付けた重要度スコア（欠損は 0）"""
+    return a.get("importance_score", 0)
+
+
+def top_k(items, k: int, key) -> list:
+    """key の降順で上位 k 件を返す（sorted(items, key=key, reverse=True)[:k] と同じ結果）。"""
+    if k <= 0:
+        return []
+    items = items if isinstance(items, list) else list(items)
+    if k >= len(items):
+        return sorted(items, key=key, reverse=True)
+    return heapq.nlargest(k, items, key=key)
+
+
+def rank(items, key) -> list:
+    """key の降順に全件を並べる（同点は入力順）。"""
+    return sorted(items, key=key, reverse=True)
+
+
+class TopK:
+    """ストリームから key の上位 k 件だけを保持する（同点は先着を優先）。
+
+    push のたびに key を1回だけ計算し、(key, -到着順, item) の最小ヒープで保持する。
+    """
+
+    def __init__(self, k: int, key):
+        self.k = k
+        self.key = key
+        self._heap: list[tuple] = []
+        self._seq = count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item) -> tuple[bool, object | None]:
+        """item を投入し、(保持されたか, 押し出された item or None) を返す。"""
+        if self.k <= 0:
+            return False, None
+        entry = (self.key(item), -next(self._seq), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True, None
+        if entry[:2] > self._heap[0][:2]:
+            evicted = heapq.heapreplace(self._heap, entry)
+            return True, evicted[2]
+        return False, None
+
+    def items(self) -> list:
+        """保持中の item を key の降順（同点は先着順）で返す。"""
+        return [item for *_, item in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
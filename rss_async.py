@@ -0,0 +1,192 @@
+"""rss_async.py — asyncio ベースの RSS 取得エンジン（ホスト別接続プール）。
+
+既定の rss_client（スレッドプール）は feedparser.parse(url) に取得を任せるため、
+フィードごとに urllib が新しい接続を張り、同一ホストのフィード
+（blog.google ×3, rss.beehiiv.com ×2, arxiv.org ×2, rss.itmedia.co.jp ×2 など）でも
+TCP/TLS ハンドシェイクを繰り返していた。
+
+本エンジンは httpx.AsyncClient の keep-alive 接続プールでダウンロードし、
+ホストごとの同時接続数を asyncio.Semaphore で制限する（1ホストへの集中を避ける）。
+取得したバイト列は rss_client と同じ正規化（_parse_entries）に渡すため、
+出力される記事 dict はスレッドエンジンと同一。
+
+rss_client.collect_from_rss_feeds(engine="async")
+（または環境変数 RSS_FETCH_ENGINE=async）で選択する。
+httpx は google-genai の依存として CI 環境にも入っている。
+"""
+
+import asyncio
+import queue
+import threading
+from collections.abc import Iterator
+from urllib.parse import urlsplit
+
+import feedparser
+
+from feed_cache import FeedCache
+from feed_state import FeedState
+from rss_client import (
+    _COLLECT_DEADLINE_SEC,
+    _FEED_TIMEOUT_SEC,
+    _USER_AGENT,
+    _parse_entries,
+)
+from seen_index import SeenIndex
+
+# プール全体の同時接続上限
+_MAX_CONNECTIONS = 16
+# 同一ホストへの同時接続上限（行儀よく・レート制限を踏まない）
+_MAX_PER_HOST = 2
+
+
+async def _fetch_one(
+    client,
+    host_sems: dict,
+    feed_info: dict,
+    cache: FeedCache | None,
+    seen: SeenIndex | None = None,
+    since=None,
+    state: FeedState | None = None,
+    started: dict | None = None,
+) -> list[dict]:
+    """1フィードを取得・パースする。失敗時は警告を出して空リストを返す。
+
+    started を渡すと、接続枠を得て取得を始めた時刻（ループ時刻）を URL ごとに記録する。
+    """
+    url = feed_info["url"]
+    try:
+        headers = {"User-Agent": _USER_AGENT}
+        etag, modified = cache.validators(url) if cache else (None, None)
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+
+        sem = host_sems.setdefault(urlsplit(url).hostname or "", asyncio.Semaphore(_MAX_PER_HOST))
+        async with sem:
+            # フィードごとの締め切りは接続枠を得てから数える（スレッドエンジンと同じ基準）
+            if started is not None:
+                started[url] = asyncio.get_running_loop().time()
+            response = await asyncio.wait_for(client.get(url, headers=headers), _FEED_TIMEOUT_SEC)
+
+        if state is not None:
+            state.note_fetch(
+                url,
+                response.status_code < 400,
+                len(response.content),
+                None if response.status_code < 400 else f"HTTP {response.status_code}",
+            )
+        if cache and response.status_code == 304:
+            cached = cache.cached_articles(url)
+            if cached is not None:
+                return cached
+        if response.status_code >= 400:
+            print(f"  ⚠️ {feed_info['name']}: HTTP {response.status_code}")
+            return []
+
+        # パース（CPU 処理）はイベントループを塞がないようスレッドへ逃がす
+        feed = await asyncio.to_thread(
+            feedparser.parse,
+            response.content,
+            response_headers={
+                "content-type": response.headers.get("content-type", ""),
+                "content-location": str(response.url),
+            },
+        )
+        articles = _parse_entries(feed_info, feed, seen, since, state)
+        if cache:
+            cache.store(
+                url,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+                articles,
+            )
+        return articles
+    except TimeoutError:
+        raise  # 締め切り超過は呼び出し側で「打ち切り」として扱う
+    except Exception as e:  # noqa: BLE001 — 1フィードの失敗で他のフィードを止めない
+        print(f"  ⚠️ {feed_info['name']}: {e}")
+        if state is not None:
+            state.note_fetch(url, False, error=str(e))
+        return []
+
+
+async def _fetch_all(feeds: list[dict], cache: FeedCache | None, emit, transport=None, seen=None, since=None, state=None):
+    """全フィードを取得し、完了したものから emit((feed_info, 記事リスト, 所要秒)) する。
+
+    所要秒は取得開始（接続枠の獲得）から数え、取得を始める前に全体の締め切りで
+    打ち切ったフィードは 0 にする（スレッドエンジンと同じ基準）。
+    """
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=_MAX_CONNECTIONS,
+        max_keepalive_connections=_MAX_CONNECTIONS,
+    )
+    host_sems: dict[str, asyncio.Semaphore] = {}
+    loop = asyncio.get_running_loop()
+    started: dict[str, float] = {}
+    async with httpx.AsyncClient(
+        limits=limits,
+        timeout=_FEED_TIMEOUT_SEC,
+        follow_redirects=True,
+        transport=transport,
+    ) as client:
+        async def run(feed_info):
+            start = loop.time()
+            try:
+                articles = await _fetch_one(client, host_sems, feed_info, cache, seen, since, state, started)
+            except TimeoutError:
+                articles = None  # フィードごとの締め切り超過 → 打ち切り
+            emit((feed_info, articles, loop.time() - started.get(feed_info["url"], start)))
+
+        tasks = {asyncio.ensure_future(run(f)): f for f in feeds}
+        if not tasks:
+            return  # 全フィードが見送り・遮断（asyncio.wait は空の集合を受け付けない）
+        _, pending = await asyncio.wait(tasks, timeout=_COLLECT_DEADLINE_SEC)
+        # 全体の締め切りを超えたフィードは取り消して打ち切り扱いにする
+        for task in pending:
+            task.cancel()
+            st = started.get(tasks[task]["url"])
+            emit((tasks[task], None, loop.time() - st if st is not None else 0.0))
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def fetch_feeds_async(
+    feeds: list[dict],
+    cache: FeedCache | None = None,
+    transport=None,
+    seen: SeenIndex | None = None,
+    since=None,
+    state: FeedState | None = None,
+) -> Iterator[tuple[dict, list[dict] | None, float]]:
+    """全フィードを非同期に取得し、完了順に (feed_info, 記事リスト, 所要秒) を返すジェネレータ。
+
+    イベントループは別スレッドで回し、完了したフィードから順に受け渡す
+    （呼び出し側は遅いフィードを待つ間に届いた分の処理を進められる）。
+    締め切り（フィードごと _FEED_TIMEOUT_SEC / 全体 _COLLECT_DEADLINE_SEC）を
+    超えたフィードは取り消し、記事リストを None として返す。
+
+    Args:
+        feeds: config.RSS_FEEDS 形式のフィード定義リスト
+        cache: 条件付き GET 用の FeedCache（省略時はキャッシュなし）
+        transport: httpx のトランスポート差し替え（テスト・ベンチマーク用）
+        seen / since / state: 既読インデックス・収集窓・フィード状態（rss_client._parse_entries を参照）
+    """
+    results: queue.Queue = queue.Queue()
+    done = object()
+    errors: list[BaseException] = []
+
+    def run_loop():
+        try:
+            asyncio.run(_fetch_all(feeds, cache, results.put, transport, seen, since, state))
+        except BaseException as e:  # noqa: BLE001 — ループ自体の失敗は呼び出し側スレッドで送出する
+            errors.append(e)
+        finally:
+            results.put(done)
+
+    threading.Thread(target=run_loop, name="rss-async", daemon=True).start()
+    while (item := results.get()) is not done:
+        yield item
+    if errors:
+        raise errors[0]
@@ -1,108 +1,404 @@
+import contextlib
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import timezone
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import pairwise
 
 import feedparser
-from dateutil import parser as date_parser
-from config import RSS_FEEDS
+from config import FEED_SCHEDULER, FEED_STATE_PATH, RSS_FEEDS, RSS_FETCH_ENGINE
+from date_utils import DATE_PARSE_STATS, entry_datetime, reset_stats as reset_date_stats
+from feed_cache import FeedCache
+from feed_health import FeedHealth
+from feed_scheduler import FeedScheduler
+from feed_state import FeedState
+from seen_index import SeenIndex, content_hash
+from url_utils import canonical_url
 
 # RSS取得の並列度（同時接続上限）
 _MAX_WORKERS = 8
-# フィードごとのタイムアウト（秒）
+# フィードごとのタイムアウト（秒）。取得開始からこれを超えたフィードは打ち切る
+# （スレッドエンジンでは接続・受信1回ごとのソケットタイムアウトにも使う）
 _FEED_TIMEOUT_SEC = 10
+# 取得フェーズ全体の締め切り（秒）。超えたら未完了フィードを打ち切って続行する
+_COLLECT_DEADLINE_SEC = 60
+# 未着手フィードの締め切り判定を行う間隔（秒）
+_POLL_INTERVAL_SEC = 0.5
+# 取得時間の上位何件を「テール」として報告するか
+_TAIL_REPORT = 5
+# 「新しい順フィード」と判定するのに必要な、日時付きエントリの最小件数
+_ORDER_MIN_ENTRIES = 3
+# 全件パスで並びを確認できた回数がこれに達したら早期打ち切りを有効にする
+_ORDER_CONFIRMATIONS = 2
+# 早期打ち切りをこの回数続けたら、1回は全件を正規化して並びを確かめ直す
+_ORDER_RECHECK_RUNS = 10
+# 全フィード共通の User-Agent
+_USER_AGENT = "ai-news-bot/1.0"
 
 
-def _fetch_single_feed(feed_info: dict) -> list[dict]:
-    """単一のRSSフィードを取得・パースする（スレッドワーカー用）"""
+class _TimeoutHTTPHandler(urllib.request.HTTPHandler):
+    """feedparser の urllib 取得にソケットタイムアウトを付ける（既定では無期限に待つ）"""
+
+    def http_open(self, req):
+        req.timeout = _FEED_TIMEOUT_SEC
+        return super().http_open(req)
+
+
+class _TimeoutHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        req.timeout = _FEED_TIMEOUT_SEC
+        return super().https_open(req)
+
+
+class _WriteGate:
+    """打ち切ったフィードのスレッドが共有状態（FeedCache・既読インデックス・フィード状態）へ
+    書き込まないようにする。書き込みは lock を持って accepts() を確かめてから行う。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._dropped: set[str] = set()
+        self._closed = False
+
+    def drop(self, url: str):
+        """締め切りで打ち切ったフィード（以後その結果は捨てる）"""
+        with self.lock:
+            self._dropped.add(url)
+
+    def close(self):
+        """取得フェーズの終了（呼び出し側が保存に進むので、以後の書き込みはすべて捨てる）"""
+        with self.lock:
+            self._closed = True
+
+    def accepts(self, url: str) -> bool:
+        return not self._closed and url not in self._dropped
+
+
+def _entry_key(entry) -> str:
+    """既読インデックス用のエントリキー: GUID（id）があればそれ、なければ正規化 URL"""
+    guid = getattr(entry, "id", None)
+    if isinstance(guid, str) and guid:
+        return guid
+    link = getattr(entry, "link", None)
+    return canonical_url(link) if isinstance(link, str) else ""
+
+
+def _update_order(record: dict, dates: list) -> None:
+    """全件を正規化したときの公開日時の並びから「新しい順フィードか」を学習する"""
+    dated = [d for d in dates if d is not None]
+    if len(dated) < _ORDER_MIN_ENTRIES:
+        return  # 判定材料が少なすぎる（前回の判定を維持）
+    ordered = all(a >= b for a, b in pairwise(dated))
+    record["order_checks"] = record.get("order_checks", 0) + 1 if ordered else 0
+    record["ordered"] = record["order_checks"] >= _ORDER_CONFIRMATIONS
+    record["runs_since_order_check"] = 0
+
+
+def _parse_entries(
+    feed_info: dict,
+    feed,
+    seen: SeenIndex | None = None,
+    since=None,
+    state: FeedState | None = None,
+) -> list[dict]:
+    """feedparser のパース結果を内部共通の記事 dict リストへ正規化する
+
+    seen（既読インデックス）を渡すと、内容の変わらない既知エントリは日時パースを
+    省略する。since（aware datetime）も渡すと、既知エントリのうち since より古い
+    （または日時不明の）ものは記事 dict を作らずに読み飛ばす
+    （どうせ filter_by_time で捨てられるため）。
+
+    state（FeedState）を渡すと、フィードが新しい順に並んでいるかを学習し、
+    そう判定済みのフィードは since より古い最初のエントリで正規化を打ち切る。
+    並びが変わっていないか、_ORDER_RECHECK_RUNS 回ごとに全件を見て確かめ直す。
+    """
+    record = state.get(feed_info["url"]) if state is not None else {}
+    early_cutoff = (
+        since is not None
+        and record.get("ordered", False)
+        and record.get("runs_since_order_check", 0) < _ORDER_RECHECK_RUNS
+    )
+    if early_cutoff:
+        record["runs_since_order_check"] = record.get("runs_since_order_check", 0) + 1
+
     articles = []
+    dates = []  # 全件パス時の並び判定用
+    for i, entry in enumerate(feed.entries):
+        # 公開日時を取得（published または updated）
+        pub_date = None
+        if hasattr(entry, "published"):
+            pub_date = entry.published
+        elif hasattr(entry, "updated"):
+            pub_date = entry.updated
+
+        # 概要を取得
+        summary = ""
+        if hasattr(entry, "summary"):
+            summary = entry.summary
+        elif hasattr(entry, "description"):
+            summary = entry.description
+
+        title = entry.title if hasattr(entry, "title") else "No Title"
+        link = entry.link if hasattr(entry, "link") else ""
+
+        known = False
+        if seen is not None:
+            key = _entry_key(entry)
+            digest = content_hash(str(title), str(link), str(pub_date or ""), str(summary or ""))
+            known, parsed_date = seen.lookup(key, digest)
+
+        if not known:
+            # 日時をパース（feedparser の解析済み struct → RFC822/ISO 高速パス → dateutil）
+            parsed_date = entry_datetime(entry)
+            if seen is not None:
+                seen.record(key, digest, parsed_date)
+
+        # 新しい順のフィードなら、収集窓より古いエントリ以降はすべて窓の外
+        if early_cutoff and parsed_date is not None and parsed_date < since:
+            state.count("early_stops")
+            state.count("entries_skipped", len(feed.entries) - i)
+            break
+        dates.append(parsed_date)
+
+        if known and since is not None and (parsed_date is None or parsed_date < since):
+            seen.count_skipped()
+            continue
+
+        articles.append({
+            "title": title,
+            "url": link,
+            "published": parsed_date,
+            "summary": summary[:500] if summary else "",  # 最大500文字
+            "source": feed_info["name"],
+            "region": feed_info["region"],
+        })
+
+    if state is not None and not early_cutoff:
+        _update_order(record, dates)
+    return articles
+
+
+def _fetch_single_feed(
+    feed_info: dict,
+    cache: FeedCache | None = None,
+    seen: SeenIndex | None = None,
+    since=None,
+    state: FeedState | None = None,
+    gate: _WriteGate | None = None,
+) -> list[dict] | None:
+    """単一のRSSフィードを取得・パースする（スレッドワーカー用）
+
+    cache を渡すと ETag / Last-Modified で条件付き GET を行い、
+    304 Not Modified なら前回の記事リストを再利用する（パースを省略）。
+    seen / since / state は _parse_entries を参照。
+    gate を渡すと、取得後の書き込みは gate が受け付ける間だけ行い、
+    打ち切り済みなら何も書かずに None を返す。
+    """
+    url = feed_info["url"]
+    feed, error = None, None
     try:
+        etag, modified = cache.validators(url) if cache else (None, None)
         feed = feedparser.parse(
-            feed_info["url"],
-            request_headers={"User-Agent": "ai-news-bot/1.0"},
+            url,
+            etag=etag,
+            modified=modified,
+            request_headers={"User-Agent": _USER_AGENT},
+            handlers=[_TimeoutHTTPHandler(), _TimeoutHTTPSHandler()],
         )
+    except Exception as e:  # noqa: BLE001 — 失敗は下でゲートの内側から記録する
+        error = e
 
-        for entry in feed.entries:
-            # 公開日時を取得（published または updated）
-            pub_date = None
-            if hasattr(entry, "published"):
-                pub_date = entry.published
-            elif hasattr(entry, "updated"):
-                pub_date = entry.updated
-
-            # 日時をパース
-            parsed_date = None
-            if pub_date:
-                try:
-                    parsed_date = date_parser.parse(pub_date)
-                    # タイムゾーンがない場合はUTCとして扱う
-                    if parsed_date.tzinfo is None:
-                        parsed_date = parsed_date.replace(tzinfo=timezone.utc)
-                except Exception:
-                    pass
-
-            # 概要を取得
-            summary = ""
-            if hasattr(entry, "summary"):
-                summary = entry.summary
-            elif hasattr(entry, "description"):
-                summary = entry.description
-
-            articles.append({
-                "title": entry.title if hasattr(entry, "title") else "No Title",
-                "url": entry.link if hasattr(entry, "link") else "",
-                "published": parsed_date,
-                "summary": summary[:500] if summary else "",  # 最大500文字
-                "source": feed_info["name"],
-                "region": feed_info["region"],
-            })
-
-    except Exception as e:
-        print(f"  ⚠️ {feed_info['name']}: {e}")
+    with gate.lock if gate is not None else contextlib.nullcontext():
+        if gate is not None and not gate.accepts(url):
+            return None  # 締め切りで打ち切り済み・保存済み（結果は捨てられる）
+        articles = []
+        try:
+            if error is not None:
+                raise error
 
-    return articles
+            status = getattr(feed, "status", None)
+            if state is not None:
+                # 接続失敗は status なし・bozo・エントリなし、HTTP エラーは 4xx/5xx として記録
+                if status is not None and status >= 400:
+                    state.note_fetch(url, False, error=f"HTTP {status}")
+                elif status is None and feed.get("bozo") and not feed.entries:
+                    state.note_fetch(url, False, error=str(feed.get("bozo_exception", "bozo")))
+                else:
+                    length = (feed.get("headers") or {}).get("content-length")
+                    state.note_fetch(url, True, int(length) if str(length).isdigit() else None)
+
+            if cache and status == 304:
+                cached = cache.cached_articles(url)
+                if cached is not None:
+                    return cached
+
+            articles = _parse_entries(feed_info, feed, seen, since, state)
+
+            if cache:
+                cache.store(url, getattr(feed, "etag", None), getattr(feed, "modified", None), articles)
 
+        except Exception as e:
+            print(f"  ⚠️ {feed_info['name']}: {e}")
+            if state is not None:
+                state.note_fetch(url, False, error=str(e))
 
-def collect_from_rss_feeds() -> list[dict]:
+        return articles
+
+
+def _fetch_feeds_threaded(
+    feeds: list[dict],
+    cache: FeedCache | None,
+    seen: SeenIndex | None = None,
+    since=None,
+    state: FeedState | None = None,
+):
+    """スレッドプールで各フィードを取得し、完了順に (feed_info, 記事リスト, 所要秒) を返す
+
+    フィードごとの締め切り（取得開始から _FEED_TIMEOUT_SEC）と全体の締め切り
+    （_COLLECT_DEADLINE_SEC）を超えたフィードは待たずに打ち切り、記事リストを
+    None として返す。所要秒は取得開始から数え、取得を始める前に全体の締め切りで
+    打ち切ったフィードは 0 にする。feedparser の urllib は途中で止められないため、打ち切った
+    スレッドは裏で走り続けるが、ソケットタイムアウト（_TimeoutHTTPHandler）で
+    応答のない接続は終わり、共有状態への書き込みは _WriteGate で捨てる
+    （呼び出し側の保存と競合せず、保存後の状態も変えない）。
     """
-    複数のRSSフィードからニュース記事を並列収集する
+    started: dict[str, float] = {}
+    gate = _WriteGate()
 
-    Returns:
-        記事情報のリスト（タイトル、URL、公開日時、ソース名）
+    def run(feed_info):
+        started[feed_info["url"]] = time.monotonic()
+        return _fetch_single_feed(feed_info, cache, seen, since, state, gate)
+
+    begin = time.monotonic()
+    deadline = begin + _COLLECT_DEADLINE_SEC
+    executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+    try:
+        future_to_feed = {executor.submit(run, feed_info): feed_info for feed_info in feeds}
+        pending = set(future_to_feed)
+
+        while pending:
+            now = time.monotonic()
+            # 締め切り超過（全体 or 取得開始からの経過）のフィードを打ち切る
+            for future in [f for f in pending if not f.done()]:
+                feed_info = future_to_feed[future]
+                st = started.get(feed_info["url"])
+                if now >= deadline or (st is not None and now - st >= _FEED_TIMEOUT_SEC):
+                    pending.discard(future)
+                    future.cancel()
+                    gate.drop(feed_info["url"])
+                    yield feed_info, None, now - (st if st is not None else now)
+            if not pending:
+                break
+
+            # 次に締め切りを迎えるフィード（未着手があれば一定間隔）まで待つ
+            next_check = min(
+                [deadline]
+                + [started[future_to_feed[f]["url"]] + _FEED_TIMEOUT_SEC
+                   for f in pending if future_to_feed[f]["url"] in started]
+                + ([now + _POLL_INTERVAL_SEC]
+                   if any(future_to_feed[f]["url"] not in started for f in pending) else [])
+            )
+            done, pending = wait(pending, timeout=max(0.0, next_check - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                feed_info = future_to_feed[future]
+                elapsed = time.monotonic() - started.get(feed_info["url"], begin)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  ⚠️ {feed_info['name']}: {e}")
+                    result = []
+                yield feed_info, result, elapsed
+    finally:
+        # 打ち切ったフィードのスレッドを待たずに戻る（未着手分は取り消し、以後の書き込みは捨てる）
+        gate.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_rss_articles(
+    engine: str | None = None,
+    since=None,
+    schedule: bool | None = None,
+    state_path: str = FEED_STATE_PATH,
+):
     """
-    articles = []
+    複数のRSSフィードからニュース記事を並列収集し、フィードの到着順に1件ずつ返す
+
+    全記事をリストに溜めないため、呼び出し側は取得の遅いフィードを待つ間に
+    届いた分のフィルタ・スコアリングを進められる（collect_rss_gemini のストリーミング）。
+    ヘルスチェック等のサマリーは最後の記事を返した後に出力する。
+
+    Args:
+        engine: 取得エンジン。"thread"（feedparser のスレッドプール）または
+            "async"（rss_async: ホスト別接続プール）。省略時は config.RSS_FETCH_ENGINE
+        since: 収集窓の下限（aware datetime）。指定すると、既読インデックス上の
+            既知エントリのうちこれより古いものを正規化前に読み飛ばす
+        schedule: feed_scheduler で低頻度フィードの取得を見送るか。省略時は config.FEED_SCHEDULER
+        state_path: フィード状態（feed_state.json）の保存先。省略時は config.FEED_STATE_PATH
+
+    Yields:
+        記事情報（タイトル、URL、公開日時、ソース名）
+    """
+    engine = engine or RSS_FETCH_ENGINE
+    total = 0
+    feed_counts: dict[str, int] = {}
     start = time.time()
+    cache = FeedCache()
+    seen = SeenIndex()
+    state = FeedState(state_path)
+    scheduler = FeedScheduler(state)
+    health = FeedHealth(state)
+    reset_date_stats()
 
-    print(f"📡 {len(RSS_FEEDS)} フィードを並列取得中（最大{_MAX_WORKERS}スレッド）...")
-
-    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
-        future_to_feed = {
-            executor.submit(_fetch_single_feed, feed_info): feed_info
-            for feed_info in RSS_FEEDS
-        }
-
-        for future in as_completed(future_to_feed):
-            feed_info = future_to_feed[future]
-            try:
-                result = future.result(timeout=_FEED_TIMEOUT_SEC)
-                if result:
-                    articles.extend(result)
-                    print(f"  ✅ {feed_info['name']}: {len(result)} 件")
-                else:
-                    print(f"  ⏭️  {feed_info['name']}: 0 件")
-            except Exception as e:
-                print(f"  ⚠️ {feed_info['name']}: {e}")
+    # 失敗が続くフィードは遮断（期限切れなら試験取得）。その後スケジューラで間引く
+    feeds, blocked = health.select(RSS_FEEDS)
+    deferred = []
+    if FEED_SCHEDULER if schedule is None else schedule:
+        feeds, deferred = scheduler.select(feeds)
+
+    if engine == "async":
+        from rss_async import _MAX_PER_HOST, fetch_feeds_async
+        print(f"📡 {len(feeds)} フィードを非同期取得中（ホストあたり最大{_MAX_PER_HOST}接続）...")
+        results = fetch_feeds_async(feeds, cache, seen=seen, since=since, state=state)
+    else:
+        print(f"📡 {len(feeds)} フィードを並列取得中（最大{_MAX_WORKERS}スレッド）...")
+        results = _fetch_feeds_threaded(feeds, cache, seen, since, state)
+
+    # フィードごとの (所要秒, 取得フェーズ開始からの完了時刻)
+    timings: dict[str, tuple[float, float]] = {}
+    stragglers = []
+    # ヘルスに記録する取得結果（全体の締め切りで打ち切ったフィードは除く）
+    outcomes = []
+    for feed_info, result, feed_elapsed in results:
+        timings[feed_info["name"]] = (feed_elapsed, time.time() - start)
+        # 所要秒は取得開始から数える（未着手は 0）ので、フィードごとの締め切りに届かずに
+        # 打ち切られたものは全体の締め切りによる打ち切り（フィード自身の失敗ではない）
+        if result is not None or feed_elapsed >= _FEED_TIMEOUT_SEC:
+            outcomes.append((feed_info, result, feed_elapsed))
+        if result is None:
+            stragglers.append(feed_info["name"])
+            print(f"  ⏱️ {feed_info['name']}: 締め切り超過で打ち切り（{feed_elapsed:.1f}秒）")
+            continue
+        if health.succeeded(feed_info, result):
+            scheduler.record_poll(feed_info, result)
+        if result:
+            total += len(result)
+            feed_counts[feed_info["name"]] = feed_counts.get(feed_info["name"], 0) + len(result)
+            print(f"  ✅ {feed_info['name']}: {len(result)} 件")
+            yield from result
+        else:
+            print(f"  ⏭️  {feed_info['name']}: 0 件")
 
     elapsed = time.time() - start
-    print(f"✅ 合計 {len(articles)} 件の記事を取得しました（{elapsed:.1f}秒）")
+    print(f"✅ 合計 {total} 件の記事を取得しました（{elapsed:.1f}秒）")
+    health.record_run(outcomes)
+    cache.save(keep_urls={f["url"] for f in RSS_FEEDS})
+    seen.save()
+    state.save(keep_urls={f["url"] for f in RSS_FEEDS})
 
     # フィードヘルスチェック: 0件フィードを警告
-    feed_counts = {}
-    for a in articles:
-        src = a.get("source", "Unknown")
-        feed_counts[src] = feed_counts.get(src, 0) + 1
-
     zero_feeds = [
-        f["name"] for f in RSS_FEEDS if f["name"] not in feed_counts
+        f["name"] for f in feeds
+        if f["name"] not in feed_counts and f["name"] not in stragglers
     ]
     if zero_feeds:
         print(f"\n⚠️ ヘルスチェック: {len(zero_feeds)} フィードが0件")
@@ -110,4 +406,68 @@ def collect_from_rss_feeds() -> list[dict]:
             print(f"   - {name}")
         print("   → フィードURLの有効性を確認してください")
 
-    return articles
+    if blocked:
+        print(f"\n🔌 遮断中: {len(blocked)} フィード（連続失敗。期限後に試験取得）")
+        for f in blocked:
+            print(f"   - {f['name']}")
+    print(
+        f"🩺 フィードヘルス: 今回失敗 {health.stats['failed']} / 試験取得 {health.stats['probes']}"
+        f"（復帰 {health.stats['recovered']}）/ 遮断中 {health.stats['open']}"
+    )
+    if health.stats["skipped"]:
+        print(f"   → 取得した {health.stats['skipped']} フィードが全て失敗（ネットワーク障害の可能性）。今回はヘルスを記録しません")
+
+    if deferred:
+        print(f"\n📅 スケジューラ: {len(deferred)} フィードの取得を見送り（新着の少ないフィード）")
+        for f in deferred:
+            print(f"   - {f['name']}")
+
+    if stragglers:
+        print(f"\n⏱️ 打ち切り: {len(stragglers)} フィード（取得済みの記事で続行）")
+        for name in stragglers:
+            print(f"   - {name}")
+
+    # 取得フェーズのテール: 全体の 90% が揃った後に掛かった時間と、遅いフィード上位
+    if timings:
+        finish_times = sorted(t for _, t in timings.values())
+        p90 = finish_times[max(0, int(len(finish_times) * 0.9) - 1)]
+        slowest = sorted(timings.items(), key=lambda kv: kv[1][0], reverse=True)[:_TAIL_REPORT]
+        print(f"🐢 テール: 90% 到着後 {elapsed - p90:.1f}秒 / 遅いフィード: "
+              + ", ".join(f"{name} {t:.1f}s" for name, (t, _) in slowest))
+
+    # 条件付き GET の効果（304 はパース省略・前回記事を再利用）
+    stats = cache.stats
+    print(
+        f"🗂️ フィードキャッシュ: 検証子あり {stats['hit']} / なし {stats['miss']}"
+        f" / 304 {stats['not_modified']}"
+    )
+
+    seen_stats = seen.stats
+    print(
+        f"🧾 既読インデックス: 新規 {seen_stats['new']} / 既知 {seen_stats['known']}"
+        f"（うち収集窓外で省略 {seen_stats['skipped']}）"
+    )
+    ordered = sum(1 for f in RSS_FEEDS if state.get(f["url"]).get("ordered"))
+    print(
+        f"⏩ 新しい順フィード: {ordered} / 早期打ち切り {state.stats['early_stops']} フィード"
+        f"（正規化を省略 {state.stats['entries_skipped']} 件）"
+    )
+    print("🗓️ 日時パース: " + " / ".join(f"{tier} {n}" for tier, n in DATE_PARSE_STATS.items()))
+
+
+def collect_from_rss_feeds(
+    engine: str | None = None,
+    since=None,
+    schedule: bool | None = None,
+    state_path: str = FEED_STATE_PATH,
+) -> list[dict]:
+    """
+    複数のRSSフィードからニュース記事を並列収集する（iter_rss_articles のリスト版）
+
+    Args:
+        engine / since / schedule / state_path: iter_rss_articles を参照
+
+    Returns:
+        記事情報のリスト（タイトル、URL、公開日時、ソース名）
+    """
+    return list(iter_rss_articles(engine, since, schedule, state_path))
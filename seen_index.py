@@ -0,0 +1,117 @@
+"""seen_index.py — RSS エントリの既読インデックス（実行をまたいで永続化）。
+
+フィードは毎回ほぼ同じエントリを返すが、rss_client はそのたびに全エントリの
+記事 dict を作り、dateutil で日時をパースし、その大半を filter_by_time が
+「24時間より古い」として捨てていた。
+
+本インデックスはエントリを GUID（なければ正規化 URL）で識別し、内容ハッシュと
+パース済みの公開日時を覚えておく。内容が変わっていない既知エントリは
+
+- 日時パースを省略して保存済みの公開日時を使う
+- 収集窓（since）より古ければ記事 dict を作らずに読み飛ばす
+
+ため、1回の実行の CPU 時間は「フィード全体の件数」ではなく「新着件数」に比例する。
+インデックスは config.CACHE_DIR 配下の JSON。一定期間見かけなくなったエントリは
+保存時に削除する。
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import CACHE_DIR
+
+_INDEX_PATH = os.path.join(CACHE_DIR, "seen_entries.json")
+# この日数フィードに現れなかったエントリはインデックスから消す
+_RETENTION_DAYS = 14
+
+# 公開日時なし（パース失敗を含む）を表す保存値
+_NO_DATE = ""
+
+
+def content_hash(*parts: str) -> str:
+    """エントリ内容（タイトル・リンク・日時文字列・概要など）の短いハッシュ。"""
+    h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update((part or "").encode("utf-8", "surrogatepass"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class SeenIndex:
+    """エントリキー → (内容ハッシュ, 公開日時, 最終確認時刻) の対応表（スレッドセーフ）。
+
+    stats:
+        new     — 初見または内容が変わったエントリ（日時をパースした）
+        known   — 内容が同じ既知エントリ（日時パースを省略した）
+        skipped — 既知かつ収集窓より古く、記事 dict を作らずに捨てたエントリ
+    """
+
+    def __init__(self, path: str = _INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, list] = {}  # key -> [hash, published_iso, last_seen]
+        self._parsed: dict[str, datetime.datetime | None] = {}
+        self._now = time.time()
+        self.stats = {"new": 0, "known": 0, "skipped": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = data
+        except (OSError, ValueError):
+            self._entries = {}  # 壊れたインデックスは捨てて全件処理に戻す
+
+    def lookup(self, key: str, digest: str):
+        """既知かつ内容が同じなら (True, 公開日時 or None) を返す。それ以外は (False, None)。"""
+        if not key:
+            return False, None
+        with self._lock:
+            rec = self._entries.get(key)
+            if rec is None or rec[0] != digest:
+                return False, None
+            rec[2] = self._now
+            if key not in self._parsed:
+                try:
+                    self._parsed[key] = datetime.datetime.fromisoformat(rec[1]) if rec[1] else None
+                except ValueError:
+                    self._parsed[key] = None
+            self.stats["known"] += 1
+            return True, self._parsed[key]
+
+    def record(self, key: str, digest: str, published: datetime.datetime | None):
+        """新規（または内容の変わった）エントリのパース結果を登録する。"""
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = [
+                digest, published.isoformat() if published else _NO_DATE, self._now,
+            ]
+            self._parsed[key] = published
+            self.stats["new"] += 1
+
+    def count_skipped(self):
+        with self._lock:
+            self.stats["skipped"] += 1
+
+    def save(self):
+        """古いエントリを削除してディスクへ書き出す（失敗しても処理は続行）。"""
+        cutoff = self._now - _RETENTION_DAYS * 86400
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if v[2] >= cutoff}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"  ⚠️ 既読インデックス保存失敗: {e}")
@@ -5,7 +5,11 @@ AI News Bot — 単体テスト
 """
 
 import datetime
+import json
 import re
+import threading
+import time
+from typing import ClassVar
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -75,6 +79,113 @@ class TestScoreArticles:
         assert score_articles([]) == []
 
 
+class TestStreamTopArticles:
+    """ストリーミング版（逐次フィルタ＋上位 k 件ヒープ）がリスト版と同じ結果になること"""
+
+    def _articles(self):
+        now = datetime.datetime.now(datetime.UTC)
+        titles = ["ChatGPT news", "Sports", "OpenAI LLM", "Weather", "Gemini update", "Cooking"]
+        articles = []
+        for i in range(40):
+            articles.append({
+                "title": titles[i % len(titles)],
+                "summary": "",
+                "url": f"https://e.com/{i}",
+                # 同時刻の記事を混ぜ、同点時の到着順も比較する
+                "published": None if i % 7 == 0 else now - datetime.timedelta(hours=(i * 5) % 30),
+            })
+        return articles
+
+    def test_matches_list_pipeline(self):
+        from collect_rss_gemini import (
+            filter_by_time,
+            score_articles,
+            stream_top_articles,
+        )
+        expected = score_articles(filter_by_time(self._articles()))[:10]
+        top, recent = stream_top_articles(iter(self._articles()), k=10)
+        assert [a["url"] for a in top] == [a["url"] for a in expected]
+        assert recent == len(filter_by_time(self._articles()))
+
+    def test_fewer_than_k(self):
+        from collect_rss_gemini import stream_top_articles
+        top, recent = stream_top_articles(iter(self._articles()[:3]), k=30)
+        assert recent == len(top) <= 3
+
+    def test_prefetch_follows_running_top(self):
+        """暫定上位に入った記事だけ本文取得を始め、押し出された記事は取り消す"""
+        from collect_rss_gemini import stream_top_articles
+
+        class Recorder:
+            def __init__(self):
+                self.active = []
+                self.cancelled = 0
+
+            def accepts(self, a):
+                return True
+
+            def submit(self, a):
+                self.active.append(a["url"])
+
+            def cancel(self, a):
+                self.active.remove(a["url"])
+                self.cancelled += 1
+
+        rec = Recorder()
+        top, _ = stream_top_articles(iter(self._articles()), k=10, prefetcher=rec, prefetch_n=5)
+        assert sorted(rec.active) == sorted(a["url"] for a in top[:5])
+        assert rec.cancelled > 0
+
+    def test_prefetcher_deadline_and_cancel(self, tmp_path, monkeypatch):
+        """締め切りまでに揃った本文だけを付与し、取り消した記事には付けない"""
+        import threading
+
+        from article_extractor import FullTextPrefetcher
+        monkeypatch.setattr("article_extractor._FULLTEXT_CACHE_DIR", str(tmp_path / "fulltext"))
+        release = threading.Event()
+
+        def fake_download(url, **kwargs):
+            if url.endswith("/slow"):
+                release.wait(5)
+            return _SAMPLE_HTML
+
+        fast, dropped = ({"url": f"https://e.com/{n}"} for n in ("fast", "dropped"))
+        slow = {"url": "https://slow.example.org/slow"}
+        monkeypatch.setattr("article_extractor._SAVE_GRACE_SEC", 0.2)
+        with patch("article_extractor._download_html", fake_download):
+            prefetcher = FullTextPrefetcher(expected=3, domain_stats_path=str(tmp_path / "domains.json"))
+            for a in (fast, slow, dropped):
+                prefetcher.submit(a)
+            prefetcher.cancel(dropped)
+            assert prefetcher.finish(timeout=2) == 1
+            release.set()
+            prefetcher._futures[1].result(timeout=5)  # slow の取得が終わるまで待つ
+        assert fast.get("full_text") and "full_text" not in slow and "full_text" not in dropped
+        assert prefetcher.stats["late"] == 1 and prefetcher.stats["cancelled"] == 1
+        # 保存後に終わった取得はキャッシュ・取得実績に書き込まない
+        assert prefetcher.cache.get("https://slow.example.org/slow") is None
+        assert "slow.example.org" not in prefetcher.domains._records
+
+    def test_prefetcher_saves_late_fetches_within_grace(self, tmp_path, monkeypatch):
+        """締め切り後でも猶予内に終わった本文は、保存したキャッシュに残る（次回の実行で使える）"""
+        from article_extractor import FullTextPrefetcher
+        from disk_cache import DiskCache
+        monkeypatch.setattr("article_extractor._FULLTEXT_CACHE_DIR", str(tmp_path / "fulltext"))
+
+        def slow_download(url, **kwargs):
+            time.sleep(0.5)
+            return _SAMPLE_HTML
+
+        late = {"url": "https://e.com/late"}
+        with patch("article_extractor._download_html", slow_download):
+            prefetcher = FullTextPrefetcher(expected=1, domain_stats_path=str(tmp_path / "domains.json"))
+            prefetcher.submit(late)
+            assert prefetcher.finish(timeout=0.05) == 0
+        assert "full_text" not in late
+        reloaded = DiskCache(str(tmp_path / "fulltext"), ttl_sec=3600, max_bytes=1 << 20)
+        assert reloaded.get("https://e.com/late")
+
+
 # ============================================================
 # line_notifier.py — format_news_for_line
 # ============================================================
@@ -183,6 +294,712 @@ class TestFetchSingleFeed:
             assert result == []
 
 
+class TestFeedCache:
+    """条件付き GET（ETag / Last-Modified）キャッシュのテスト"""
+
+    _FEED: ClassVar[dict] = {"name": "TestFeed", "url": "https://test.com/feed", "region": "テスト"}
+
+    def _feed(self, status=200, etag='"v1"'):
+        from feedparser import FeedParserDict
+        entry = FeedParserDict(
+            title="Cached Article",
+            link="https://example.com/cached",
+            published="Mon, 23 Mar 2026 01:00:00 GMT",
+            summary="Cached summary",
+        )
+        return FeedParserDict(
+            status=status, etag=etag, entries=[entry] if status == 200 else [],
+        )
+
+    def test_not_modified_reuses_cached_articles(self, tmp_path):
+        """304 なら前回の記事を再利用し、検証子を付けて再リクエストする"""
+        from feed_cache import FeedCache
+        from rss_client import _fetch_single_feed
+
+        cache = FeedCache(str(tmp_path / "feeds.json"))
+        with patch("rss_client.feedparser.parse", return_value=self._feed()):
+            first = _fetch_single_feed(self._FEED, cache)
+        cache.save()
+
+        reloaded = FeedCache(str(tmp_path / "feeds.json"))
+        with patch("rss_client.feedparser.parse", return_value=self._feed(status=304)) as mock_parse:
+            second = _fetch_single_feed(self._FEED, reloaded)
+        assert mock_parse.call_args.kwargs["etag"] == '"v1"'
+        assert [a["url"] for a in second] == [a["url"] for a in first]
+        assert second[0]["published"] == first[0]["published"]
+        assert reloaded.stats == {"hit": 1, "miss": 0, "not_modified": 1}
+
+    def test_no_validators_not_cached(self, tmp_path):
+        """ETag / Last-Modified を返さないフィードは条件付き GET の対象外"""
+        from feed_cache import FeedCache
+        from rss_client import _fetch_single_feed
+
+        cache = FeedCache(str(tmp_path / "feeds.json"))
+        with patch("rss_client.feedparser.parse", return_value=self._feed(etag=None)):
+            _fetch_single_feed(self._FEED, cache)
+        assert cache.validators(self._FEED["url"]) == (None, None)
+        assert cache.stats["miss"] == 2
+
+
+class TestSeenIndex:
+    """既読インデックス（既知エントリの日時パース省略・収集窓外の読み飛ばし）"""
+
+    _FEED: ClassVar[dict] = {"name": "TestFeed", "url": "https://test.com/feed", "region": "テスト"}
+
+    def _feed(self):
+        from feedparser import FeedParserDict
+        return FeedParserDict(entries=[
+            FeedParserDict(id="guid-new", title="Fresh", link="https://e.com/new",
+                           published="Mon, 23 Mar 2026 01:00:00 GMT", summary="s"),
+            FeedParserDict(title="Old", link="https://e.com/old?utm_source=rss",
+                           published="Mon, 02 Mar 2026 01:00:00 GMT", summary="s"),
+        ])
+
+    def test_known_entries_skip_date_parsing(self, tmp_path):
+        from rss_client import _parse_entries
+        from seen_index import SeenIndex
+
+        first = SeenIndex(str(tmp_path / "seen.json"))
+        baseline = _parse_entries(self._FEED, self._feed(), first)
+        first.save()
+
+        second = SeenIndex(str(tmp_path / "seen.json"))
+        with patch("rss_client.entry_datetime") as mock_parse:
+            again = _parse_entries(self._FEED, self._feed(), second)
+        mock_parse.assert_not_called()
+        assert again == baseline
+        assert second.stats == {"new": 0, "known": 2, "skipped": 0}
+
+    def test_known_old_entries_dropped_before_normalization(self, tmp_path):
+        from rss_client import _parse_entries
+        from seen_index import SeenIndex
+
+        since = datetime.datetime(2026, 3, 20, tzinfo=datetime.UTC)
+        index = SeenIndex(str(tmp_path / "seen.json"))
+        _parse_entries(self._FEED, self._feed(), index, since)
+        result = _parse_entries(self._FEED, self._feed(), index, since)
+        assert [a["title"] for a in result] == ["Fresh"]
+        assert index.stats["skipped"] == 1
+
+    def test_changed_content_is_reparsed(self, tmp_path):
+        from rss_client import _parse_entries
+        from seen_index import SeenIndex
+
+        index = SeenIndex(str(tmp_path / "seen.json"))
+        _parse_entries(self._FEED, self._feed(), index)
+        feed = self._feed()
+        feed.entries[0]["published"] = "Tue, 24 Mar 2026 01:00:00 GMT"
+        result = _parse_entries(self._FEED, feed, index)
+        assert result[0]["published"].day == 24
+        assert index.stats["new"] == 3
+
+    def test_canonical_url_strips_tracking(self):
+        from url_utils import canonical_url
+        assert canonical_url("https://E.com:443/a/?utm_source=x&id=1#top") == "https://e.com/a?id=1"
+
+
+class TestFeedOrderCutoff:
+    """新しい順フィードの学習と、収集窓より古いエントリでの早期打ち切り"""
+
+    _FEED: ClassVar[dict] = {"name": "Ordered", "url": "https://ordered.example.com/rss", "region": "海外"}
+
+    def _feed(self, days=(23, 22, 10, 9, 8)):
+        from feedparser import FeedParserDict
+        return FeedParserDict(entries=[
+            FeedParserDict(title=f"T{d}", link=f"https://e.com/{d}",
+                           published=f"{d:02d} Mar 2026 01:00:00 GMT")
+            for d in days
+        ])
+
+    def test_ordered_detected_after_confirmations(self, tmp_path):
+        from feed_state import FeedState
+        from rss_client import _parse_entries
+
+        state = FeedState(str(tmp_path / "state.json"))
+        _parse_entries(self._FEED, self._feed(), state=state)
+        assert not state.get(self._FEED["url"])["ordered"]
+        _parse_entries(self._FEED, self._feed(), state=state)
+        assert state.get(self._FEED["url"])["ordered"]
+        state.save()
+        assert FeedState(str(tmp_path / "state.json")).get(self._FEED["url"])["ordered"]
+
+    def test_early_cutoff_matches_full_pass(self, tmp_path):
+        from date_utils import entry_datetime
+        from feed_state import FeedState
+        from rss_client import _parse_entries
+
+        since = datetime.datetime(2026, 3, 20, tzinfo=datetime.UTC)
+        state = FeedState(str(tmp_path / "state.json"))
+        full = _parse_entries(self._FEED, self._feed(), since=since, state=state)
+        _parse_entries(self._FEED, self._feed(), since=since, state=state)
+        with patch("rss_client.entry_datetime", wraps=entry_datetime) as spy:
+            cut = _parse_entries(self._FEED, self._feed(), since=since, state=state)
+        assert [a["title"] for a in cut] == ["T23", "T22"]
+        assert [a for a in full if a["published"] >= since] == cut
+        assert spy.call_count == 3  # 窓外の最初の1件で打ち切り
+        assert state.stats == {"early_stops": 1, "entries_skipped": 3}
+
+    def test_unordered_feed_never_cut(self, tmp_path):
+        from feed_state import FeedState
+        from rss_client import _parse_entries
+
+        since = datetime.datetime(2026, 3, 20, tzinfo=datetime.UTC)
+        state = FeedState(str(tmp_path / "state.json"))
+        for _ in range(3):
+            result = _parse_entries(self._FEED, self._feed((23, 10, 22, 9)), since=since, state=state)
+        assert not state.get(self._FEED["url"])["ordered"]
+        assert state.stats["early_stops"] == 0
+        assert len(result) == 4
+
+
+class TestFeedScheduler:
+    """新着の少ないフィードの取得見送りと、新着が出たときの復帰"""
+
+    _FEED: ClassVar[dict] = {"name": "Quiet", "url": "https://quiet.example.com/rss", "region": "海外"}
+    _DAY = 86400
+
+    def _article(self, ts):
+        return {"published": datetime.datetime.fromtimestamp(ts, datetime.UTC)}
+
+    def test_idle_feed_backs_off(self, tmp_path):
+        from feed_scheduler import FeedScheduler
+        from feed_state import FeedState
+
+        state = FeedState(str(tmp_path / "state.json"))
+        now = 1_800_000_000
+        polled = []
+        for day in range(8):
+            scheduler = FeedScheduler(state, now=now + day * self._DAY)
+            due, _ = scheduler.select([self._FEED])
+            if due:
+                polled.append(day)
+                scheduler.record_poll(self._FEED, [])  # 毎回新着ゼロ（304 相当）
+        assert polled == [0, 1, 2, 4]  # 3回連続ゼロで 48h、4回で 96h 空ける
+
+    def test_busy_feed_polled_every_run(self, tmp_path):
+        from feed_scheduler import FeedScheduler
+        from feed_state import FeedState
+
+        state = FeedState(str(tmp_path / "state.json"))
+        now = 1_800_000_000
+        for day in range(6):
+            t = now + day * self._DAY
+            scheduler = FeedScheduler(state, now=t)
+            assert scheduler.select([self._FEED])[0] == [self._FEED]
+            scheduler.record_poll(self._FEED, [self._article(t - 3600)] * 5)
+        assert state.get(self._FEED["url"])["rate"] > 1
+
+    def test_new_item_resets_backoff(self, tmp_path):
+        from feed_scheduler import FeedScheduler
+        from feed_state import FeedState
+
+        state = FeedState(str(tmp_path / "state.json"))
+        record = state.get(self._FEED["url"])
+        now = 1_800_000_000
+        record.update(rate=0.0, idle_runs=4, last_polled=now - 4 * self._DAY, next_poll=now)
+        scheduler = FeedScheduler(state, now=now)
+        scheduler.record_poll(self._FEED, [self._article(now - self._DAY)])
+        assert record["idle_runs"] == 0
+        assert scheduler.is_due(self._FEED)
+
+    def test_deferred_feeds_not_fetched(self, tmp_path):
+        from feed_cache import FeedCache
+        from feed_state import FeedState
+        from rss_client import iter_rss_articles
+        from seen_index import SeenIndex
+
+        feeds = [self._FEED, {"name": "Busy", "url": "https://busy.example.com/rss", "region": "海外"}]
+        state = FeedState(str(tmp_path / "state.json"))
+        state.get(self._FEED["url"])["next_poll"] = time.time() + 2 * self._DAY
+        state.save()
+        fetched = []
+
+        def fake_fetch(feed_info, *args):
+            fetched.append(feed_info["name"])
+            return []
+
+        with patch("rss_client.RSS_FEEDS", feeds), \
+                patch("rss_client._fetch_single_feed", fake_fetch), \
+                patch("rss_client.FeedCache", lambda: FeedCache(str(tmp_path / "c.json"))), \
+                patch("rss_client.SeenIndex", lambda: SeenIndex(str(tmp_path / "s.json"))):
+            list(iter_rss_articles(engine="thread", schedule=True, state_path=str(tmp_path / "state.json")))
+        assert fetched == ["Busy"]
+
+    def test_all_feeds_deferred_async_engine(self, tmp_path):
+        """全フィードが見送りでも非同期エンジンは空の結果で終わる（例外にしない）"""
+        from feed_cache import FeedCache
+        from feed_state import FeedState
+        from rss_client import iter_rss_articles
+        from seen_index import SeenIndex
+
+        state = FeedState(str(tmp_path / "state.json"))
+        state.get(self._FEED["url"])["next_poll"] = time.time() + 2 * self._DAY
+        state.save()
+        with patch("rss_client.RSS_FEEDS", [self._FEED]), \
+                patch("rss_client.FeedCache", lambda: FeedCache(str(tmp_path / "c.json"))), \
+                patch("rss_client.SeenIndex", lambda: SeenIndex(str(tmp_path / "s.json"))):
+            assert list(iter_rss_articles(engine="async", schedule=True, state_path=str(tmp_path / "state.json"))) == []
+
+
+class TestFeedHealth:
+    """連続失敗フィードの遮断・試験取得（half-open）・復帰"""
+
+    _FEED: ClassVar[dict] = {"name": "Dead", "url": "https://dead.example.com/rss", "region": "海外"}
+    _HOUR = 3600
+
+    def test_opens_after_consecutive_failures(self, tmp_path):
+        from feed_health import FeedHealth
+        from feed_state import FeedState
+
+        state = FeedState(str(tmp_path / "state.json"))
+        now = 1_800_000_000
+        for i in range(3):
+            health = FeedHealth(state, now=now + i)
+            assert health.select([self._FEED])[0] == [self._FEED]
+            state.note_fetch(self._FEED["url"], False, error="HTTP 404")
+            assert not health.record(self._FEED, [], 0.2)
+        record = state.get(self._FEED["url"])["health"]
+        assert record["failures"] == 3 and record["last_error"] == "HTTP 404"
+        assert FeedHealth(state, now=now + 24 * self._HOUR).select([self._FEED]) == ([], [self._FEED])
+
+    def test_half_open_probe_recovers_or_backs_off(self, tmp_path):
+        from feed_health import FeedHealth
+        from feed_state import FeedState
+
+        state = FeedState(str(tmp_path / "state.json"))
+        now = 1_800_000_000
+        state.get(self._FEED["url"])["health"] = {"failures": 3, "open_until": now}
+
+        probe = FeedHealth(state, now=now + 1)
+        assert probe.select([self._FEED])[0] == [self._FEED]
+        assert probe.stats["probes"] == 1
+        probe.record(self._FEED, None, 10.0)  # 締め切り超過 → 遮断期間を倍に
+        health = state.get(self._FEED["url"])["health"]
+        assert health["open_until"] == now + 1 + 96 * self._HOUR
+        assert health["last_error"] == "timeout"
+
+        again = FeedHealth(state, now=health["open_until"])
+        assert again.select([self._FEED])[0] == [self._FEED]
+        assert again.record(self._FEED, [{"title": "ok"}], 1.0)
+        assert "open_until" not in health and health["failures"] == 0 and health["items"] == 1
+        assert again.stats["recovered"] == 1
+
+    def test_thread_engine_reports_fetch_errors(self, tmp_path):
+        from feedparser import FeedParserDict
+
+        from feed_state import FeedState
+        from rss_client import _fetch_single_feed
+
+        state = FeedState(str(tmp_path / "state.json"))
+        with patch("rss_client.feedparser.parse",
+                   return_value=FeedParserDict(status=410, entries=[], headers={})):
+            _fetch_single_feed(self._FEED, state=state)
+        assert state.last_fetch(self._FEED["url"]) == {"ok": False, "bytes": None, "error": "HTTP 410"}
+        with patch("rss_client.feedparser.parse", side_effect=OSError("refused")):
+            _fetch_single_feed(self._FEED, state=state)
+        assert state.last_fetch(self._FEED["url"])["error"] == "refused"
+
+    def test_run_where_every_feed_fails_is_not_recorded(self, tmp_path):
+        """ランナー側のネットワーク障害（全フィード失敗）が続いても全フィードを遮断しない"""
+        from feed_health import FeedHealth
+        from feed_state import FeedState
+
+        state = FeedState(str(tmp_path / "state.json"))
+        live = {"name": "Live", "url": "https://live.example.com/rss", "region": "海外"}
+        now = 1_800_000_000
+        for i in range(3):
+            health = FeedHealth(state, now=now + i)
+            for feed in (self._FEED, live):
+                state.note_fetch(feed["url"], False, error="Name or service not known")
+            assert not health.record_run([(self._FEED, [], 0.1), (live, None, 10.0)])
+            assert health.stats["skipped"] == 2
+        assert "health" not in state.get(self._FEED["url"]) and "health" not in state.get(live["url"])
+
+        health = FeedHealth(state, now=now + 3)
+        state.note_fetch(live["url"], True, 100)
+        assert health.record_run([(self._FEED, [], 0.1), (live, [], 0.5)])
+        assert state.get(self._FEED["url"])["health"]["failures"] == 1
+        assert state.get(live["url"])["health"]["failures"] == 0
+
+    def test_feeds_cut_off_by_collect_deadline_are_not_recorded(self, tmp_path):
+        """全体の締め切りで打ち切ったフィードは失敗に数えず、自身の締め切り超過だけを数える"""
+        import rss_client
+        from feed_cache import FeedCache
+        from feed_state import FeedState
+        from seen_index import SeenIndex
+
+        feeds = [
+            {"name": "Ok", "url": "https://ok.example.com/rss", "region": "テスト"},
+            {"name": "Queued", "url": "https://queued.example.com/rss", "region": "テスト"},
+            {"name": "Late", "url": "https://late.example.com/rss", "region": "テスト"},
+            {"name": "Hung", "url": "https://hung.example.com/rss", "region": "テスト"},
+        ]
+        path = str(tmp_path / "state.json")
+        fetched = [
+            (feeds[0], [], 0.3),
+            (feeds[1], None, 0.0),  # 取得を始める前に全体の締め切り
+            (feeds[2], None, rss_client._FEED_TIMEOUT_SEC / 2),  # 取得中に全体の締め切り
+            (feeds[3], None, rss_client._FEED_TIMEOUT_SEC),  # フィード自身の締め切り超過
+        ]
+        with patch("rss_client._fetch_feeds_threaded", return_value=iter(fetched)), \
+                patch("rss_client.RSS_FEEDS", feeds), \
+                patch("rss_client.FeedCache", lambda: FeedCache(str(tmp_path / "c.json"))), \
+                patch("rss_client.SeenIndex", lambda: SeenIndex(str(tmp_path / "s.json"))):
+            assert list(rss_client.iter_rss_articles(engine="thread", schedule=False, state_path=path)) == []
+        state = FeedState(path)
+        assert not state.get(feeds[1]["url"])["health"] and not state.get(feeds[2]["url"])["health"]
+        assert state.get(feeds[3]["url"])["health"]["last_error"] == "timeout"
+
+
+class TestPromptPacker:
+    """prompt_packer: トークン概算と予算内への詰め込み"""
+
+    @staticmethod
+    def _render(i, a, body):
+        return f"記事{i + 1}: {a['title']}\n{body}\n"
+
+    def test_estimate_tokens_by_script(self):
+        from prompt_packer import estimate_tokens
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a" * 400) == 100
+        assert estimate_tokens("生成AIの規制") == 5 + 1
+
+    def test_fits_without_trimming(self):
+        from prompt_packer import pack_articles
+        articles = [{"title": f"t{i}", "summary": "x" * 400} for i in range(3)]
+        text, included, stats = pack_articles(articles, self._render, budget_tokens=10_000)
+        assert included == articles
+        assert stats["trimmed"] == 0 and stats["dropped"] == 0
+        assert text.count("x" * 400) == 3
+
+    def test_trims_in_proportion_and_respects_budget(self):
+        from prompt_packer import estimate_tokens, pack_articles
+        articles = [
+            {"title": "long", "full_text": "a" * 3000, "summary": "s"},
+            {"title": "short", "summary": "b" * 1200},
+        ]
+        text, included, stats = pack_articles(articles, self._render, budget_tokens=500)
+        assert len(included) == 2 and stats["trimmed"] == 2
+        assert estimate_tokens(text) <= 500
+        # 長い本文ほど多く残る（比例配分）
+        assert text.count("a") > 2 * text.count("b")
+
+    def test_drops_lowest_priority_when_floors_exceed_budget(self):
+        from prompt_packer import estimate_tokens, pack_articles
+        articles = [{"title": f"t{i}", "summary": "本文" * 500} for i in range(5)]
+        text, included, stats = pack_articles(articles, self._render, budget_tokens=1000)
+        assert included == articles[:len(included)] and stats["dropped"] > 0
+        assert estimate_tokens(text) <= 1000
+
+
+class TestRanking:
+    """ranking: ヒープによる上位 K 件選択が全件ソートと同じ順序になること"""
+
+    def _items(self, n=200):
+        import random
+        rng = random.Random(7)
+        return [{"id": i, "importance_score": rng.randint(1, 10)} for i in range(n)]
+
+    def test_top_k_matches_sorted_slice(self):
+        from ranking import importance_key, top_k
+        items = self._items()
+        for k in (0, 1, 10, 199, 200, 500):
+            expected = sorted(items, key=importance_key, reverse=True)[:k]
+            assert [a["id"] for a in top_k(items, k, importance_key)] == [a["id"] for a in expected]
+
+    def test_streaming_top_k_keeps_first_arrivals_on_ties(self):
+        from ranking import TopK, importance_key
+        top = TopK(3, importance_key)
+        pushes = [top.push({"id": i, "importance_score": s}) for i, s in enumerate([5, 5, 5, 5, 9])]
+        assert [kept for kept, _ in pushes] == [True, True, True, False, True]
+        assert pushes[4][1]["id"] == 2  # 同点の最後着が押し出される
+        assert [a["id"] for a in top.items()] == [4, 0, 1]
+
+    def test_published_key_fallbacks(self):
+        from ranking import published_key, relevance_key
+        utc = datetime.UTC
+        assert published_key({"published": "2026-03-01T00:00:00+00:00"}) == datetime.datetime(2026, 3, 1, tzinfo=utc)
+        assert published_key({"published": None}) == published_key({}) == datetime.datetime.min.replace(tzinfo=utc)
+        # 重み付きスコアの高い記事が先、同点なら新しい記事が先
+        newer, older = "2026-03-02T00:00:00+00:00", "2026-03-01T00:00:00+00:00"
+        assert relevance_key({"_relevance": 3.0, "published": older}) > relevance_key({"_relevance": 0.5, "published": newer})
+        assert relevance_key({"_relevance": 0.5, "published": newer}) > relevance_key({"_relevance": 0.5, "published": older})
+
+
+class TestDateUtils:
+    """日時の段階的パース（struct → キャッシュ → RFC822/ISO → dateutil）"""
+
+    _SAMPLES = (
+        "Mon, 23 Mar 2026 01:00:00 GMT",
+        "Mon, 23 Mar 2026 10:00:00 +0900",
+        "2026-03-23T01:00:00Z",
+        "2026-03-23T10:00:00+09:00",
+        "2026-03-23 01:00:00",
+        "March 23, 2026 1:00 AM",
+    )
+
+    def test_same_instant_as_dateutil(self):
+        from dateutil import parser as date_parser
+
+        from date_utils import parse_datetime
+        for text in self._SAMPLES:
+            expected = date_parser.parse(text)
+            if expected.tzinfo is None:
+                expected = expected.replace(tzinfo=datetime.UTC)
+            assert parse_datetime(text) == expected, text
+
+    def test_tier_counters(self):
+        import date_utils
+        date_utils.reset_stats()
+        date_utils._cache.clear()
+        date_utils.parse_datetime("Tue, 24 Mar 2026 01:00:00 GMT")
+        date_utils.parse_datetime("Tue, 24 Mar 2026 01:00:00 GMT")
+        date_utils.parse_datetime("2026-03-24T01:00:00Z")
+        date_utils.parse_datetime("not a date at all")
+        stats = date_utils.DATE_PARSE_STATS
+        assert (stats["rfc822"], stats["cached"], stats["iso"], stats["failed"]) == (1, 1, 1, 1)
+
+    def test_entry_prefers_feedparser_struct(self):
+        import time
+
+        from feedparser import FeedParserDict
+
+        from date_utils import entry_datetime
+        entry = FeedParserDict(
+            published="garbage that dateutil cannot read",
+            published_parsed=time.struct_time((2026, 3, 23, 1, 0, 0, 0, 82, 0)),
+        )
+        assert entry_datetime(entry) == datetime.datetime(2026, 3, 23, 1, tzinfo=datetime.UTC)
+
+    def test_dedup_published_key_uses_fast_path(self):
+        from dedup import _published_key
+        assert _published_key({"published": "2026-03-23T10:00:00+09:00"}) == \
+            datetime.datetime(2026, 3, 23, 1, tzinfo=datetime.UTC)
+        assert _published_key({"published": "???"}).year == 1
+
+
+class TestFeedDeadlines:
+    """フィード単位・全体の締め切り（遅いフィードを待たずに続行する）"""
+
+    def _feeds(self):
+        return [
+            {"name": "Fast", "url": "https://fast.example.com/feed", "region": "テスト"},
+            {"name": "Slow", "url": "https://slow.example.com/feed", "region": "テスト"},
+        ]
+
+    def test_straggler_abandoned_and_run_continues(self, tmp_path):
+        import threading
+        import time
+
+        import rss_client
+        from feed_cache import FeedCache
+        from seen_index import SeenIndex
+
+        release = threading.Event()
+
+        def fake_fetch(feed_info, *args):
+            if feed_info["name"] == "Slow":
+                release.wait(5)
+                return [{"title": "late", "source": "Slow"}]
+            return [{"title": "ok", "source": "Fast"}]
+
+        start = time.monotonic()
+        try:
+            with patch("rss_client._fetch_single_feed", side_effect=fake_fetch), \
+                    patch("rss_client._FEED_TIMEOUT_SEC", 0.2), \
+                    patch("rss_client.RSS_FEEDS", self._feeds()), \
+                    patch("rss_client.FeedCache", lambda: FeedCache(str(tmp_path / "c.json"))), \
+                    patch("rss_client.SeenIndex", lambda: SeenIndex(str(tmp_path / "s.json"))):
+                articles = rss_client.collect_from_rss_feeds(engine="thread", state_path=str(tmp_path / "state.json"))
+        finally:
+            release.set()
+        assert time.monotonic() - start < 2
+        assert [a["title"] for a in articles] == ["ok"]
+
+    def test_threaded_reports_stragglers_as_none(self):
+        import threading
+
+        import rss_client
+
+        release = threading.Event()
+
+        def fake_fetch(feed_info, *args):
+            if feed_info["name"] == "Slow":
+                release.wait(5)
+            return []
+
+        try:
+            with patch("rss_client._fetch_single_feed", side_effect=fake_fetch), \
+                    patch("rss_client._COLLECT_DEADLINE_SEC", 0.2):
+                results = {f["name"]: (r, t) for f, r, t in rss_client._fetch_feeds_threaded(self._feeds(), None)}
+        finally:
+            release.set()
+        assert results["Fast"][0] == []
+        assert results["Slow"][0] is None
+
+    def test_thread_fetch_socket_timeout(self, tmp_path):
+        """応答しないサーバーでもスレッドはソケットタイムアウトで終わる（無期限に残らない）"""
+        import socket
+        import time
+
+        from feed_state import FeedState
+        from rss_client import _fetch_single_feed
+
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)  # 接続は受けるが何も返さない
+        feed = {"name": "Hang", "url": f"http://127.0.0.1:{server.getsockname()[1]}/feed", "region": "テスト"}
+        state = FeedState(str(tmp_path / "state.json"))
+        start = time.monotonic()
+        try:
+            with patch("rss_client._FEED_TIMEOUT_SEC", 0.3):
+                assert _fetch_single_feed(feed, state=state) == []
+        finally:
+            server.close()
+        assert time.monotonic() - start < 3
+        assert state.last_fetch(feed["url"])["ok"] is False
+
+    def test_abandoned_worker_does_not_write_shared_state(self, tmp_path):
+        """打ち切り・保存後に完了したスレッドは FeedCache・既読・フィード状態に書き込まない"""
+        from feedparser import FeedParserDict
+
+        from feed_cache import FeedCache
+        from feed_state import FeedState
+        from rss_client import _fetch_single_feed, _WriteGate
+        from seen_index import SeenIndex
+
+        cache = FeedCache(str(tmp_path / "c.json"))
+        seen = SeenIndex(str(tmp_path / "s.json"))
+        state = FeedState(str(tmp_path / "state.json"))
+        feed = FeedParserDict(status=200, etag='"v1"', headers={}, entries=[
+            FeedParserDict(title="late", link="https://slow.example.com/a", id="a"),
+        ])
+        dropped, closed = _WriteGate(), _WriteGate()
+        dropped.drop(self._feeds()[1]["url"])
+        closed.close()
+        with patch("rss_client.feedparser.parse", return_value=feed):
+            for gate in (dropped, closed):
+                assert _fetch_single_feed(self._feeds()[1], cache, seen, None, state, gate) is None
+            assert cache.validators(self._feeds()[1]["url"]) == (None, None)
+            assert state.last_fetch(self._feeds()[1]["url"]) is None
+            assert "a" not in seen._entries
+            # 受け付けている間は従来どおり書き込む
+            assert len(_fetch_single_feed(self._feeds()[1], cache, seen, None, state, _WriteGate())) == 1
+        assert cache.validators(self._feeds()[1]["url"])[0] == '"v1"'
+
+    def test_async_per_feed_timeout(self):
+        import asyncio
+
+        import httpx
+
+        from rss_async import fetch_feeds_async
+
+        async def handler(request):
+            if request.url.host == "slow.example.com":
+                await asyncio.sleep(5)
+            return httpx.Response(200, content=_SAMPLE_RSS)
+
+        with patch("rss_async._FEED_TIMEOUT_SEC", 0.2):
+            results = {f["name"]: r for f, r, _ in fetch_feeds_async(self._feeds(), transport=httpx.MockTransport(handler))}
+        assert len(results["Fast"]) == 2
+        assert results["Slow"] is None
+
+    def test_async_unstarted_feeds_report_zero_elapsed(self):
+        """接続枠を待つ間に全体の締め切りを迎えたフィードの所要秒は 0（取得を始めていない）"""
+        import asyncio
+
+        import httpx
+
+        from rss_async import fetch_feeds_async
+
+        async def handler(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, content=_SAMPLE_RSS)
+
+        feeds = [{"name": f"Feed{i}", "url": f"https://one.example.com/{i}.xml", "region": "テスト"} for i in range(3)]
+        with patch("rss_async._MAX_PER_HOST", 1), patch("rss_async._COLLECT_DEADLINE_SEC", 0.3):
+            results = list(fetch_feeds_async(feeds, transport=httpx.MockTransport(handler)))
+        assert all(articles is None for _, articles, _ in results)
+        assert sorted(elapsed > 0 for _, _, elapsed in results) == [False, False, True]
+
+
+_SAMPLE_RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Stub</title>
+<item><title>OpenAI releases a new model</title><link>https://example.com/a</link>
+<pubDate>Mon, 23 Mar 2026 01:00:00 GMT</pubDate><description>LLM news</description></item>
+<item><title>Second item</title><link>https://example.com/b</link>
+<pubDate>Sun, 22 Mar 2026 01:00:00 GMT</pubDate><description>More</description></item>
+</channel></rss>"""
+
+
+class TestAsyncFeedEngine:
+    """asyncio 取得エンジン（httpx.MockTransport でネットワークなし）"""
+
+    def _feeds(self, n, host="feeds.example.com"):
+        return [
+            {"name": f"Feed{i}", "url": f"https://{host}/{i}.xml", "region": "テスト"}
+            for i in range(n)
+        ]
+
+    def test_same_articles_as_thread_engine(self):
+        """同じ XML から、スレッドエンジンと同一の記事 dict を作る"""
+        import feedparser
+        import httpx
+
+        from rss_async import fetch_feeds_async
+        from rss_client import _parse_entries
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=_SAMPLE_RSS))
+        feeds = self._feeds(1)
+        [(feed_info, articles, _)] = fetch_feeds_async(feeds, transport=transport)
+        assert feed_info is feeds[0]
+        assert articles == _parse_entries(feeds[0], feedparser.parse(_SAMPLE_RSS))
+
+    def test_per_host_concurrency_limit(self):
+        """同一ホストへの同時接続は _MAX_PER_HOST を超えない"""
+        import asyncio
+
+        import httpx
+
+        from rss_async import _MAX_PER_HOST, fetch_feeds_async
+
+        active = {"now": 0, "peak": 0}
+
+        async def handler(request):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return httpx.Response(200, content=_SAMPLE_RSS)
+
+        results = list(fetch_feeds_async(self._feeds(6), transport=httpx.MockTransport(handler)))
+        assert len(results) == 6
+        assert active["peak"] <= _MAX_PER_HOST
+
+    def test_conditional_get_and_http_error(self, tmp_path):
+        """検証子を送り 304 なら前回分を再利用、4xx は 0 件"""
+        import httpx
+
+        from feed_cache import FeedCache
+        from rss_async import fetch_feeds_async
+
+        def handler(request):
+            if request.url.path == "/gone.xml":
+                return httpx.Response(404)
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=_SAMPLE_RSS, headers={"ETag": '"v1"'})
+
+        feeds = self._feeds(1) + [{"name": "Gone", "url": "https://feeds.example.com/gone.xml", "region": "テスト"}]
+        cache = FeedCache(str(tmp_path / "feeds.json"))
+        transport = httpx.MockTransport(handler)
+        first = {f["name"]: a for f, a, _ in fetch_feeds_async(feeds, cache, transport)}
+        second = {f["name"]: a for f, a, _ in fetch_feeds_async(feeds, cache, transport)}
+        assert second["Feed0"] == first["Feed0"] and len(first["Feed0"]) == 2
+        assert second["Gone"] == []
+        assert cache.stats["not_modified"] == 1
+
+
 # ============================================================
 # プロンプト内容の検証
 # ============================================================
@@ -193,8 +1010,8 @@ class TestPromptIntegrity:
     def test_ai_client_no_40s_in_prompt(self):
         """ai_client.py のプロンプトに40代が含まれないこと"""
         import inspect
-        from ai_client import process_with_gemini
-        source = inspect.getsource(process_with_gemini)
+        import ai_client
+        source = inspect.getsource(ai_client)
         # 禁止指示の文脈以外で「40代」が使われていないことを確認
         # 「40代」「30代」等を禁止する指示行自体は許容
         lines = source.split("\n")
@@ -213,31 +1030,236 @@ class TestPromptIntegrity:
                 pytest.fail(f"curate_morning_brief.py に「40代」表現が残存: {line.strip()}")
 
 
+class TestStage1Shards:
+    """ai_client: 分割・並列分析とマージ（Gemini はフェイク）"""
+
+    class FakeClient:
+        def __init__(self, fail_titles=()):
+            self.models = self
+            self.prompts = []
+            self.fail_titles = set(fail_titles)
+            self._lock = threading.Lock()
+
+        def generate_content(self, model, contents, config):
+            with self._lock:
+                self.prompts.append(contents)
+                failing = [t for t in self.fail_titles if f"タイトル: {t}\n" in contents]
+                for t in failing:
+                    self.fail_titles.discard(t)
+            if failing:
+                raise RuntimeError("503 UNAVAILABLE")
+            titles = re.findall(r"^タイトル: (.*)$", contents, re.MULTILINE)
+            n_out = int(re.search(r"必ず(\d+)件", contents).group(1))
+            results = [
+                {"index": i + 1, "title_ja": t, "importance_score": int(t.split("-")[1])}
+                for i, t in enumerate(titles)
+            ]
+            results.sort(key=lambda r: -r["importance_score"])
+            return MagicMock(text=json.dumps(results[:n_out]))
+
+    @staticmethod
+    def _articles(n):
+        return [
+            {"title": f"t-{i % 10}-{i}", "source": "S", "region": "米国", "url": f"https://e.com/{i}",
+             "summary": "x", "published": f"2026-01-01T00:{i:02d}:00+00:00"}
+            for i in range(n)
+        ]
+
+    @pytest.fixture(autouse=True)
+    def _isolated_llm_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("llm_client._LLM_CACHE_DIR", str(tmp_path / "llm"))
+        self._tmp = tmp_path
+
+    def _run(self, monkeypatch, client, articles, shards):
+        import ai_client
+        # 実行ごとに空の分析結果ストア（前の実行の結果を再利用させない）
+        store = self._tmp / f"analysis_{len(list(self._tmp.glob('analysis_*')))}.json"
+        monkeypatch.setenv("GOOGLE_API_KEY", "test")
+        monkeypatch.setattr(ai_client, "make_client", lambda key: client)
+        monkeypatch.setattr(ai_client.time, "sleep", lambda s: None)
+        return ai_client.process_with_gemini(articles, max_articles=10, shards=shards, store_path=str(store))
+
+    def test_sharded_merge_matches_single_call(self, monkeypatch):
+        """3分割でも、1回で分析した場合と同じ上位10件がスコア順に並ぶ"""
+        articles = self._articles(30)
+        single = self._run(monkeypatch, self.FakeClient(), articles, shards=1)
+        client = self.FakeClient()
+        sharded = self._run(monkeypatch, client, articles, shards=3)
+        assert len(client.prompts) == 3
+        assert all("必ず7件" in p for p in client.prompts)
+        assert [a["url"] for a in sharded] == [a["url"] for a in single]
+        scores = [a["importance_score"] for a in sharded]
+        assert scores == sorted(scores, reverse=True) and len(sharded) == 10
+
+    def test_failed_shard_retried_alone(self, monkeypatch):
+        """失敗したシャードだけを再送する"""
+        articles = self._articles(30)
+        client = self.FakeClient(fail_titles=[articles[-1]["title"]])
+        result = self._run(monkeypatch, client, articles, shards=3)
+        assert len(client.prompts) == 4
+        assert len(result) == 10
+
+    def test_small_input_not_sharded(self, monkeypatch):
+        """候補が少なければ分割しない（1シャード _MIN_SHARD_ARTICLES 件以上）"""
+        client = self.FakeClient()
+        result = self._run(monkeypatch, client, self._articles(12), shards=3)
+        assert len(client.prompts) == 1 and "必ず10件" in client.prompts[0]
+        assert len(result) == 10
+
+    def test_budget_drops_least_relevant_not_oldest(self, monkeypatch):
+        """予算超過で落とすのは関連度の低い記事（公開日時の古い記事ではない）"""
+        import ai_client
+        articles = self._articles(20)
+        for a in articles[:5]:
+            a["_relevance"] = 3.0  # 最も古い5件が最も関連度が高い
+        monkeypatch.setattr(ai_client, "STAGE1_INPUT_TOKEN_BUDGET", 400)
+        client = self.FakeClient()
+        self._run(monkeypatch, client, articles, shards=1)
+        sent = re.findall(r"^タイトル: (.*)$", client.prompts[0], re.MULTILINE)
+        assert 5 < len(sent) < 20
+        assert sent[:5] == [a["title"] for a in reversed(articles[:5])]
+        assert sent[5:] == [a["title"] for a in reversed(articles[5:])][:len(sent) - 5]
+
+
+class TestAnalysisStore:
+    """analysis_store: 分析済み記事の再利用（Stage 1 → Stage 2）"""
+
+    @pytest.fixture(autouse=True)
+    def _isolated(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("llm_client._LLM_CACHE_DIR", str(tmp_path / "llm"))
+        monkeypatch.setenv("GOOGLE_API_KEY", "test")
+        self._store = str(tmp_path / "analysis.json")
+
+    def _run(self, monkeypatch, articles):
+        import ai_client
+        client = TestStage1Shards.FakeClient()
+        monkeypatch.setattr(ai_client, "make_client", lambda key: client)
+        return ai_client.process_with_gemini(articles, max_articles=5, shards=1, store_path=self._store), client
+
+    def test_second_run_sends_only_unseen(self, monkeypatch):
+        articles = TestStage1Shards._articles(12)
+        first, _ = self._run(monkeypatch, articles)
+        later = TestStage1Shards._articles(15)  # 同じ12件（コピー）+ 新着3件
+        second, client = self._run(monkeypatch, later)
+        assert len(client.prompts) == 1
+        sent = re.findall(r"^タイトル: (.*)$", client.prompts[0], re.MULTILINE)
+        assert sorted(sent) == sorted(a["title"] for a in later[12:])
+        # 再利用した分析結果と新規分（スコア 2〜4）を合わせてスコア順に選ぶ
+        assert [a["url"] for a in second] == [a["url"] for a in first]
+        assert [a["importance_score"] for a in second] == [9, 8, 7, 6, 5]
+        assert second[0]["title_ja"] == first[0]["title_ja"]
+
+    def test_changed_content_is_reanalysed(self, monkeypatch):
+        articles = TestStage1Shards._articles(3)
+        self._run(monkeypatch, articles)
+        edited = TestStage1Shards._articles(3)
+        edited[0]["summary"] = "続報で内容が更新された"
+        edited[1]["url"] += "?utm_source=rss"  # トラッキング付きでも同じ記事
+        _, client = self._run(monkeypatch, edited)
+        sent = re.findall(r"^タイトル: (.*)$", client.prompts[0], re.MULTILINE)
+        assert sent == [edited[0]["title"]]
+
+    def test_expired_records_ignored(self, tmp_path):
+        from analysis_store import AnalysisStore
+        path = str(tmp_path / "store.json")
+        article = {"url": "https://e.com/a", "title": "t", "summary": "s"}
+        store = AnalysisStore(path, now=0)
+        store.record(article, {"title_ja": "見出し", "importance_score": 7, "extra": "x"})
+        store.record({"url": "https://e.com/b", "title": "u"}, None)
+        store.save()
+        reloaded = AnalysisStore(path, now=3600)
+        assert reloaded.get(article) == {"title_ja": "見出し", "importance_score": 7}
+        assert reloaded.get({"url": "https://e.com/b", "title": "u"}) == {}
+        assert AnalysisStore(path, now=2 * 86400).get(article) is None
+
+
+class TestLLMCache:
+    """llm_client: モデル・プロンプト・スキーマをキーにした応答キャッシュ"""
+
+    @pytest.fixture(autouse=True)
+    def _isolated_llm_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("llm_client._LLM_CACHE_DIR", str(tmp_path / "llm"))
+
+    @staticmethod
+    def _client(*texts):
+        client = MagicMock()
+        client.models.generate_content.side_effect = [MagicMock(text=t) for t in texts]
+        return client
+
+    def test_identical_call_served_from_cache(self):
+        from google.genai import types
+
+        import llm_client
+        schema = types.Schema(type=types.Type.ARRAY, items=types.Schema(type=types.Type.STRING))
+        client = self._client('["a"]', '["b"]')
+        assert llm_client.generate(client, "prompt", schema) == '["a"]'
+        assert llm_client.generate(client, "prompt", schema) == '["a"]'
+        # スキーマが違えば別の呼び出し
+        assert llm_client.generate(client, "prompt", types.Schema(type=types.Type.STRING)) == '["b"]'
+        assert client.models.generate_content.call_count == 2
+        assert llm_client.cache_stats()["hit"] == 1
+
+    def test_invalid_json_not_cached(self):
+        from google.genai import types
+
+        import llm_client
+        schema = types.Schema(type=types.Type.OBJECT)
+        client = self._client("{broken", '{"ok": true}')
+        with pytest.raises(json.JSONDecodeError):
+            llm_client.generate(client, "prompt", schema)
+        assert llm_client.generate(client, "prompt", schema) == '{"ok": true}'
+        assert client.models.generate_content.call_count == 2
+
+    def test_bypass_switch_refreshes(self, monkeypatch):
+        import llm_client
+        llm_client.generate(self._client("old"), "column prompt")
+        monkeypatch.setattr("llm_client.LLM_CACHE", False)
+        assert llm_client.generate(self._client("new"), "column prompt") == "new"
+        monkeypatch.setattr("llm_client.LLM_CACHE", True)
+        assert llm_client.generate(self._client(), "column prompt") == "new"
+
+
 # ============================================================
 # キーワードパターンの検証
 # ============================================================
 
 class TestKeywordPattern:
-    """正規表現キーワードパターンの動作を確認"""
-
-    def test_pattern_compiles(self):
-        from collect_rss_gemini import _KEYWORD_PATTERN
-        assert isinstance(_KEYWORD_PATTERN, re.Pattern)
-
-    def test_pattern_matches_common_keywords(self):
-        from collect_rss_gemini import _KEYWORD_PATTERN
-        test_cases = ["ChatGPT", "LLM", "機械学習", "OpenAI", "生成AI"]
-        for keyword in test_cases:
-            _KEYWORD_PATTERN.findall(keyword)
-            # キーワードリスト全体を知らないので、マッチ/非マッチは個別検証しない
-
-    def test_pattern_case_insensitive(self):
-        from collect_rss_gemini import _KEYWORD_PATTERN
-        text = "chatgpt is great"
-        matches_lower = _KEYWORD_PATTERN.findall(text)
-        text_upper = "CHATGPT IS GREAT"
-        matches_upper = _KEYWORD_PATTERN.findall(text_upper)
-        assert len(matches_lower) == len(matches_upper)
+    """キーワードマッチャー（Aho-Corasick）の動作を確認"""
+
+    def test_matcher_compiles(self):
+        from collect_rss_gemini import _KEYWORD_MATCHER
+        from keyword_matcher import KeywordMatcher
+        assert isinstance(_KEYWORD_MATCHER, KeywordMatcher)
+
+    def test_matcher_matches_common_keywords(self):
+        from collect_rss_gemini import _KEYWORD_MATCHER
+        for keyword in ["ChatGPT", "LLM", "機械学習", "OpenAI", "生成AI"]:
+            assert [kw for _, _, kw in _KEYWORD_MATCHER.find(keyword)] == [keyword.lower()]
+
+    def test_matcher_case_insensitive(self):
+        from collect_rss_gemini import _KEYWORD_MATCHER
+        assert _KEYWORD_MATCHER.find("chatgpt is great") == _KEYWORD_MATCHER.find("CHATGPT IS GREAT")
+
+    def test_word_boundaries_and_longest_match(self):
+        from keyword_matcher import KeywordMatcher
+        m = KeywordMatcher(["AI", "GPT", "GPT-4", "生成AI", "AI規制"])
+        assert m.find("maintain the chain") == []
+        assert [kw for _, _, kw in m.find("GPT-4 vs GPT-4o")] == ["gpt-4", "gpt"]
+        assert [kw for _, _, kw in m.find("最新の生成AIと新AI規制")] == ["生成ai", "ai規制"]
+        # 複数形・三単現の s / es は同じ語として数える（続く語には不成立）
+        m = KeywordMatcher(["LLM", "transformer", "language model", "AI agent", "embedding", "GPT-4"])
+        assert [kw for _, _, kw in m.find("New benchmark for LLMs")] == ["llm"]
+        assert [kw for _, _, kw in m.find("Transformers and language models power AI agents")] == \
+            ["transformer", "language model", "ai agent"]
+        assert [kw for _, _, kw in m.find("Better embeddings (LLMes?)")] == ["embedding", "llm"]
+        assert m.find("LLMset agentsx") == [] and m.find("GPT-4s") == []
+        assert m.find("LLMs")[0][:2] == (0, 4)
+
+    def test_weighted_title_and_body_score(self):
+        from keyword_matcher import KeywordMatcher
+        m = KeywordMatcher(["LLM", "Google"], weights={"google": 0.5}, title_weight=2.0, body_weight=1.0)
+        assert m.score("New LLM", "from Google") == 2.0 * 1.0 + 1.0 * 0.5
+        assert m.score("", "") == 0
 
 
 # ============================================================
@@ -340,6 +1362,84 @@ class TestDedup:
         for order in itertools.permutations([a, b, c]):
             assert len(dedup_articles(list(order))) >= 2
 
+    def test_indexed_matches_pairwise(self):
+        """転置インデックス版のクラスタ分けが総当たりと一致する（閾値を変えても）"""
+        import random
+
+        import dedup
+        rng = random.Random(7)
+        words = ["OpenAI", "Google", "NVIDIA", "ソフトバンク", "新モデル", "生成AI", "半導体",
+                 "を発表", "で提携", "を公開", "日本語対応", "企業向け", "GPT-5", "2.0", "投資"]
+        titles = [" ".join(rng.sample(words, rng.randint(2, 6))) for _ in range(300)]
+        items = []
+        for idx, title in enumerate(titles):
+            norm = dedup._normalize(title)
+            tokens = dedup._tokens(norm)
+            if len(tokens) >= dedup._MIN_TOKENS:
+                items.append((idx, {"title_ja": title}, norm, tokens, dedup._numbers(norm)))
+        for threshold in (0.1, 0.18, 0.25, 0.4, 0.7):
+            pairwise = [[m[0] for m in c] for c in dedup._cluster_pairwise(items, threshold)]
+            indexed = [[m[0] for m in c] for c in dedup._cluster_indexed(items, threshold)]
+            assert indexed == pairwise
+
+    def test_numpy_backend_matches_python(self):
+        """NumPy 版（行列積で共通トークン数）の候補ペア・クラスタ分けが純 Python 版と一致する（差分テスト）"""
+        pytest.importorskip("numpy")
+        import random
+
+        import dedup
+        import dedup_numpy
+        rng = random.Random(11)
+        words = ["OpenAI", "Anthropic", "Google", "NVIDIA", "ソフトバンク", "新モデル", "生成AI", "半導体",
+                 "を発表", "で提携", "を公開", "日本語対応", "企業向け", "GPT-5", "GPT-4", "2.0", "投資", "規制"]
+        titles = [" ".join(rng.sample(words, rng.randint(2, 7))) for _ in range(600)]
+        items = []
+        for idx, title in enumerate(titles):
+            norm, tokens, numbers = dedup.text_features(title)
+            if len(tokens) >= dedup._MIN_TOKENS:
+                items.append((idx, {"title_ja": title}, norm, tokens, numbers))
+        for t in (0.05, 0.18, 0.25, 0.5):
+            assert dedup_numpy.near_pairs(items, t) == dedup._near_indexed(items, t)
+        # 行列積を複数の行ブロックに分けても同じ
+        with patch.object(dedup_numpy, "_CHUNK_ROWS", 64):
+            for threshold in (0.1, 0.25, 0.4):
+                pairwise = [[m[0] for m in c] for c in dedup._cluster_pairwise(items, threshold)]
+                vectorized = [[m[0] for m in c] for c in dedup._cluster_numpy(items, threshold)]
+                assert vectorized == pairwise
+        articles = [{"title_ja": title, "importance_score": i % 10} for i, title in enumerate(titles)]
+        assert dedup.dedup_articles(articles, backend="numpy") == dedup.dedup_articles(articles, backend="python")
+
+    def test_tiered_rescue_matches_ratio(self):
+        """段階判定（長さ → quick_ratio → ratio）の救済結果が ratio() だけの判定と一致する"""
+        import random
+        from difflib import SequenceMatcher
+
+        import dedup
+        rng = random.Random(3)
+        chars = "生成aiモデルを発表公開提携企業向け"
+        texts = ["".join(rng.choice(chars) for _ in range(rng.randint(0, 30))) for _ in range(150)]
+        texts += ["openai 新モデル gpt を発表", "新モデル gpt を openai が発表", ""]
+        for a in texts:
+            for b in texts[::7]:
+                assert dedup._sm_rescue(a, b) == (SequenceMatcher(None, a, b).ratio() >= dedup._SM_RESCUE)
+
+    def test_tiered_rescue_counters(self):
+        import dedup
+        before = dict(dedup.RESCUE_STATS)
+        assert not dedup._sm_rescue("openai 新モデル", "openai 新モデル gpt を正式に発表 推論性能が向上")
+        assert not dedup._sm_rescue("新モデルを発表", "提携企業向け公")
+        assert dedup._sm_rescue("openai 新モデル gpt を発表", "openai 新モデル gpt が発表")
+        delta = {k: dedup.RESCUE_STATS[k] - before[k] for k in before}
+        assert delta == {"length": 1, "quick": 1, "full": 1, "rescued": 1}
+
+    def test_numpy_backend_falls_back_without_numpy(self, monkeypatch):
+        import sys
+
+        import dedup
+        monkeypatch.setitem(sys.modules, "dedup_numpy", None)  # import すると ImportError
+        assert dedup._cluster_fn("numpy") is dedup._cluster_indexed
+        assert dedup._cluster_fn("python") is dedup._cluster_indexed
+
 
 # ============================================================
 # article_extractor.py — 本文取得（trafilatura, モック）
@@ -359,17 +1459,23 @@ _SAMPLE_HTML = (
 class TestArticleExtractor:
     """本文取得のモックテスト（ネットワークは使わない）"""
 
+    @pytest.fixture(autouse=True)
+    def _isolated_cache(self, tmp_path, monkeypatch):
+        # 本文キャッシュ・ドメイン統計を一時ディレクトリへ（実ファイルを汚さず、テスト間で共有しない）
+        monkeypatch.setattr("article_extractor._FULLTEXT_CACHE_DIR", str(tmp_path / "fulltext"))
+        self._domains = str(tmp_path / "domains.json")
+
     def test_fetch_success(self):
         from article_extractor import fetch_article_text
-        with patch("article_extractor.trafilatura.fetch_url", return_value=_SAMPLE_HTML):
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
             text = fetch_article_text("https://example.com/article")
         assert text is not None
         assert len(text) >= 200
 
     def test_fetch_download_failure_returns_none(self):
-        """取得失敗（fetch_url が None）なら None を返す"""
+        """取得失敗（_download_html が None）なら None を返す"""
         from article_extractor import fetch_article_text
-        with patch("article_extractor.trafilatura.fetch_url", return_value=None):
+        with patch("article_extractor._download_html", return_value=None):
             assert fetch_article_text("https://example.com/article") is None
 
     def test_fetch_empty_url(self):
@@ -383,8 +1489,8 @@ class TestArticleExtractor:
             {"url": f"https://example.com/{i}", "summary": "x", "source": "Test"}
             for i in range(8)
         ]
-        with patch("article_extractor.trafilatura.fetch_url", return_value=_SAMPLE_HTML):
-            result = enrich_with_full_text(articles, top_n=8)
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            result = enrich_with_full_text(articles, top_n=8, domain_stats_path=self._domains)
         # 全件、例外なく本文が付与されること
         assert all(a.get("full_text") for a in result)
 
@@ -392,8 +1498,8 @@ class TestArticleExtractor:
         """既に full_text を持つ記事は再取得しない"""
         from article_extractor import enrich_with_full_text
         articles = [{"url": "https://example.com/a", "full_text": "既存の本文テキスト"}]
-        with patch("article_extractor.trafilatura.fetch_url") as mock_fetch:
-            enrich_with_full_text(articles, top_n=15)
+        with patch("article_extractor._download_html") as mock_fetch:
+            enrich_with_full_text(articles, top_n=15, domain_stats_path=self._domains)
             mock_fetch.assert_not_called()
         assert articles[0]["full_text"] == "既存の本文テキスト"
 
@@ -403,14 +1509,399 @@ class TestArticleExtractor:
         articles = [
             {"url": f"https://example.com/{i}", "summary": "x"} for i in range(20)
         ]
-        with patch("article_extractor.trafilatura.fetch_url", return_value=_SAMPLE_HTML):
-            enrich_with_full_text(articles, top_n=5)
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            enrich_with_full_text(articles, top_n=5, domain_stats_path=self._domains)
         assert sum(1 for a in articles if a.get("full_text")) == 5
 
     def test_failed_extraction_no_full_text(self):
         """本文が短すぎる/取れない場合は full_text を付けない（要約フォールバック）"""
         from article_extractor import enrich_with_full_text
         articles = [{"url": "https://example.com/a", "summary": "短い要約"}]
-        with patch("article_extractor.trafilatura.fetch_url", return_value="<html><body><p>短い</p></body></html>"):
-            enrich_with_full_text(articles, top_n=15)
+        with patch("article_extractor._download_html", return_value="<html><body><p>短い</p></body></html>"):
+            enrich_with_full_text(articles, top_n=15, domain_stats_path=self._domains)
         assert "full_text" not in articles[0]
+
+    def test_process_pool_extraction_matches_thread(self, monkeypatch):
+        """二段構成（スレッドで取得 → プロセスプールで抽出）でもスレッド内抽出と同じ本文になる"""
+        from article_extractor import enrich_with_full_text, fetch_article_text
+        monkeypatch.setattr("article_extractor._CPUS", 2)
+        monkeypatch.setattr("article_extractor._EXTRACT_WORKERS", 2)
+        monkeypatch.setattr("article_extractor._MIN_POOL_DOCS", 2)
+        articles = [{"url": f"https://example.com/p{i}"} for i in range(3)]
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            enrich_with_full_text(articles, domain_stats_path=self._domains)
+            expected = fetch_article_text("https://example.com/x")
+        assert [a.get("full_text") for a in articles] == [expected] * 3
+
+    def test_broken_pool_falls_back_to_thread(self, monkeypatch):
+        """抽出プロセスが落ちてもスレッド内抽出で本文を得る"""
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+
+        from article_extractor import enrich_with_full_text
+
+        class BrokenPool:
+            def submit(self, fn, *args):
+                f = Future()
+                f.set_exception(BrokenProcessPool("worker died"))
+                return f
+
+            def shutdown(self, **kwargs):
+                pass
+
+        monkeypatch.setattr("article_extractor._start_extract_pool", lambda n: BrokenPool())
+        articles = [{"url": f"https://example.com/b{i}"} for i in range(2)]
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            enrich_with_full_text(articles, domain_stats_path=self._domains)
+        assert all(a.get("full_text") for a in articles)
+
+    def test_stuck_extraction_kills_and_restarts_pool(self, monkeypatch):
+        """抽出が _EXTRACTION_TIMEOUT_SEC を超えたらワーカーを終了させ、プールを作り直す"""
+        from concurrent.futures import Future
+
+        from article_extractor import FullTextPrefetcher
+
+        class StuckPool:
+            def submit(self, fn, *args):
+                return Future()  # 結果が返らない（抽出が止まった）
+
+            def shutdown(self, **kwargs):
+                pass
+
+        started, killed = [], []
+
+        def start(n):
+            started.append(StuckPool())
+            return started[-1]
+
+        monkeypatch.setattr("article_extractor._EXTRACTION_TIMEOUT_SEC", 0.2)
+        monkeypatch.setattr("article_extractor._start_extract_pool", start)
+        monkeypatch.setattr("article_extractor._kill_pool", killed.append)
+        prefetcher = FullTextPrefetcher(expected=4, domain_stats_path=self._domains)
+        article = {"url": "https://example.com/stuck"}
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            prefetcher.submit(article)
+            assert prefetcher.finish(timeout=5) == 0
+        assert "full_text" not in article
+        # 止まったプールを終了させて作り直し、作り直したプールも finish で終了させる
+        assert killed == started and len(started) == 2
+
+    def test_kill_pool_stops_running_worker(self):
+        """_kill_pool は実行中のワーカープロセスを終了させ、待っている future は BrokenProcessPool になる"""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        from article_extractor import _kill_pool
+
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        future = pool.submit(time.sleep, 60)
+        procs = list(pool._processes.values())
+        _kill_pool(pool)
+        with pytest.raises(BrokenProcessPool):
+            future.result(timeout=10)
+        for proc in procs:
+            proc.join(timeout=5)
+            assert not proc.is_alive()
+
+    def _stream_via(self, handler):
+        import httpx
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        return patch("article_extractor.httpx.stream", client.stream)
+
+    def test_download_rejects_non_html(self):
+        """PDF など HTML 以外は Content-Type で断る（HTTP エラーも None）"""
+        import httpx
+
+        from article_extractor import _download_html
+
+        def handler(request):
+            if request.url.path.endswith(".pdf"):
+                return httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF" * 1000)
+            return httpx.Response(404, text="not found")
+
+        with self._stream_via(handler):
+            assert _download_html("https://arxiv.org/pdf/2601.00001.pdf") is None
+            assert _download_html("https://example.com/missing") is None
+
+    def test_download_stops_at_byte_budget(self):
+        """巨大なページは上限バイトで打ち切り、そこまでの HTML から本文を抽出できる"""
+        import httpx
+
+        from article_extractor import _download_html, _extract_text
+        huge = _SAMPLE_HTML + "<p>" + "padding " * 500_000 + "</p>"
+
+        def handler(request):
+            return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"},
+                                  content=huge.encode())
+
+        with self._stream_via(handler):
+            html = _download_html("https://example.com/newsletter", max_bytes=200_000)
+        assert html.startswith(_SAMPLE_HTML[:50]) and len(html.encode()) <= 200_000
+        assert _extract_text(html)
+
+    def test_rerun_served_from_disk_cache(self):
+        """別プロセス相当の再実行では本文を再取得しない（正規化 URL がキー）"""
+        from article_extractor import enrich_with_full_text
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            first = enrich_with_full_text([{"url": "https://example.com/a?utm_source=rss"}], domain_stats_path=self._domains)
+        with patch("article_extractor._download_html") as mock_fetch:
+            again = enrich_with_full_text([{"url": "https://example.com/a"}], domain_stats_path=self._domains)
+            mock_fetch.assert_not_called()
+        assert again[0]["full_text"] == first[0]["full_text"]
+
+    def test_cache_stats_count_only_used_bodies(self):
+        """候補の下見（accepts）は hit/miss に数えず、本文を使う記事の参照だけを数える"""
+        from article_extractor import FullTextPrefetcher, enrich_with_full_text
+        articles = [{"url": f"https://example.com/s{i}"} for i in range(6)]
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML):
+            enrich_with_full_text(articles, top_n=6, domain_stats_path=self._domains)
+        prefetcher = FullTextPrefetcher(expected=2, domain_stats_path=self._domains)
+        rerun = [{"url": a["url"]} for a in articles]
+        assert all(prefetcher.accepts(a) for a in rerun)
+        assert prefetcher.cache.stats["hit"] == prefetcher.cache.stats["miss"] == 0
+        prefetcher.retarget(rerun, 2)
+        assert prefetcher.finish() == 2
+        assert (prefetcher.cache.stats["hit"], prefetcher.cache.stats["miss"]) == (2, 0)
+
+    def test_failures_cached_briefly(self):
+        """取得失敗も短期間キャッシュし、同じ URL を待ち直さない"""
+        from article_extractor import enrich_with_full_text
+        with patch("article_extractor._download_html", return_value=None):
+            enrich_with_full_text([{"url": "https://example.com/blocked"}], domain_stats_path=self._domains)
+        with patch("article_extractor._download_html") as mock_fetch:
+            result = enrich_with_full_text([{"url": "https://example.com/blocked"}], domain_stats_path=self._domains)
+            mock_fetch.assert_not_called()
+        assert "full_text" not in result[0]
+
+    def test_failing_domain_does_not_use_budget(self):
+        """失敗が続くドメインの記事は取得せず、その枠を次の記事に回す"""
+        from article_extractor import enrich_with_full_text
+        from domain_stats import DomainStats
+        stats = DomainStats(self._domains)
+        for _ in range(3):
+            stats.record("https://www.paywalled.example/x", False, 1.0)
+        stats.save()
+        articles = [
+            {"url": "https://paywalled.example/a"},
+            {"url": "https://open.example/b"},
+            {"url": "https://open.example/c"},
+        ]
+        with patch("article_extractor._download_html", return_value=_SAMPLE_HTML) as mock_fetch:
+            enrich_with_full_text(articles, top_n=2, domain_stats_path=self._domains)
+        fetched = {c.args[0] for c in mock_fetch.call_args_list}
+        assert fetched == {"https://open.example/b", "https://open.example/c"}
+        assert "full_text" not in articles[0]
+
+
+class TestDiskCache:
+    """disk_cache: TTL・内容アドレス・容量上限の LRU 退避"""
+
+    def test_ttl_expiry(self, tmp_path):
+        from disk_cache import DiskCache
+        cache = DiskCache(str(tmp_path), ttl_sec=60, max_bytes=10_000)
+        cache.put("a", "本文A")
+        cache.put("b", "本文B", ttl_sec=-1)
+        cache.save()
+        reloaded = DiskCache(str(tmp_path), ttl_sec=60, max_bytes=10_000)
+        assert reloaded.get("a") == "本文A"
+        assert reloaded.get("b") is None
+        assert reloaded.stats["hit"] == 1 and reloaded.stats["miss"] == 1
+
+    def test_lru_eviction_and_shared_blobs(self, tmp_path):
+        from disk_cache import DiskCache
+        cache = DiskCache(str(tmp_path), ttl_sec=60, max_bytes=250)
+        for key in ("old", "mid", "new"):
+            cache.put(key, key * 40)  # 120 バイトずつ
+            time.sleep(0.01)
+        cache.put("alias", "new" * 40)  # 同じ内容は blob を共有
+        cache.get("old")  # 参照すると最新扱い
+        cache.save()
+        reloaded = DiskCache(str(tmp_path), ttl_sec=60, max_bytes=250)
+        assert reloaded.get("mid") is None
+        assert reloaded.get("old") == "old" * 40
+        assert reloaded.get("alias") == reloaded.get("new") == "new" * 40
+        blobs = [p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]
+        assert len(blobs) == 2
+
+
+    def test_peek_does_not_count_or_refresh(self, tmp_path):
+        from disk_cache import DiskCache
+        cache = DiskCache(str(tmp_path), ttl_sec=60, max_bytes=250)
+        cache.put("old", "old" * 40)
+        time.sleep(0.01)
+        cache.put("new", "new" * 40)
+        assert cache.peek("old") == "old" * 40 and cache.peek("missing") is None
+        assert cache.stats["hit"] == cache.stats["miss"] == 0
+        cache.put("newer", "newer" * 24)  # 容量超過: 下見しただけの old が最も古い
+        cache.save()
+        assert DiskCache(str(tmp_path), ttl_sec=60, max_bytes=250).get("old") is None
+
+
+class TestDomainStats:
+    """domain_stats: 失敗が続くドメインの見送り・ドメイン別タイムアウト"""
+
+    def test_skip_after_failure_streak_and_periodic_retry(self, tmp_path):
+        from domain_stats import DomainStats
+        path = str(tmp_path / "domains.json")
+        stats = DomainStats(path, now=1_000_000)
+        for _ in range(2):
+            stats.record("https://www.ft.example/a", False, 0.5)
+        assert not stats.should_skip("https://ft.example/b")  # 2回の失敗ではまだ試す
+        stats.record("https://ft.example/c", False, 0.5)
+        stats.save()
+        assert DomainStats(path, now=1_000_000 + 86400).should_skip("https://ft.example/d")
+        assert not DomainStats(path, now=1_000_000 + 8 * 86400).should_skip("https://ft.example/d")
+
+    def test_retry_lets_one_probe_through_per_run(self, tmp_path):
+        """再試行の期限が来たドメインも、今回の実行では1記事だけ試す"""
+        from domain_stats import DomainStats
+        path = str(tmp_path / "domains.json")
+        stats = DomainStats(path, now=1_000_000)
+        for _ in range(3):
+            stats.record("https://ft.example/a", False, 0.5)
+        stats.save()
+        later = DomainStats(path, now=1_000_000 + 8 * 86400)
+        assert not later.should_skip("https://ft.example/b")
+        assert not later.should_skip("https://ft.example/b")  # 同じ記事の照会し直し
+        assert later.should_skip("https://ft.example/c") and later.should_skip("https://www.ft.example/d")
+        later.record("https://ft.example/b", True, 1.0)
+        assert not later.should_skip("https://ft.example/c")  # 成功したら見送りをやめる
+
+    def test_success_resets_streak(self, tmp_path):
+        from domain_stats import DomainStats
+        stats = DomainStats(str(tmp_path / "domains.json"), now=0)
+        for ok in (False, False, True, False, False):
+            stats.record("https://news.example/a", ok, 1.0)
+        assert not stats.should_skip("https://news.example/b")
+
+    def test_timeout_follows_latency(self, tmp_path):
+        from domain_stats import DomainStats
+        stats = DomainStats(str(tmp_path / "domains.json"), now=0)
+        assert stats.timeout_for("https://unknown.example/", 15.0) == 15.0
+        stats.record("https://fast.example/a", True, 0.2)
+        stats.record("https://slow.example/a", True, 9.0)
+        assert stats.timeout_for("https://fast.example/b", 15.0) == 5.0   # 下限
+        assert stats.timeout_for("https://slow.example/b", 15.0) == 15.0  # 既定値で頭打ち
+
+
+class TestDeliveredIndex:
+    """delivered_index: 配信済み記事との近似重複（日・メディアをまたぐ）"""
+
+    @staticmethod
+    def _a(title_ja, url, title=""):
+        return {"title_ja": title_ja, "title": title, "url": url}
+
+    def test_matches_rephrased_story_within_window(self, tmp_path):
+        from delivered_index import DeliveredIndex
+        path = str(tmp_path / "delivered.json")
+        index = DeliveredIndex(path)
+        index.add(self._a("OpenAI、新モデル GPT-5 を正式発表 推論性能が大幅向上", "https://a.com/1"), "2026-03-01")
+        index.add(self._a("ソフトバンク、国内データセンターに1兆円投資", "https://a.com/2"), "2026-03-01")
+        index.save()
+        reloaded = DeliveredIndex(path)
+        assert len(reloaded) == 2
+        other_outlet = self._a("GPT-5 を OpenAI が正式発表、推論性能が大幅向上", "https://b.com/x")
+        story = reloaded.match(other_outlet, "2026-02-20", "2026-03-05")
+        assert story is not None and story["url"] == "https://a.com/1"
+        # 期間外（当日分・古すぎる分）とは照合しない
+        assert reloaded.match(other_outlet, "2026-03-02", "2026-03-05") is None
+        assert reloaded.match(other_outlet, "2026-02-20", "2026-03-01") is None
+        # 数値が食い違う別発表・無関係な記事は残す
+        assert reloaded.match(self._a("OpenAI、新モデル GPT-4 を正式発表 推論性能が大幅向上", "https://c.com"),
+                              "2026-02-20", "2026-03-05") is None
+        assert reloaded.match(self._a("Google、検索に AI エージェント機能を追加", "https://d.com"),
+                              "2026-02-20", "2026-03-05") is None
+
+    def test_original_title_view(self, tmp_path):
+        """原文（英語）見出しどうしでも同じ出来事を拾う"""
+        from delivered_index import DeliveredIndex
+        index = DeliveredIndex(str(tmp_path / "delivered.json"))
+        index.add(self._a("アンソロピック、新たな資金調達", "https://a.com/1",
+                          "Anthropic raises new funding round led by major investors"), "2026-03-01")
+        candidate = {"title": "Anthropic raises new funding round led by investors", "url": "https://b.com/y"}
+        assert index.match(candidate, "2026-02-20", "2026-03-05") is not None
+
+    def test_lsh_path_and_rebuild_on_param_change(self, tmp_path, monkeypatch):
+        """大きい履歴では LSH の候補だけを確かめ、帯・行の設定が違う保存ファイルは作り直す"""
+        import delivered_index
+        from delivered_index import DeliveredIndex
+        monkeypatch.setattr(delivered_index, "_LINEAR_MAX", -1)
+        path = tmp_path / "delivered.json"
+        index = DeliveredIndex(str(path))
+        index.add(self._a("OpenAI、新モデル GPT-5 を正式発表 推論性能が大幅向上", "https://a.com/1"), "2026-03-01")
+        index.add(self._a("ソフトバンク、国内データセンターに1兆円投資", "https://a.com/2"), "2026-03-01")
+        index.save()
+        # 旧設定（帯 64 × 行 2）で保存されたファイル: 設定の記録がなく、帯のハッシュも合わない
+        data = json.loads(path.read_text(encoding="utf-8"))
+        del data["lsh"]
+        for story in data["stories"].values():
+            story["bands"] = ["0" * 8 * 64 for _ in story["views"]]
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        reloaded = DeliveredIndex(str(path))
+        query = self._a("GPT-5 を OpenAI が正式発表、推論性能が大幅向上", "https://b.com/x")
+        tokens = delivered_index.text_features(delivered_index._views(query)[0])[1]
+        assert len(reloaded.candidates(tokens)) == 1  # 共通トークンのない記事は候補に入らない
+        story = reloaded.match(query, "2026-02-20", "2026-03-05")
+        assert story is not None and story["url"] == "https://a.com/1"
+
+    def test_stage2_filter_seed_and_record(self, tmp_path, monkeypatch):
+        import curate_morning_brief as cmb
+        monkeypatch.setattr("delivered_index.NEWS_BOT_OUTPUT_DIR", str(tmp_path))
+        brief = {"articles": [self._a("NVIDIA、次世代 AI チップを発表 性能は従来の3倍", "https://a.com/n")]}
+        (tmp_path / "morning_brief_20260301.json").write_text(json.dumps(brief, ensure_ascii=False), encoding="utf-8")
+        today = datetime.date(2026, 3, 3)
+        index = cmb.load_delivered_index(days=14, today=today, path=str(tmp_path / "delivered.json"))
+        assert len(index) == 1
+        candidates = [
+            self._a("次世代 AI チップを NVIDIA が発表、性能は従来の3倍", "https://b.com/n"),
+            self._a("楽天、生成AIで接客を自動化", "https://b.com/r"),
+        ]
+        kept = cmb.filter_delivered_stories(candidates, index, days=14, today=today)
+        assert [a["url"] for a in kept] == ["https://b.com/r"]
+        cmb.record_delivered(index, kept, days=1, today=today)  # 期間外の 3/1 分は捨てる
+        saved = json.loads((tmp_path / "delivered.json").read_text(encoding="utf-8"))
+        assert [s["url"] for s in saved["stories"].values()] == ["https://b.com/r"]
+
+
+
+class TestFeatures:
+    """features: 見出し特徴量（正規化・トークン・数値）のキャッシュ"""
+
+    def test_features_match_uncached_and_are_reused(self):
+        from features import _normalize, _numbers, _tokens, text_features
+        title = "  OpenAI、「GPT-5」を発表（2026年）  "
+        norm, tokens, numbers = text_features(title)
+        assert norm == _normalize(title.strip())
+        assert tokens == _tokens(norm) and numbers == _numbers(norm) == {"5", "2026"}
+        assert isinstance(tokens, frozenset) and isinstance(numbers, frozenset)
+        # 2回目はキャッシュの同じオブジェクト。正規化済みテキストからも同じ特徴量
+        assert text_features(title) is text_features(title)
+        assert text_features(norm)[1] == tokens
+
+    def test_dedup_reexports_feature_functions(self):
+        import dedup
+        import features
+        assert dedup._normalize is features._normalize
+        assert dedup._tokens is features._tokens
+        assert dedup._numbers is features._numbers
+
+    def test_stage2_tokenizes_each_title_once(self, tmp_path):
+        """配信済み照合 → 重複束ね → 登録で同じ見出しを計算し直さない"""
+        from dedup import dedup_articles
+        from delivered_index import DeliveredIndex
+        from features import text_features
+        index = DeliveredIndex(str(tmp_path / "delivered.json"))
+        index.add({"title_ja": "ソフトバンク、国内データセンターに1兆円投資", "url": "https://a.com/1"}, "2026-03-01")
+        candidates = [
+            {"title_ja": "Meta、新しいオープンモデルを公開 多言語に対応", "url": "https://b.com/1"},
+            {"title_ja": "新しいオープンモデルを Meta が公開、多言語に対応", "url": "https://b.com/2"},
+        ]
+        text_features.cache_clear()
+        kept = [a for a in candidates if index.match(a, "2026-02-20", "2026-03-02") is None]
+        misses = text_features.cache_info().misses
+        merged = dedup_articles(kept)
+        for a in merged:
+            index.add(a, "2026-03-02")
+        assert len(merged) == 1
+        assert text_features.cache_info().misses == misses
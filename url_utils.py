@@ -0,0 +1,33 @@
+"""url_utils.py — 記事 URL の正規化（キャッシュ・重複判定のキー用）。
+
+同じ記事でもフィードやメディアによって、トラッキング用クエリ（utm_* 等）や
+フラグメント、ホスト名の大文字小文字、末尾スラッシュが揺れる。キャッシュや
+既読管理のキーにはこの揺れを取り除いた正規形を使う。
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 記事の同一性に影響しないトラッキング用クエリパラメータ
+_TRACKING_PARAMS = {"fbclid", "gclid", "ref", "ref_src", "mc_cid", "mc_eid", "cmpid", "ncid"}
+
+
+def canonical_url(url: str) -> str:
+    """比較用に URL を正規化する（解析できない文字列は前後空白を除いてそのまま返す）。"""
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+    netloc = parts.netloc.lower()
+    if (parts.scheme == "https" and netloc.endswith(":443")) or (
+        parts.scheme == "http" and netloc.endswith(":80")
+    ):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), netloc, path, query, ""))